@@ -0,0 +1,248 @@
+# audio_catalog.py
+
+import os
+import bisect
+import mimetypes
+import threading
+from datetime import datetime
+
+TTS_OUTPUT_DIR = "tts_output"
+
+# Audio formats we write: extension -> media types (first is the Content-Type sent)
+MEDIA_TYPES = {
+    "wav": ("audio/wav", "audio/x-wav", "audio/wave"),
+    "aiff": ("audio/aiff", "audio/x-aiff"),
+    "mp3": ("audio/mpeg", "audio/mp3"),
+    "opus": ("audio/ogg", "audio/opus", "application/ogg"),
+}
+# Formats written by the TTS engines; everything else is a transcoded variant
+SOURCE_FORMATS = ("wav", "aiff")
+# Which variant represents a clip in listings: the source if kept, else the most compatible
+FORMAT_RANK = ("wav", "aiff", "mp3", "opus")
+
+for _fmt, _types in MEDIA_TYPES.items():
+    mimetypes.add_type(_types[0], f".{_fmt}")
+
+
+def split_audio_name(name: str):
+    """'abc.wav' -> ('abc', 'wav')"""
+    stem, dot, ext = name.rpartition(".")
+    return (stem, ext.lower()) if dot else (name, "")
+
+
+def primary_format(formats):
+    """The format a clip is listed under, given the formats it exists in."""
+    return min(formats, key=lambda f: FORMAT_RANK.index(f) if f in FORMAT_RANK else len(FORMAT_RANK))
+
+
+def parse_accept(header: str) -> list:
+    """Parse an Accept header into [(media_range, q), ...]."""
+    ranges = []
+    for part in (header or "*/*").split(","):
+        media, _, params = part.partition(";")
+        media = media.strip().lower()
+        if not media:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges.append((media, q))
+    return ranges
+
+
+def accept_quality(ranges: list, fmt: str) -> float:
+    """q value the client gives a format (most specific matching range wins)."""
+    best = (-1, 0.0)
+    for media_type in MEDIA_TYPES.get(fmt, ()):
+        major = media_type.split("/")[0]
+        for media, q in ranges:
+            if media == media_type:
+                rank = 2
+            elif media == f"{major}/*":
+                rank = 1
+            elif media == "*/*":
+                rank = 0
+            else:
+                continue
+            if rank > best[0]:
+                best = (rank, q)
+    return best[1]
+
+
+def pick_variant(sizes: dict, accept: str):
+    """Smallest format (of {format: size}) the Accept header allows, or None."""
+    ranges = parse_accept(accept)
+    acceptable = [fmt for fmt in sizes if accept_quality(ranges, fmt) > 0]
+    if not acceptable:
+        return None
+    return min(acceptable, key=lambda fmt: sizes[fmt])
+
+
+class AudioCatalog:
+    """
+    In-memory listing of the audio files in tts_output/.
+
+    Built once with a single os.scandir pass, then kept current by speak_text
+    (add) and cleanup (discard) instead of re-listing the directory per request.
+    If the directory mtime moves without us (another worker wrote to it), the
+    next list() rescans. Writers pass the dir_version() they read before their
+    change; the catalog only treats the new mtime as seen if nobody else had
+    changed the folder by then.
+
+    Transcoded variants (abc.opus, abc.mp3 next to abc.wav) are grouped by
+    stem: list() shows one entry per clip with its other formats under
+    "variants", and variants() answers format negotiation without a stat.
+    """
+
+    def __init__(self, folder: str = TTS_OUTPUT_DIR):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._entries = {}      # name -> entry dict
+        self._order = []        # (ctime_ns, name), ascending
+        self._keys = {}         # name -> its (ctime_ns, name) sort key
+        self._stems = {}        # stem -> {format: name}
+        self._snapshot = None   # cached newest-first list
+        self._dir_mtime = None
+        self._built = False
+
+    def owns(self, folder: str) -> bool:
+        return os.path.abspath(folder) == os.path.abspath(self.folder)
+
+    @staticmethod
+    def _entry(name, path, st):
+        return {
+            "name": name,
+            "path": path,
+            "size": st.st_size,
+            "created": datetime.fromtimestamp(st.st_ctime).isoformat(),
+        }
+
+    def dir_version(self):
+        try:
+            return os.stat(self.folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def rebuild(self):
+        """Rescan the folder in one os.scandir pass."""
+        entries = {}
+        keys = {}
+        dir_mtime = self.dir_version()
+        if os.path.isdir(self.folder):
+            with os.scandir(self.folder) as it:
+                for de in it:
+                    # Skip in-progress TTS temp files
+                    if de.name.startswith(".") or not de.is_file():
+                        continue
+                    st = de.stat()
+                    entries[de.name] = self._entry(de.name, os.path.join(self.folder, de.name), st)
+                    keys[de.name] = (st.st_ctime_ns, de.name)
+        order = sorted(keys.values())
+        stems = {}
+        for name in entries:
+            stem, fmt = split_audio_name(name)
+            stems.setdefault(stem, {})[fmt] = name
+
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self._stems = stems
+            self._order = order
+            self._snapshot = None
+            self._dir_mtime = dir_mtime
+            self._built = True
+
+    def add(self, filename: str, before=None):
+        """
+        Record a file that was just written (or refreshed) in the folder.
+        before is dir_version() from just ahead of the write; leave it out if
+        the write did not change the directory (e.g. a utime).
+        """
+        path = os.path.join(self.folder, filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            if not self._built:
+                return
+            self._discard_locked(filename)
+            key = (st.st_ctime_ns, filename)
+            self._entries[filename] = self._entry(filename, path, st)
+            self._keys[filename] = key
+            stem, fmt = split_audio_name(filename)
+            self._stems.setdefault(stem, {})[fmt] = filename
+            bisect.insort(self._order, key)
+            self._snapshot = None
+            self._seen_locked(before)
+
+    def discard(self, filename: str, before=None):
+        """Forget a file that was just deleted; before as for add()."""
+        with self._lock:
+            if not self._built:
+                return
+            self._discard_locked(filename)
+            self._snapshot = None
+            self._seen_locked(before)
+
+    def _seen_locked(self, before):
+        # Our own change is now in the catalog; any other since the last scan is not
+        if before is not None and before == self._dir_mtime:
+            self._dir_mtime = self.dir_version()
+
+    def _discard_locked(self, filename):
+        if self._entries.pop(filename, None) is None:
+            return
+        key = self._keys.pop(filename)
+        stem, fmt = split_audio_name(filename)
+        group = self._stems.get(stem, {})
+        group.pop(fmt, None)
+        if not group:
+            self._stems.pop(stem, None)
+        i = bisect.bisect_left(self._order, key)
+        if i < len(self._order) and self._order[i] == key:
+            del self._order[i]
+
+    def _refresh(self):
+        if not self._built or self.dir_version() != self._dir_mtime:
+            self.rebuild()
+
+    def _listing_locked(self):
+        listing = []
+        for _, name in reversed(self._order):
+            stem, fmt = split_audio_name(name)
+            group = self._stems.get(stem, {})
+            if primary_format(group) != fmt:
+                continue
+            entry = self._entries[name]
+            others = {f: n for f, n in group.items() if n != name}
+            if others:
+                entry = dict(entry, variants={
+                    f: {"name": n, "size": self._entries[n]["size"]} for f, n in others.items()
+                })
+            listing.append(entry)
+        return listing
+
+    def list(self):
+        """All audio clips (one entry per stem, other formats under "variants"), newest first."""
+        self._refresh()
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._listing_locked()
+            return self._snapshot
+
+    def variants(self, filename: str) -> dict:
+        """{format: entry} for every format the clip behind filename exists in."""
+        self._refresh()
+        stem, _ = split_audio_name(filename)
+        with self._lock:
+            group = self._stems.get(stem, {})
+            return {fmt: self._entries[name] for fmt, name in group.items()}
+
+
+audio_catalog = AudioCatalog(TTS_OUTPUT_DIR)
@@ -0,0 +1,489 @@
+# benchmark.py
+"""
+End-to-end generation benchmark against a local mock LLM and fake TTS.
+
+    python -m app.benchmark --levels 1,4,16 --drivers roundtable,http
+    python -m app.benchmark --levels 8 --latency 0.8 --error-rate 0.05 --shapes clean=0.8,fenced=0.2 --json
+
+Starts app.mock_llm on a free port (own thread and event loop) and points
+GROQ_URL at it, puts a fake espeak-ng first on PATH (--tts fake: writes a
+silent WAV of realistic length after burning --tts-cpu-ms of CPU; --tts real
+uses the installed engine), then for every concurrency level runs --episodes
+episodes through each driver:
+
+    roundtable  run_roundtable() called directly on this event loop
+    http        POST /generate against app.main served by uvicorn on this loop
+                (--http-mode sse streams turns, json waits for the whole episode)
+
+Reports episodes/sec, p50/p95/p99 episode and turn latency (turn = time until
+a turn's last entry was emitted, measured from the previous turn), event-loop
+lag (how late a 50 ms ticker wakes up; for http this is the server's loop),
+and peak RSS of this process. Everything is written to a fresh working
+directory (--workdir), so the real tts_output/ and episode store are never
+touched. Run it before and after an optimization and compare the --json
+output; --replay DIR answers from recorded Groq fixtures (app.groq_fixtures)
+instead of the mock, so real model outputs drive the run.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from app import groq_client, groq_fixtures, speech_engine, tts_client
+from app.mock_llm import MOCK_PATH, add_mock_arguments, create_app, mock_from_args
+from app.moderator import run_roundtable
+from app.rate_limiter import groq_limiter
+from app.topics import TOPICS, get_topic
+
+logger = logging.getLogger(__name__)
+
+DRIVERS = ("roundtable", "http")
+LAG_INTERVAL = 0.05
+
+# Stand-in for espeak-ng: same arguments, writes a silent 16-bit mono WAV as long as the
+# real voice would speak the text (words / -s words-per-minute), after burning CPU like it
+FAKE_ESPEAK = '''#!{python} -S
+import os, sys, time, wave
+args = sys.argv[1:]
+out = args[args.index("-w") + 1]
+speed = float(args[args.index("-s") + 1]) if "-s" in args else 175.0
+deadline = time.process_time() + float(os.environ.get("FAKE_TTS_CPU_MS", "0")) / 1000
+while time.process_time() < deadline:
+    pass
+seconds = max(0.5, len(args[-1].split()) * 60.0 / speed)
+with wave.open(out, "wb") as w:
+    w.setnchannels(1)
+    w.setsampwidth(2)
+    w.setframerate(22050)
+    w.writeframes(bytes(2 * int(seconds * 22050)))
+'''
+
+
+def percentiles(values: list) -> dict:
+    """p50/p95/p99/max (nearest rank) of a list of numbers, rounded; None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(q):
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+    return {
+        "p50": round(rank(0.50), 4),
+        "p95": round(rank(0.95), 4),
+        "p99": round(rank(0.99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes since it started."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (peak so far where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+class LoopMonitor:
+    """Samples event-loop lag and RSS while a level runs."""
+
+    def __init__(self, interval: float = LAG_INTERVAL):
+        self.interval = interval
+        self.lags = []
+        self.peak_rss = 0
+        self._task = None
+
+    async def _tick(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - expected) * 1000)
+            self.peak_rss = max(self.peak_rss, current_rss())
+
+    def start(self):
+        self.peak_rss = current_rss()
+        self._task = asyncio.create_task(self._tick())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def bound_socket() -> socket.socket:
+    """A listening socket on a free localhost port."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+def uvicorn_server(app, **config):
+    import uvicorn
+
+    return uvicorn.Server(uvicorn.Config(app, log_level="warning", **config))
+
+
+class MockServer:
+    """app.mock_llm served by uvicorn in its own thread, so it does not load the measured loop."""
+
+    def __init__(self, mock):
+        self.mock = mock
+        self.sock = bound_socket()
+        self.server = uvicorn_server(create_app(mock), lifespan="off")
+        self.thread = threading.Thread(target=self.server.run, kwargs={"sockets": [self.sock]}, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.sock.getsockname()
+        return f"http://{host}:{port}{MOCK_PATH}"
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("mock LLM server failed to start")
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def install_fake_espeak(bin_dir: str, cpu_ms: float):
+    """Put the fake espeak-ng first on PATH for synthesis subprocesses."""
+    os.makedirs(bin_dir, exist_ok=True)
+    path = os.path.join(bin_dir, "espeak-ng")
+    with open(path, "w") as f:
+        f.write(FAKE_ESPEAK.format(python=sys.executable))
+    os.chmod(path, 0o755)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["FAKE_TTS_CPU_MS"] = str(cpu_ms)
+
+
+def llm_requests(mock) -> int:
+    """Completions answered so far, by the mock server or from replayed fixtures."""
+    fixtures = groq_fixtures.get_fixture_store()
+    return mock.stats["requests"] + (fixtures.stats["replayed"] if fixtures is not None else 0)
+
+
+def turn_latencies(started: float, emitted: list, speakers: int) -> list:
+    """
+    Per-turn latency from entry emission times: entry 0 is the intro, then
+    `speakers` entries per turn; each turn is measured from the previous one.
+    """
+    latencies = []
+    previous = started
+    for end in range(speakers, len(emitted), speakers):
+        latencies.append(emitted[end] - previous)
+        previous = emitted[end]
+    return latencies
+
+
+class Level:
+    """Runs one driver at one concurrency level and collects its samples."""
+
+    def __init__(self, driver: str, concurrency: int, episodes: int, args, base_url: str = None):
+        self.driver = driver
+        self.concurrency = concurrency
+        self.episodes = episodes
+        self.args = args
+        self.base_url = base_url
+        self.speakers = len(get_topic(args.topic).characters)
+        self.episode_latencies = []
+        self.turn_latencies = []
+        self.failed = 0
+        self.errors = {}
+
+    async def run_one(self, client):
+        started = time.perf_counter()
+        emitted = []
+        try:
+            if self.driver == "roundtable":
+                async def on_entry(entry):
+                    emitted.append(time.perf_counter())
+
+                await run_roundtable(tts_enabled=self.args.tts != "off", topic_type=self.args.topic, on_entry=on_entry)
+            elif self.args.http_mode == "sse":
+                await self._generate_sse(client, emitted)
+            else:
+                res = await client.post(f"{self.base_url}/generate", params=self._params())
+                res.raise_for_status()
+        except Exception as e:
+            self.failed += 1
+            key = type(e).__name__
+            self.errors[key] = self.errors.get(key, 0) + 1
+            logger.debug(f"{self.driver} episode failed: {e!r}")
+            return
+        self.episode_latencies.append(time.perf_counter() - started)
+        self.turn_latencies += turn_latencies(started, emitted, self.speakers)
+
+    def _params(self, **extra) -> dict:
+        return {"topic": self.args.topic, "tts": str(self.args.tts != "off").lower(), **extra}
+
+    async def _generate_sse(self, client, emitted):
+        event = None
+        async with client.stream("POST", f"{self.base_url}/generate", params=self._params(stream="true")) as res:
+            res.raise_for_status()
+            async for line in res.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:") and event == "turn":
+                    emitted.append(time.perf_counter())
+                elif line.startswith("data:") and event == "error":
+                    raise RuntimeError(json.loads(line[5:])["detail"])
+
+    async def run(self, client, mock) -> dict:
+        requests_before = llm_requests(mock)
+        errors_before = mock.stats["errors"]
+        tts_before = tts_client.get_tts_stats()
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def one():
+            async with slots:
+                await self.run_one(client)
+
+        monitor = LoopMonitor()
+        monitor.start()
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(one() for _ in range(self.episodes)))
+        finally:
+            elapsed = time.perf_counter() - started
+            await monitor.stop()
+
+        tts = tts_client.get_tts_stats()
+        done = len(self.episode_latencies)
+        return {
+            "driver": self.driver,
+            "concurrency": self.concurrency,
+            "episodes": done,
+            "failed": self.failed,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "episodes_per_sec": round(done / elapsed, 3) if elapsed > 0 else None,
+            "episode_latency_seconds": percentiles(self.episode_latencies),
+            "turn_latency_seconds": percentiles(self.turn_latencies),
+            "loop_lag_ms": percentiles(monitor.lags),
+            "peak_rss_mb": round(monitor.peak_rss / 2 ** 20, 1),
+            "llm_requests": llm_requests(mock) - requests_before,
+            "llm_errors_injected": mock.stats["errors"] - errors_before,
+            "tts_clips": tts["completed"] - tts_before["completed"],
+            "tts_failed": tts["failed"] - tts_before["failed"],
+        }
+
+
+async def serve_api():
+    """Start app.main on a free port on this loop; returns (server, task, base_url)."""
+    from app.main import app
+
+    sock = bound_socket()
+    server = uvicorn_server(app, lifespan="on")
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        if task.done():
+            task.result()
+            raise RuntimeError("API server failed to start")
+        await asyncio.sleep(0.01)
+    host, port = sock.getsockname()
+    return server, task, f"http://{host}:{port}"
+
+
+async def benchmark(args, mock) -> list:
+    results = []
+    await groq_client.init_client()
+    server = task = None
+    base_url = None
+    if "http" in args.driver_list:
+        server, task, base_url = await serve_api()
+    try:
+        async with httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=None)) as client:
+            for driver in args.driver_list:
+                if args.warmup:
+                    await Level(driver, 1, args.warmup, args, base_url).run(client, mock)
+                for concurrency in args.level_list:
+                    episodes = args.episodes or max(4, 2 * concurrency)
+                    level = Level(driver, concurrency, episodes, args, base_url)
+                    result = await level.run(client, mock)
+                    logger.info(
+                        f"{driver} x{concurrency}: {result['episodes']} episodes, "
+                        f"{result['episodes_per_sec']}/s, {result['failed']} failed"
+                    )
+                    results.append(result)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await task
+        await groq_client.close_client()
+    return results
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def format_percentiles(p, scale=1.0, digits=2) -> str:
+    if not p:
+        return "-"
+    return "/".join(f"{p[k] * scale:.{digits}f}" for k in ("p50", "p95", "p99"))
+
+
+def print_report(report: dict):
+    print(f"\nrevision {report['revision'] or '?'}, topic {report['config']['topic']}, "
+          f"tts {report['config']['tts']}, mock latency {report['config']['latency']}s")
+    print(f"{'driver':<11}{'conc':>5}{'eps':>6}{'fail':>5}{'ep/s':>8}  {'episode p50/95/99 s':<22}"
+          f"{'turn p50/95/99 s':<20}{'lag p50/99/max ms':<22}{'rss MB':>7}")
+    for r in report["results"]:
+        lag = r["loop_lag_ms"]
+        lag_text = f"{lag['p50']:.1f}/{lag['p99']:.1f}/{lag['max']:.1f}" if lag else "-"
+        print(
+            f"{r['driver']:<11}{r['concurrency']:>5}{r['episodes']:>6}{r['failed']:>5}"
+            f"{r['episodes_per_sec'] or 0:>8.3f}  {format_percentiles(r['episode_latency_seconds']):<22}"
+            f"{format_percentiles(r['turn_latency_seconds']):<20}{lag_text:<22}{r['peak_rss_mb']:>7}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.benchmark", description="Benchmark episode generation.")
+    parser.add_argument("--levels", default="1,4,16", help="comma-separated concurrency levels (default: 1,4,16)")
+    parser.add_argument("--episodes", type=int, default=0,
+                        help="episodes per level (default: twice the concurrency, at least 4)")
+    parser.add_argument("--drivers", default=",".join(DRIVERS), help=f"comma-separated, from {', '.join(DRIVERS)}")
+    parser.add_argument("--http-mode", choices=("sse", "json"), default="sse",
+                        help="POST /generate streamed (per-turn latency) or as one JSON response")
+    parser.add_argument("--topic", default="government_jobs", choices=list(TOPICS))
+    parser.add_argument("--tts", choices=("fake", "real", "off"), default="fake",
+                        help="fake espeak-ng shim (default), the installed engine, or text only")
+    parser.add_argument("--tts-cpu-ms", type=float, default=60.0,
+                        help="CPU each fake synthesis burns, in ms (default: 60)")
+    parser.add_argument("--speech-engine", choices=("auto", "cli"), default="auto",
+                        help="with --tts real: resident libespeak-ng workers when available, or one process per clip")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured episodes per driver first (default: 1)")
+    parser.add_argument("--groq-rpm", type=float, default=1e6, help="client rate limit during the run (default: unlimited)")
+    parser.add_argument("--groq-tpm", type=float, default=1e9, help="client token limit during the run (default: unlimited)")
+    parser.add_argument("--replay", metavar="DIR", default=None,
+                        help="answer from Groq fixtures recorded with GROQ_FIXTURES=record instead of the mock")
+    parser.add_argument("--replay-latency-scale", type=float, default=1.0,
+                        help="replayed latency = recorded latency x this (default: 1.0, 0 = instant)")
+    parser.add_argument("--workdir", default=None, help="where audio and episodes are written (default: a temp dir)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    add_mock_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        args.level_list = [int(v) for v in args.levels.split(",") if v.strip()]
+    except ValueError:
+        parser.error("--levels must be comma-separated integers")
+    args.driver_list = [d.strip() for d in args.drivers.split(",") if d.strip()]
+    if not args.level_list or min(args.level_list) < 1:
+        parser.error("--levels must be positive")
+    if not args.driver_list or set(args.driver_list) - set(DRIVERS):
+        parser.error(f"--drivers must be from {', '.join(DRIVERS)}")
+    if args.tts == "real" and not shutil.which("espeak-ng"):
+        parser.error("--tts real needs espeak-ng on PATH")
+    return args
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    args = parse_args(argv)
+    try:
+        mock = mock_from_args(args)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    if args.replay:
+        if not os.path.isdir(args.replay):
+            raise SystemExit(f"--replay: {args.replay} is not a directory")
+        groq_fixtures.GROQ_FIXTURES = "replay"
+        groq_fixtures.GROQ_FIXTURES_DIR = os.path.abspath(args.replay)
+        groq_fixtures.GROQ_REPLAY_LATENCY_SCALE = args.replay_latency_scale
+
+    if "http" in args.driver_list:
+        # app.main mounts app/static relative to the repository root: import it before leaving it
+        import app.main  # noqa: F401
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="roundtable-bench-")
+    os.makedirs(os.path.join(workdir, "tts_output"), exist_ok=True)
+    os.makedirs(os.path.join(workdir, "episodes_data"), exist_ok=True)
+    os.chdir(workdir)
+    if args.tts == "fake":
+        install_fake_espeak(os.path.join(workdir, "bin"), args.tts_cpu_ms)
+        # The shim replaces the command line; a real libespeak-ng must not take over
+        speech_engine.SPEECH_ENGINE = "cli"
+    else:
+        speech_engine.SPEECH_ENGINE = args.speech_engine
+
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    server = MockServer(mock)
+    server.start()
+    groq_client.GROQ_URL = server.url
+    groq_limiter.configure(rpm=args.groq_rpm, tpm=args.groq_tpm)
+    logger.info(f"Mock LLM at {server.url}, writing to {workdir}")
+
+    try:
+        results = asyncio.run(benchmark(args, mock))
+    finally:
+        server.stop()
+        speech_engine.shutdown_engine()
+
+    report = {
+        "revision": git_revision(),
+        "config": {
+            "topic": args.topic,
+            "tts": args.tts,
+            "tts_cpu_ms": args.tts_cpu_ms if args.tts == "fake" else None,
+            "speech_engine": speech_engine.get_engine_stats()["engine"],
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "tokens_per_sec": args.tokens_per_sec,
+            "error_rate": args.error_rate,
+            "shapes": args.shapes,
+            "replay": groq_fixtures.GROQ_FIXTURES_DIR if args.replay else None,
+            "replay_latency_scale": args.replay_latency_scale if args.replay else None,
+            "http_mode": args.http_mode,
+            "workdir": workdir,
+        },
+        "results": results,
+        "mock": mock.stats,
+        "fixtures": groq_fixtures.get_fixture_store().stats if args.replay else None,
+        "peak_rss_mb": round(peak_rss() / 2 ** 20, 1),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 1 if any(r["failed"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
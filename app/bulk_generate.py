@@ -0,0 +1,231 @@
+# bulk_generate.py
+"""
+Offline bulk episode generator.
+
+    python -m app.bulk_generate --count 40 --topics travel,tech_startup --concurrency 4
+
+Runs up to --concurrency roundtables at once on one event loop (LLM calls are
+async and share the Groq rate limiter), synthesizes speech in a process pool
+of --tts-workers, and records every episode through add_episode. Progress is
+checkpointed to --state after each episode, so re-running the same command
+after a crash or Ctrl-C only generates what is missing. Prints throughput at
+the end.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+from app import tts_client
+from app.audio_catalog import audio_catalog
+from app.episode_audio import schedule_episode_audio, wait_for_stitching
+from app.episodes import add_episode
+from app.groq_client import close_client, init_client
+from app.moderator import run_roundtable
+from app.rate_limiter import groq_limiter
+from app.speech_engine import engine_enabled, shutdown_engine
+from app.topics import TOPICS
+from app.transcoder import get_transcode_stats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = "episodes_data/bulk_state.json"
+
+
+def load_state(path: str, plan: dict, fresh: bool) -> dict:
+    """
+    Checkpoint for this plan. --count may grow between runs (episode i always
+    gets topics[i % len(topics)]); different topics or TTS need --fresh so
+    nothing is silently mixed.
+    """
+    if fresh or not os.path.exists(path):
+        return {"plan": plan, "done": {}}
+    with open(path, "r") as f:
+        state = json.load(f)
+    previous = state.get("plan") or {}
+    if (previous.get("topics"), previous.get("tts")) != (plan["topics"], plan["tts"]):
+        raise SystemExit(
+            f"{path} belongs to a different run ({previous}); "
+            "use the same topics and TTS setting to resume or --fresh to start over"
+        )
+    state["plan"] = plan
+    return state
+
+
+def save_state(path: str, state: dict):
+    """Write the checkpoint atomically so an interrupted run never leaves it half-written."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class BulkRun:
+    """Generates the missing episodes of a plan and collects throughput numbers."""
+
+    def __init__(self, plan: dict, state: dict, state_path: str, concurrency: int):
+        self.plan = plan
+        self.state = state
+        self.state_path = state_path
+        self.concurrency = concurrency
+        self.episodes = 0
+        self.turns = 0
+        self.failed = 0
+        self.llm_calls = 0
+        self.tokens = 0
+
+    def pending(self):
+        topics = self.plan["topics"]
+        return [
+            (i, topics[i % len(topics)])
+            for i in range(self.plan["count"])
+            if str(i) not in self.state["done"]
+        ]
+
+    async def run(self):
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def one(index, topic):
+            async with slots:
+                await self._generate(index, topic)
+
+        await asyncio.gather(*(one(i, topic) for i, topic in self.pending()))
+        await wait_for_stitching()
+
+    async def _generate(self, index: int, topic: str):
+        started = time.perf_counter()
+        try:
+            episode = await run_roundtable(tts_enabled=self.plan["tts"], topic_type=topic)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Episode {index} ({topic}) failed: {e}")
+            return
+
+        episode_id = await asyncio.to_thread(add_episode, episode["topic"], episode["turns"], episode.get("timeline"))
+        schedule_episode_audio(episode_id, episode["turns"])
+        self.state["done"][str(index)] = episode_id
+        save_state(self.state_path, self.state)
+
+        self.episodes += 1
+        self.turns += len(episode["turns"])
+        self.llm_calls += len(episode.get("llm_calls") or [])
+        self.tokens += sum(c.get("total_tokens") or 0 for c in episode.get("llm_calls") or [])
+        logger.info(
+            f"[{len(self.state['done'])}/{self.plan['count']}] episode {episode_id} ({topic}) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+
+def report(run: BulkRun, elapsed: float) -> dict:
+    tts = tts_client.get_tts_stats()
+    minutes = elapsed / 60 if elapsed > 0 else 0
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "episodes": run.episodes,
+        "failed": run.failed,
+        "remaining": run.plan["count"] - len(run.state["done"]),
+        "episodes_per_min": round(run.episodes / minutes, 2) if minutes else None,
+        "turns": run.turns,
+        "turns_per_sec": round(run.turns / elapsed, 2) if elapsed > 0 else None,
+        "llm_calls": run.llm_calls,
+        "llm_tokens": run.tokens,
+        "tts_clips": tts["completed"],
+        "tts_cache_hits": tts["cache_hits"],
+        "tts_failed": tts["failed"],
+        "tts_cpu_seconds": round(tts["cpu_seconds"], 2),
+        "transcoded": get_transcode_stats()["completed"],
+        "groq": groq_limiter.stats(),
+    }
+
+
+async def bulk_generate(plan: dict, state: dict, state_path: str, concurrency: int, tts_workers: int) -> dict:
+    await init_client()
+    await asyncio.to_thread(audio_catalog.rebuild)
+
+    pool = None
+    if engine_enabled():
+        # Resident libespeak-ng workers (app.speech_engine) already synthesize off the loop: just size them
+        tts_client.use_process_pool(None, concurrency=tts_workers)
+    else:
+        # spawn: pool workers only run synthesis commands, they must not inherit the event loop
+        pool = ProcessPoolExecutor(max_workers=tts_workers, mp_context=multiprocessing.get_context("spawn"))
+        tts_client.use_process_pool(pool, concurrency=tts_workers)
+    run = BulkRun(plan, state, state_path, concurrency)
+    started = time.perf_counter()
+    try:
+        await run.run()
+    finally:
+        elapsed = time.perf_counter() - started
+        tts_client.use_process_pool(None)
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        shutdown_engine()
+        await close_client()
+    return report(run, elapsed)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.bulk_generate", description="Generate episodes in bulk.")
+    parser.add_argument("--count", type=int, required=True, help="total episodes in the plan")
+    parser.add_argument("--topics", default=",".join(TOPICS),
+                        help="comma-separated topic keys, used round-robin (default: all)")
+    parser.add_argument("--concurrency", type=int, default=4, help="episodes generated at once (default: 4)")
+    parser.add_argument("--tts-workers", type=int, default=os.cpu_count() or 2,
+                        help="TTS process pool size (default: CPU count)")
+    parser.add_argument("--no-tts", action="store_true", help="text only")
+    parser.add_argument("--state", default=DEFAULT_STATE_FILE, help=f"checkpoint file (default: {DEFAULT_STATE_FILE})")
+    parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint and start over")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    topics = [t.strip() for t in args.topics.split(",") if t.strip()]
+    unknown = [t for t in topics if t not in TOPICS]
+    if unknown or not topics:
+        parser.error(f"unknown topics: {', '.join(unknown) or '(none given)'}; choose from {', '.join(TOPICS)}")
+    if args.count < 1 or args.concurrency < 1 or args.tts_workers < 1:
+        parser.error("--count, --concurrency and --tts-workers must be positive")
+    args.topic_list = topics
+    return args
+
+
+def main(argv=None):
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    args = parse_args(argv)
+
+    plan = {"count": args.count, "topics": args.topic_list, "tts": not args.no_tts}
+    state = load_state(args.state, plan, args.fresh)
+    save_state(args.state, state)
+    if len(state["done"]) >= args.count:
+        print(f"Nothing to do: all {args.count} episodes in {args.state} are done")
+        return 0
+
+    result = asyncio.run(bulk_generate(plan, state, args.state, args.concurrency, args.tts_workers))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(
+            f"\n{result['episodes']} episodes ({result['failed']} failed, {result['remaining']} remaining) "
+            f"in {result['elapsed_seconds']}s\n"
+            f"  episodes/min:    {result['episodes_per_min']}\n"
+            f"  turns/sec:       {result['turns_per_sec']}\n"
+            f"  LLM calls:       {result['llm_calls']} ({result['llm_tokens']} tokens)\n"
+            f"  TTS clips:       {result['tts_clips']} (+{result['tts_cache_hits']} cache hits, "
+            f"{result['tts_failed']} failed)\n"
+            f"  TTS CPU-seconds: {result['tts_cpu_seconds']}\n"
+            f"  transcoded:      {result['transcoded']}"
+        )
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,34 +2,261 @@
 
 import os
 import time
-from datetime import datetime, timedelta
 import logging
 
+from app.audio_catalog import TTS_OUTPUT_DIR, audio_catalog, primary_format, split_audio_name
+from app.episode_audio import EPISODE_AUDIO_DIR
+from app.episodes import modify_episodes
+from app.episode_store import DELETE, get_store
+from app.file_lock import file_lock
+from app.metrics import CLEANUP_DELETED, CLEANUP_EPISODES, CLEANUP_FREED_BYTES
+
 logger = logging.getLogger(__name__)
 
-RETENTION_DAYS = 30
-
-
-def cleanup_old_audio_files(folder="tts_output"):
-    """Delete audio files older than RETENTION_DAYS"""
-    if not os.path.exists(folder):
-        return
-    
-    cutoff_time = time.time() - (RETENTION_DAYS * 24 * 60 * 60)
-    deleted_count = 0
-    
-    try:
-        for filename in os.listdir(folder):
-            filepath = os.path.join(folder, filename)
-            if os.path.isfile(filepath):
-                file_mtime = os.path.getmtime(filepath)
-                if file_mtime < cutoff_time:
-                    os.remove(filepath)
-                    deleted_count += 1
-                    logger.info(f"Deleted old audio file: {filename}")
-        
-        if deleted_count > 0:
-            logger.info(f"Cleanup complete: {deleted_count} files deleted")
-        
-    except Exception as e:
-        logger.error(f"Error during cleanup: {e}")
+# Referenced audio not refreshed (re-synthesized or re-used) for this long is deleted; 0 keeps it forever
+RETENTION_DAYS = float(os.getenv("CLEANUP_RETENTION_DAYS", "30"))
+# Unreferenced files younger than this may belong to a generation still in progress
+ORPHAN_GRACE_MINUTES = float(os.getenv("CLEANUP_ORPHAN_GRACE_MINUTES", "60"))
+# How often the scheduler runs cleanup
+CLEANUP_INTERVAL_MINUTES = float(os.getenv("CLEANUP_INTERVAL_MINUTES", "60"))
+# Directory entries handled per batch
+CLEANUP_BATCH = int(os.getenv("CLEANUP_BATCH", "500"))
+# Episodes whose audio is gone: "mark" (drop the missing files, count them in missing_audio),
+# "prune" (delete episodes left with no audio at all, mark the rest) or "keep"
+CLEANUP_DANGLING = os.getenv("CLEANUP_DANGLING", "mark")
+# Held while a cleanup runs, so the leader's scheduled run and POST /api/cleanup in any worker never overlap
+CLEANUP_LOCK_FILE = os.getenv("CLEANUP_LOCK_FILE", os.path.join("episodes_data", "cleanup.lock"))
+_last_stats = None
+
+
+def get_cleanup_stats():
+    """Stats of the most recent cleanup run in this process (None before the first)."""
+    return _last_stats
+
+
+def scan_batches(folder: str, batch_size: int = CLEANUP_BATCH):
+    """Yield the regular files in folder as lists of os.DirEntry, one os.scandir pass."""
+    batch = []
+    with os.scandir(folder) as it:
+        for de in it:
+            if not de.is_file(follow_symlinks=False):
+                continue
+            batch.append(de)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def collect_references(episodes) -> tuple:
+    """(clip stems, stitched file names) referenced by the given episodes."""
+    stems = set()
+    stitched = set()
+    for ep in episodes:
+        for path in ep.get("audio_files") or []:
+            stems.add(split_audio_name(path.rsplit("/", 1)[-1])[0])
+        for variants in ep.get("audio_variants") or []:
+            for path in variants.values():
+                stems.add(split_audio_name(path.rsplit("/", 1)[-1])[0])
+        if (ep.get("audio") or {}).get("file"):
+            stitched.add(ep["audio"]["file"])
+    return stems, stitched
+
+
+class CleanupRun:
+    """One pass over the audio folders and the episode store."""
+
+    def __init__(self, folder: str, dry_run: bool):
+        self.folder = folder
+        self.stitched_folder = EPISODE_AUDIO_DIR if os.path.abspath(folder) == os.path.abspath(TTS_OUTPUT_DIR) \
+            else os.path.join(folder, "episodes")
+        self.dry_run = dry_run
+        self.now = time.time()
+        self.retention = RETENTION_DAYS * 86400
+        self.grace = ORPHAN_GRACE_MINUTES * 60
+        self.present = {}           # clip stem -> {format: name} still on disk after this run
+        self.present_stitched = set()
+        # What the sweep was told to look for; audio referenced only later (e.g. newly stitched) is not judged
+        self.referenced = set()
+        self.referenced_stitched = set()
+        self.stats = {
+            "dry_run": dry_run,
+            "scanned": 0,
+            "kept": 0,
+            "deleted_orphans": 0,
+            "deleted_expired": 0,
+            "deleted_temp": 0,
+            "young_orphans": 0,
+            "bytes_freed": 0,
+            "errors": 0,
+            "episodes_marked": 0,
+            "episodes_pruned": 0,
+        }
+
+    def _remove(self, folder: str, de, reason: str, size: int):
+        if not self.dry_run:
+            before = audio_catalog.dir_version()
+            try:
+                os.remove(de.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.stats["errors"] += 1
+                logger.error(f"Could not delete {de.path}: {e}")
+                return False
+            if audio_catalog.owns(folder):
+                audio_catalog.discard(de.name, before)
+            CLEANUP_DELETED.inc(reason=reason)
+            CLEANUP_FREED_BYTES.inc(size)
+        self.stats[f"deleted_{reason}"] += 1
+        self.stats["bytes_freed"] += size
+        logger.debug(f"{'Would delete' if self.dry_run else 'Deleted'} {reason} file {de.path}")
+        return True
+
+    def _classify(self, de, referenced: bool):
+        """'temp', 'expired', 'orphans' or None to keep."""
+        age = self.now - de.stat().st_mtime
+        if de.name.startswith("."):
+            # Temp file of an interrupted synthesis/transcode
+            return "temp" if age > self.grace else None
+        if referenced:
+            return "expired" if self.retention and age > self.retention else None
+        if age > self.grace:
+            return "orphans"
+        self.stats["young_orphans"] += 1
+        return None
+
+    def sweep(self, folder: str, is_referenced, on_keep):
+        if not os.path.isdir(folder):
+            return
+        for batch in scan_batches(folder):
+            for de in batch:
+                self.stats["scanned"] += 1
+                try:
+                    size = de.stat().st_size
+                    reason = self._classify(de, is_referenced(de.name))
+                except FileNotFoundError:
+                    continue
+                if reason is None or not self._remove(folder, de, reason, size):
+                    self.stats["kept"] += 1
+                    on_keep(de.name)
+
+    def _keep_clip(self, name):
+        if not name.startswith("."):
+            stem, fmt = split_audio_name(name)
+            self.present.setdefault(stem, {})[fmt] = name
+
+    def run(self, episodes: list):
+        stems, stitched = collect_references(episodes)
+        self.referenced, self.referenced_stitched = stems, stitched
+        self.sweep(self.folder, lambda name: split_audio_name(name)[0] in stems, self._keep_clip)
+        self.sweep(self.stitched_folder, lambda name: name in stitched, self.present_stitched.add)
+        self.reconcile(episodes)
+        return self.stats
+
+    def _fix_episode(self, ep: dict):
+        """Copy of ep limited to the audio still on disk, or None if nothing changed."""
+        audio_files = []
+        audio_variants = []
+        missing = 0
+        recorded_variants = ep.get("audio_variants") or []
+        for i, path in enumerate(ep.get("audio_files") or []):
+            stem = split_audio_name(path.rsplit("/", 1)[-1])[0]
+            if stem not in self.referenced:
+                audio_files.append(path)
+                if i < len(recorded_variants):
+                    audio_variants.append(recorded_variants[i])
+                continue
+            formats = self.present.get(stem)
+            if not formats:
+                missing += 1
+                continue
+            audio_files.append(f"/tts_output/{formats[primary_format(formats)]}")
+            if i < len(recorded_variants):
+                audio_variants.append({fmt: f"/tts_output/{name}" for fmt, name in formats.items()})
+
+        audio = ep.get("audio")
+        drop_audio = bool(audio) and audio.get("file") in self.referenced_stitched \
+            and audio.get("file") not in self.present_stitched
+        if audio_files == (ep.get("audio_files") or []) and not drop_audio:
+            return None
+
+        fixed = dict(ep, audio_files=audio_files)
+        if "audio_variants" in ep:
+            fixed["audio_variants"] = audio_variants
+        if drop_audio:
+            fixed.pop("audio")
+        if missing:
+            fixed["missing_audio"] = (ep.get("missing_audio") or 0) + missing
+        return fixed
+
+    def _resolve(self, ep: dict):
+        """ep limited to the audio on disk, DELETE if it is to be pruned, or None if unchanged."""
+        fixed = self._fix_episode(ep)
+        current = fixed or ep
+        # Pruning only removes episodes that lost all their audio (text-only episodes stay)
+        lost_all = current.get("missing_audio") and not current.get("audio_files") and not current.get("audio")
+        if CLEANUP_DANGLING == "prune" and lost_all:
+            return DELETE
+        return fixed
+
+    def reconcile(self, episodes: list):
+        """Mark or prune episodes that point at audio which no longer exists."""
+        if CLEANUP_DANGLING == "keep":
+            return
+        planned = [(ep["id"], self._resolve(ep)) for ep in episodes]
+        planned = [(episode_id, result) for episode_id, result in planned if result is not None]
+
+        if self.dry_run:
+            marked = sum(1 for _, result in planned if result is not DELETE)
+            pruned = len(planned) - marked
+        else:
+            # Resolved again against the stored copy: stitching or another worker may have
+            # written these episodes since the snapshot this run started from
+            marked, pruned = modify_episodes([episode_id for episode_id, _ in planned], self._resolve)
+            CLEANUP_EPISODES.inc(marked, action="marked")
+            CLEANUP_EPISODES.inc(pruned, action="pruned")
+        self.stats["episodes_marked"] = marked
+        self.stats["episodes_pruned"] = pruned
+
+
+def run_cleanup(folder: str = TTS_OUTPUT_DIR, dry_run: bool = False) -> dict:
+    """
+    Reference-aware cleanup. Blocking: call from a thread (scheduler job or
+    asyncio.to_thread), never directly on the event loop.
+
+    Deletes unreferenced audio older than the grace period, referenced audio
+    past retention and stale temp files, then marks or prunes episodes whose
+    audio is gone. With dry_run nothing is deleted or rewritten; the stats
+    show what would have been.
+    """
+    global _last_stats
+    with file_lock(CLEANUP_LOCK_FILE, blocking=False) as acquired:
+        if not acquired:
+            return {"skipped": "cleanup already running"}
+        started = time.perf_counter()
+        episodes = list(get_store().all())
+        run = CleanupRun(folder, dry_run)
+        try:
+            stats = run.run(episodes)
+        except Exception as e:
+            logger.error(f"Error during cleanup: {e}", exc_info=True)
+            stats = dict(run.stats, error=str(e))
+        stats["episodes"] = len(episodes)
+        stats["duration_seconds"] = round(time.perf_counter() - started, 3)
+        stats["finished_at"] = time.time()
+        _last_stats = stats
+
+        deleted = stats["deleted_orphans"] + stats["deleted_expired"] + stats["deleted_temp"]
+        if deleted or stats["episodes_marked"] or stats["episodes_pruned"]:
+            logger.info(
+                f"Cleanup{' (dry run)' if dry_run else ''}: {deleted} files, {stats['bytes_freed']} bytes, "
+                f"{stats['episodes_marked']} episodes marked, {stats['episodes_pruned']} pruned"
+            )
+        return stats
+
+
+def cleanup_old_audio_files(folder=TTS_OUTPUT_DIR):
+    """Scheduler entry point (kept for compatibility): run a full cleanup."""
+    return run_cleanup(folder)
@@ -0,0 +1,120 @@
+# context.py
+
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on estimated input tokens (system + user prompt) per Groq call
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))
+# Most recent entries kept verbatim; older ones are folded into the summary
+RECENT_ENTRIES = int(os.getenv("CONTEXT_RECENT_ENTRIES", "6"))
+# Older entries kept (as one-line gists) in the rolling summary
+SUMMARY_ENTRIES = int(os.getenv("CONTEXT_SUMMARY_ENTRIES", "8"))
+# Words kept per entry in the rolling summary
+SUMMARY_WORDS = 12
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def gist(message: str, words: int = SUMMARY_WORDS) -> str:
+    """First sentence of a message, clipped to a few words."""
+    first = _SENTENCE_END.split(message.strip(), 1)[0]
+    parts = first.split()
+    if len(parts) > words:
+        return " ".join(parts[:words]) + "..."
+    return first
+
+
+class ConversationContext:
+    """
+    Token-budgeted prompt builder for one episode.
+
+    The system prompt and the spec's precompiled prompt parts are fixed per
+    topic; what is left of PROMPT_TOKEN_BUDGET goes to history. The newest
+    entries are sent verbatim, anything older is replaced by a rolling
+    one-line-per-entry summary (itself trimmed to fit). If the full guidance
+    does not fit, the spec's compact tail is used instead. Each call's
+    estimated and actual `usage` is recorded in `calls`.
+    """
+
+    def __init__(self, spec, budget: int = None, recent: int = None):
+        self.spec = spec
+        self.budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+        self.recent = RECENT_ENTRIES if recent is None else recent
+        self.summary = []       # gist lines for entries no longer sent verbatim
+        self.summarized = 0     # number of turns already folded into the summary
+        self.calls = []
+
+        self.system_tokens = estimate_tokens(spec.system_prompt)
+        self.head_tokens = estimate_tokens(spec.prompt_head)
+        self.tail = spec.prompt_tail
+        if self.system_tokens + self.head_tokens + estimate_tokens(self.tail) > self.budget // 2:
+            self.tail = spec.prompt_tail_compact
+        self.tail_tokens = estimate_tokens(self.tail)
+
+    def _fold(self, turns, upto):
+        """Move turns[summarized:upto] into the rolling summary."""
+        for t in turns[self.summarized:upto]:
+            self.summary.append(f"{t['speaker']}: {gist(t['message'])}")
+        del self.summary[:-SUMMARY_ENTRIES or None]
+        self.summarized = max(self.summarized, upto)
+
+    def build_history(self, turns) -> str:
+        available = self.budget - self.system_tokens - self.head_tokens - self.tail_tokens
+
+        # Newest entries verbatim, as many as fit (up to self.recent, never re-sending summarized ones)
+        recent = []
+        used = 0
+        start = max(self.summarized, len(turns) - self.recent)
+        for t in reversed(turns[start:]):
+            line = f"{t['speaker']}: {t['message']}\n"
+            cost = estimate_tokens(line)
+            if used + cost > available:
+                break
+            recent.append(line)
+            used += cost
+        recent.reverse()
+
+        self._fold(turns, len(turns) - len(recent))
+
+        # Rolling summary of everything older, newest lines kept first
+        summary = []
+        for line in reversed(self.summary):
+            cost = estimate_tokens(line) + 1
+            if used + cost > available:
+                break
+            summary.append(line)
+            used += cost
+        summary.reverse()
+
+        history = ""
+        if summary:
+            history = "Earlier (summary): " + " | ".join(summary) + "\n"
+        return history + "".join(recent)
+
+    def build_messages(self, turns) -> list:
+        history = self.build_history(turns)
+        return [
+            {"role": "system", "content": self.spec.system_prompt},
+            {"role": "user", "content": self.spec.prompt_head + history + self.tail},
+        ]
+
+    def record(self, messages, usage: dict = None) -> dict:
+        """Store estimated vs. actual token usage for one call."""
+        usage = usage or {}
+        call = {
+            "estimated_prompt_tokens": sum(estimate_tokens(m["content"]) for m in messages),
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+            "total_tokens": usage.get("total_tokens"),
+        }
+        self.calls.append(call)
+        logger.debug(f"LLM call {len(self.calls)} for {self.spec.key}: {call}")
+        return call
@@ -0,0 +1,196 @@
+# episode_audio.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+import wave
+
+from app.audio_catalog import MEDIA_TYPES, SOURCE_FORMATS, TTS_OUTPUT_DIR
+from app.episodes import get_episode, modify_episodes, refresh_audio_variants
+from app.transcoder import (
+    ENCODERS,
+    FFMPEG,
+    audio_variants,
+    container_args,
+    ffmpeg_available,
+    run_ffmpeg,
+    transcoding_enabled,
+    wait_for_variants,
+)
+
+logger = logging.getLogger(__name__)
+
+# Concatenate each new episode's clips into one compressed file after it is recorded
+STITCH_EPISODE_AUDIO = os.getenv("STITCH_EPISODE_AUDIO", "true").lower() in ("1", "true", "yes")
+STITCH_FORMAT = os.getenv("STITCH_FORMAT", "opus")
+# Silence between turns, in seconds
+STITCH_GAP = float(os.getenv("STITCH_GAP", "0.35"))
+STITCH_SAMPLE_RATE = 24000
+EPISODE_AUDIO_DIR = os.path.join(TTS_OUTPUT_DIR, "episodes")
+FFPROBE = os.getenv("FFPROBE", "ffprobe")
+
+_tasks = set()
+
+
+def clip_path(url: str):
+    """Best file on disk for a recorded clip: the uncompressed source if kept, else a variant."""
+    variants = audio_variants(url.rsplit("/", 1)[-1], TTS_OUTPUT_DIR)
+    for fmt in (*SOURCE_FORMATS, *variants):
+        if fmt in variants:
+            return os.path.join(TTS_OUTPUT_DIR, variants[fmt])
+    return None
+
+
+async def clip_duration(path: str) -> float:
+    """Clip length in seconds: from the WAV header when possible, else via ffprobe."""
+    if path.endswith(".wav"):
+        try:
+            with wave.open(path, "rb") as w:
+                return w.getnframes() / float(w.getframerate())
+        except (wave.Error, EOFError, OSError):
+            pass
+    out = await run_ffmpeg([
+        FFPROBE, "-v", "error", "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", path,
+    ])
+    return float(out.decode().strip() or 0)
+
+
+def stitched_filename(paths: list, fmt: str) -> str:
+    """Content-addressed: the same clips, gap and format always map to the same file."""
+    key = json.dumps([fmt, STITCH_GAP, STITCH_SAMPLE_RATE, [os.path.basename(p) for p in paths]])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + f".{fmt}"
+
+
+def build_stitch_command(paths: list, out_path: str, fmt: str) -> list:
+    """One ffmpeg run: resample every clip to mono, pad all but the last with silence, concatenate, encode."""
+    inputs = []
+    chains = []
+    for i, path in enumerate(paths):
+        inputs += ["-i", path]
+        chain = f"[{i}:a]aresample={STITCH_SAMPLE_RATE},aformat=sample_fmts=s16:channel_layouts=mono"
+        if i < len(paths) - 1 and STITCH_GAP > 0:
+            chain += f",apad=pad_dur={STITCH_GAP}"
+        chains.append(f"{chain}[a{i}]")
+    concat = "".join(f"[a{i}]" for i in range(len(paths))) + f"concat=n={len(paths)}:v=0:a=1[out]"
+    return [FFMPEG, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", *inputs,
+            "-filter_complex", ";".join(chains + [concat]), "-map", "[out]",
+            *container_args(fmt), out_path]
+
+
+def chapter_offsets(speakers: list, durations: list) -> list:
+    """Start/end (seconds) of each turn in the stitched file."""
+    chapters = []
+    start = 0.0
+    for i, (speaker, duration) in enumerate(zip(speakers, durations)):
+        end = start + duration
+        chapters.append({"turn": i, "speaker": speaker, "start": round(start, 3), "end": round(end, 3)})
+        start = end + STITCH_GAP
+    return chapters
+
+
+async def stitch_episode_audio(episode_id: str, speakers: list) -> dict:
+    """
+    Concatenate an episode's clips into one file and attach it to the episode.
+
+    speakers lines up with the episode's audio_files (one per voiced turn).
+    Returns the "audio" metadata stored on the episode, or None if there was
+    nothing to stitch.
+    """
+    episode = await asyncio.to_thread(get_episode, episode_id)
+    if episode is None:
+        return None
+
+    clips = [(clip_path(url), speaker) for url, speaker in zip(episode.get("audio_files") or [], speakers)]
+    clips = [(path, speaker) for path, speaker in clips if path]
+    if not clips:
+        return None
+    paths = [path for path, _ in clips]
+
+    fmt = STITCH_FORMAT if STITCH_FORMAT in ENCODERS else "opus"
+    os.makedirs(EPISODE_AUDIO_DIR, exist_ok=True)
+    name = stitched_filename(paths, fmt)
+    out_path = os.path.join(EPISODE_AUDIO_DIR, name)
+
+    durations = await asyncio.gather(*(clip_duration(p) for p in paths))
+
+    if os.path.exists(out_path):
+        os.utime(out_path)
+    else:
+        tmp_path = os.path.join(EPISODE_AUDIO_DIR, f".{name}.{uuid.uuid4().hex}.tmp")
+        try:
+            await run_ffmpeg(build_stitch_command(paths, tmp_path, fmt))
+            os.replace(tmp_path, out_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    chapters = chapter_offsets([speaker for _, speaker in clips], durations)
+    audio = {
+        "url": f"/api/episodes/{episode_id}/audio",
+        "file": name,
+        "format": fmt,
+        "media_type": MEDIA_TYPES[fmt][0],
+        "size": os.path.getsize(out_path),
+        "duration": chapters[-1]["end"],
+        "chapters": chapters,
+    }
+
+    # Applied to the stored copy: the episode may have been rewritten (e.g. by cleanup) while ffmpeg ran.
+    # The JSON store locks the file across workers: keep that wait off the event loop
+    updated, _ = await asyncio.to_thread(modify_episodes, [episode_id], lambda ep: dict(ep, audio=audio))
+    if not updated:
+        return None
+    logger.info(f"Stitched audio for episode {episode_id}: {len(chapters)} turns, {audio['size']} bytes")
+    return audio
+
+
+async def finish_episode_audio(episode_id: str, turns: list, speakers: list):
+    """Record the clips' Opus/MP3 variants once they land, then stitch the episode."""
+    if transcoding_enabled():
+        await wait_for_variants(t["tts"] for t in turns)
+        await asyncio.to_thread(refresh_audio_variants, episode_id)
+    if STITCH_EPISODE_AUDIO:
+        await stitch_episode_audio(episode_id, speakers)
+
+
+def schedule_episode_audio(episode_id: str, turns: list):
+    """
+    Finish a just-recorded episode's audio in the background: record its
+    transcoded variants and stitch it (no-op without ffmpeg). Generation
+    does not wait for either.
+    """
+    if not ffmpeg_available():
+        return
+    speakers = [t["speaker"] for t in turns if t.get("tts")]
+    if not speakers:
+        return
+
+    task = asyncio.ensure_future(finish_episode_audio(episode_id, turns, speakers))
+    _tasks.add(task)
+
+    def _done(t):
+        _tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.error(f"Finishing audio for episode {episode_id} failed: {t.exception()!r}")
+
+    task.add_done_callback(_done)
+
+
+async def wait_for_stitching():
+    """Wait for every scheduled variant update and stitch to finish (used before shutting down a batch run)."""
+    if _tasks:
+        await asyncio.gather(*list(_tasks), return_exceptions=True)
+
+
+def episode_audio_path(episode: dict):
+    """Filesystem path of an episode's stitched audio, if it has one on disk."""
+    audio = episode.get("audio") or {}
+    name = audio.get("file")
+    if not name or os.path.basename(name) != name:
+        return None
+    path = os.path.join(EPISODE_AUDIO_DIR, name)
+    return path if os.path.exists(path) else None
@@ -0,0 +1,59 @@
+# episode_cache.py
+
+import gzip
+import hashlib
+import threading
+import orjson
+
+from app.episodes import episodes_version, get_all_episodes
+
+
+class EpisodeListCache:
+    """
+    Pre-serialized /api/episodes payload.
+
+    Holds the deduped episode list as orjson bytes plus a gzip variant and an
+    ETag, rebuilt only when episodes_version() changes (a local add_episode
+    or a write to the store file by another worker).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._entry = None
+
+    def get(self) -> dict:
+        version = episodes_version()
+        entry = self._entry
+        if entry is not None and self._version == version:
+            return entry
+
+        with self._lock:
+            if self._entry is not None and self._version == version:
+                return self._entry
+
+            episodes = get_all_episodes()
+            body = orjson.dumps({"episodes": episodes})
+            entry = {
+                "episodes": episodes,
+                "body": body,
+                "gzip": gzip.compress(body, compresslevel=6),
+                "etag": '"' + hashlib.sha1(body).hexdigest()[:20] + '"',
+            }
+            self._entry = entry
+            self._version = version
+            return entry
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """True if an If-None-Match header value covers the given ETag."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+episode_list_cache = EpisodeListCache()
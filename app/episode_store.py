@@ -0,0 +1,371 @@
+# episode_store.py
+
+import os
+import json
+import sqlite3
+import threading
+import logging
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from app.file_lock import file_lock
+from app.metrics import STORE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# "sqlite" (default) or "json" for the legacy whole-file episodes.json store
+EPISODE_STORE = os.getenv("EPISODE_STORE", "sqlite")
+EPISODES_FILE = os.getenv("EPISODES_FILE", "episodes.json")
+EPISODES_DB = os.getenv("EPISODES_DB", os.path.join("episodes_data", "episodes.db"))
+
+# update_many callbacks return this to delete the episode
+DELETE = object()
+
+
+def load_json_episodes(path: str) -> dict:
+    """Load the {id: episode} mapping from a JSON file"""
+    if os.path.exists(path):
+        with STORE_SECONDS.time(store="json", op="load"):
+            try:
+                with open(path, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+    return {}
+
+
+def save_json_episodes(path: str, episodes: dict):
+    """
+    Write the {id: episode} mapping to a JSON file: a temp file in the same
+    directory renamed over it, so readers see the old or the new catalog,
+    never a partial one. Use json_episodes_locked() around read-modify-write.
+    """
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    try:
+        with STORE_SECONDS.time(store="json", op="save"):
+            with open(tmp_path, 'w') as f:
+                json.dump(episodes, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextmanager
+def json_episodes_locked(path: str):
+    """
+    Load path under an exclusive lock shared by all processes; yields the
+    mapping, saved on exit unless the block raised.
+    """
+    with file_lock(path + ".lock"):
+        episodes = load_json_episodes(path)
+        yield episodes
+        save_json_episodes(path, episodes)
+
+
+def file_version(*paths) -> tuple:
+    """Cheap change token: (mtime_ns, size) of each path, or None if missing."""
+    version = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            version.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+def has_audio(episode: dict) -> bool:
+    return len(episode.get("audio_files", []) or []) > 0
+
+
+def dedupe_by_topic(episodes) -> List[dict]:
+    """Newest episode per topic (preferring ones with audio), newest first."""
+    sorted_episodes = sorted(
+        episodes,
+        key=lambda x: x.get("created_at", ""),
+        reverse=True
+    )
+
+    # Deduplicate by topic, prefer entries with audio
+    best_by_topic = {}
+    for ep in sorted_episodes:
+        topic = ep.get("topic", "Unknown")
+        current = best_by_topic.get(topic)
+        if not current:
+            best_by_topic[topic] = ep
+            continue
+
+        # Prefer episodes that actually have audio files
+        if has_audio(ep) and not has_audio(current):
+            best_by_topic[topic] = ep
+
+    # Return in newest-first order while keeping only one per topic
+    deduped = []
+    added = set()
+    for ep in sorted_episodes:
+        topic = ep.get("topic", "Unknown")
+        if topic in added:
+            continue
+        if best_by_topic.get(topic) is ep:
+            deduped.append(ep)
+            added.add(topic)
+
+    return deduped
+
+
+class JsonEpisodeStore:
+    """
+    Legacy store: the whole catalog lives in one JSON file, rewritten on every
+    insert. Writes lock <path>.lock, so several API workers can share it.
+    """
+
+    def __init__(self, path: str = EPISODES_FILE):
+        self.path = path
+
+    def get(self, episode_id: str) -> Optional[dict]:
+        return load_json_episodes(self.path).get(episode_id)
+
+    def put(self, episode: dict):
+        self.put_many([episode])
+
+    def insert(self, episode: dict) -> bool:
+        """Store a new episode; False (nothing written) if its id is taken."""
+        with file_lock(self.path + ".lock"):
+            stored = load_json_episodes(self.path)
+            if episode["id"] in stored:
+                return False
+            stored[episode["id"]] = episode
+            save_json_episodes(self.path, stored)
+        return True
+
+    def put_many(self, episodes):
+        with json_episodes_locked(self.path) as stored:
+            for ep in episodes:
+                stored[ep["id"]] = ep
+
+    def update_many(self, episode_ids, update) -> tuple:
+        """
+        Re-read each episode and store update(episode): a replacement, None to
+        leave it, or DELETE. One locked read-modify-write, so concurrent writes
+        are never overwritten with a stale copy. Returns (updated, deleted).
+        """
+        updated = deleted = 0
+        with json_episodes_locked(self.path) as stored:
+            for episode_id in episode_ids:
+                if episode_id not in stored:
+                    continue
+                result = update(stored[episode_id])
+                if result is DELETE:
+                    del stored[episode_id]
+                    deleted += 1
+                elif result is not None:
+                    stored[episode_id] = result
+                    updated += 1
+        return updated, deleted
+
+    def delete_many(self, episode_ids):
+        with json_episodes_locked(self.path) as stored:
+            for episode_id in episode_ids:
+                stored.pop(episode_id, None)
+
+    def all(self) -> Iterator[dict]:
+        return iter(load_json_episodes(self.path).values())
+
+    def latest_per_topic(self) -> List[dict]:
+        return dedupe_by_topic(self.all())
+
+    def version(self) -> tuple:
+        return file_version(self.path)
+
+
+class SqliteEpisodeStore:
+    """
+    Embedded SQLite store (WAL mode).
+
+    Each episode is one row holding its JSON document plus the indexed columns
+    used for lookups, so inserts and per-topic listings stay O(log n).
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS episodes (
+        id TEXT PRIMARY KEY,
+        topic TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        has_audio INTEGER NOT NULL DEFAULT 0,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_episodes_topic ON episodes(topic, has_audio, created_at);
+    CREATE INDEX IF NOT EXISTS idx_episodes_created_at ON episodes(created_at);
+    CREATE TABLE IF NOT EXISTS topics (topic TEXT PRIMARY KEY);
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, path: str = EPISODES_DB):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (FastAPI runs sync endpoints in a threadpool)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, episode_id: str) -> Optional[dict]:
+        with STORE_SECONDS.time(store="sqlite", op="get"):
+            row = self._connect().execute(
+                "SELECT data FROM episodes WHERE id = ?", (episode_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, episode: dict):
+        self.put_many([episode])
+
+    def insert(self, episode: dict) -> bool:
+        """Store a new episode; False (nothing written) if its id is taken."""
+        try:
+            self._write([episode], "INSERT")
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def put_many(self, episodes):
+        self._write(episodes, "INSERT OR REPLACE")
+
+    def _write(self, episodes, verb: str):
+        with STORE_SECONDS.time(store="sqlite", op="save"), self._connect() as conn:
+            self._write_rows(conn, episodes, verb)
+
+    @staticmethod
+    def _write_rows(conn, episodes, verb: str):
+        rows = [
+            (
+                ep["id"],
+                ep.get("topic", "Unknown"),
+                ep.get("created_at", ""),
+                int(has_audio(ep)),
+                json.dumps(ep),
+            )
+            for ep in episodes
+        ]
+        conn.executemany(
+            f"{verb} INTO episodes (id, topic, created_at, has_audio, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO topics (topic) VALUES (?)",
+            {(row[1],) for row in rows},
+        )
+
+    def update_many(self, episode_ids, update) -> tuple:
+        """
+        Re-read each episode and store update(episode): a replacement, None to
+        leave it, or DELETE. Runs in one write transaction, so concurrent writes
+        are never overwritten with a stale copy. Returns (updated, deleted).
+        """
+        replaced = []
+        deleted = []
+        with STORE_SECONDS.time(store="sqlite", op="update"), self._connect() as conn:
+            # Take the write lock before reading, so nobody writes between our read and write
+            conn.execute("BEGIN IMMEDIATE")
+            for episode_id in episode_ids:
+                row = conn.execute("SELECT data FROM episodes WHERE id = ?", (episode_id,)).fetchone()
+                if row is None:
+                    continue
+                result = update(json.loads(row[0]))
+                if result is DELETE:
+                    deleted.append(episode_id)
+                elif result is not None:
+                    replaced.append(result)
+            self._write_rows(conn, replaced, "INSERT OR REPLACE")
+            if deleted:
+                self._delete_rows(conn, deleted)
+        return len(replaced), len(deleted)
+
+    def delete_many(self, episode_ids):
+        with self._connect() as conn:
+            self._delete_rows(conn, episode_ids)
+
+    @staticmethod
+    def _delete_rows(conn, episode_ids):
+        conn.executemany("DELETE FROM episodes WHERE id = ?", [(i,) for i in episode_ids])
+        conn.execute("DELETE FROM topics WHERE topic NOT IN (SELECT DISTINCT topic FROM episodes)")
+
+    def all(self) -> Iterator[dict]:
+        cursor = self._connect().execute("SELECT data FROM episodes ORDER BY created_at DESC")
+        for (data,) in cursor:
+            yield json.loads(data)
+
+    def latest_per_topic(self) -> List[dict]:
+        conn = self._connect()
+        latest = []
+        with STORE_SECONDS.time(store="sqlite", op="latest_per_topic"):
+            topics = [row[0] for row in conn.execute("SELECT topic FROM topics")]
+            for topic in topics:
+                # Index walk: newest episode with audio, else newest overall
+                row = conn.execute(
+                    "SELECT data FROM episodes WHERE topic = ? "
+                    "ORDER BY has_audio DESC, created_at DESC LIMIT 1",
+                    (topic,),
+                ).fetchone()
+                if row:
+                    latest.append(json.loads(row[0]))
+        return sorted(latest, key=lambda x: x.get("created_at", ""), reverse=True)
+
+    def version(self) -> tuple:
+        # Commits from any process touch the main file or its write-ahead log
+        return file_version(self.path, self.path + "-wal")
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def migrate_json_to_sqlite(json_path: str, store: SqliteEpisodeStore) -> int:
+    """One-time import of a legacy episodes.json into SQLite. Returns rows imported."""
+    if store.get_meta("json_migrated"):
+        return 0
+
+    episodes = load_json_episodes(json_path)
+    valid = [ep for ep in episodes.values() if isinstance(ep, dict) and ep.get("id")]
+    if valid:
+        store.put_many(valid)
+        logger.info(f"Migrated {len(valid)} episodes from {json_path} to {store.path}")
+    store.set_meta("json_migrated", json_path)
+    return len(valid)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the configured episode store, creating (and migrating) it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if EPISODE_STORE == "json":
+                    _store = JsonEpisodeStore(EPISODES_FILE)
+                else:
+                    store = SqliteEpisodeStore(EPISODES_DB)
+                    migrate_json_to_sqlite(EPISODES_FILE, store)
+                    _store = store
+    return _store
@@ -1,116 +1,137 @@
 # episodes.py
 
-import os
-import json
 from datetime import datetime
 from typing import List
-from pathlib import Path
 
-EPISODES_FILE = "episodes.json"
-TTS_OUTPUT_DIR = "tts_output"
+from app.episode_store import get_store
+from app.audio_catalog import TTS_OUTPUT_DIR, audio_catalog, split_audio_name
+from app.transcoder import audio_variants, primary_variant
 
+# Bumped on every local write so caches can tell the catalog changed
+_generation = 0
+# Last id handed out here, so episodes recorded within the same millisecond stay distinct
+# (ids taken by other processes are skipped when the store rejects the insert)
+_last_id = 0
+# Bulky per-episode fields left out of list views (served by their own endpoints)
+DETAIL_ONLY_FIELDS = ("timeline",)
 
-def load_episodes() -> dict:
-    """Load episodes metadata"""
-    if os.path.exists(EPISODES_FILE):
-        try:
-            with open(EPISODES_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
 
+def add_episode(topic: str, turns: list, timeline: dict = None) -> str:
+    """
+    Add a new episode and return episode ID (timeline: run_roundtable's stage spans).
+    Blocking (the JSON store waits for its cross-process lock): call via asyncio.to_thread.
+    """
+    global _last_id
 
-def save_episodes(episodes: dict):
-    """Save episodes metadata"""
-    with open(EPISODES_FILE, 'w') as f:
-        json.dump(episodes, f, indent=2)
-
-
-def add_episode(topic: str, turns: list) -> str:
-    """Add a new episode and return episode ID"""
-    episode_id = str(int(datetime.now().timestamp() * 1000))
-    
-    episodes = load_episodes()
     # Extract audio file paths - speak_text returns just filename
     # Prepend /tts_output/ for web access
     audio_files = []
+    # Every format each clip exists in (source + transcoded), parallel to audio_files
+    audio_variants_list = []
     for turn in turns:
         if turn.get("tts"):
             filename = turn.get("tts")
-            # Filename only, prepend /tts_output/
-            audio_files.append(f"/tts_output/{filename}")
+            found = audio_variants(filename, TTS_OUTPUT_DIR) or {split_audio_name(filename)[1]: filename}
+            url, variants = clip_urls(found)
+            audio_files.append(url)
+            audio_variants_list.append(variants)
     
-    episodes[episode_id] = {
-        "id": episode_id,
+    global _generation
+    episode = {
+        "id": None,
         "topic": topic,
         "created_at": datetime.now().isoformat(),
         "turns_count": len(turns),
-        "audio_files": audio_files
+        "audio_files": audio_files,
+        "audio_variants": audio_variants_list,
     }
-    
-    save_episodes(episodes)
-    return episode_id
+    if timeline:
+        episode["timeline"] = timeline
+    store = get_store()
+    while True:
+        _last_id = max(int(datetime.now().timestamp() * 1000), _last_id + 1)
+        episode["id"] = str(_last_id)
+        # Another worker may have used this millisecond: take the next one
+        if store.insert(episode):
+            break
+    _generation += 1
+    return episode["id"]
+
+
+def clip_urls(variants: dict) -> tuple:
+    """(audio_files entry, audio_variants entry) for a clip's {format: filename}."""
+    return f"/tts_output/{primary_variant(variants)}", {fmt: f"/tts_output/{name}" for fmt, name in variants.items()}
+
+
+def refresh_audio_variants(episode_id: str) -> bool:
+    """
+    Record the formats an episode's clips exist in now (transcoding finishes
+    after add_episode). Blocking: call via asyncio.to_thread.
+    """
+    def update(ep):
+        files = list(ep.get("audio_files") or [])
+        variants = list(ep.get("audio_variants") or [])
+        variants += [{}] * (len(files) - len(variants))
+        for i, url in enumerate(files):
+            found = audio_variants(url.rsplit("/", 1)[-1], TTS_OUTPUT_DIR)
+            if found:
+                files[i], variants[i] = clip_urls(found)
+        if files == ep.get("audio_files") and variants == ep.get("audio_variants"):
+            return None
+        return dict(ep, audio_files=files, audio_variants=variants)
+
+    updated, _ = modify_episodes([episode_id], update)
+    return bool(updated)
+
+
+def modify_episodes(episode_ids: list, update) -> tuple:
+    """
+    Apply update to the stored copy of each episode (see store.update_many:
+    replacement, None or DELETE). Returns (updated, deleted).
+    """
+    global _generation
+    if not episode_ids:
+        return 0, 0
+    counts = get_store().update_many(episode_ids, update)
+    if any(counts):
+        _generation += 1
+    return counts
+
+
+def episodes_version() -> tuple:
+    """Changes whenever episodes are added here or the store is written by another process."""
+    return (_generation, get_store().version())
+
+
+def episode_summary(episode: dict) -> dict:
+    """Episode without its detail-only fields."""
+    if not any(field in episode for field in DETAIL_ONLY_FIELDS):
+        return episode
+    return {k: v for k, v in episode.items() if k not in DETAIL_ONLY_FIELDS}
 
 
 def get_all_episodes() -> List[dict]:
     """Get all episodes sorted by date (newest first), deduped by topic."""
-    episodes = load_episodes()
-
-    # Sort newest first
-    sorted_episodes = sorted(
-        episodes.values(),
-        key=lambda x: x.get("created_at", ""),
-        reverse=True
-    )
-
-    # Deduplicate by topic, prefer entries with audio
-    best_by_topic = {}
-    for ep in sorted_episodes:
-        topic = ep.get("topic", "Unknown")
-        current = best_by_topic.get(topic)
-        if not current:
-            best_by_topic[topic] = ep
-            continue
-
-        current_audio = len(current.get("audio_files", []) or [])
-        ep_audio = len(ep.get("audio_files", []) or [])
-
-        # Prefer episodes that actually have audio files
-        if ep_audio > 0 and current_audio == 0:
-            best_by_topic[topic] = ep
-
-    # Return in newest-first order while keeping only one per topic
-    deduped = []
-    added = set()
-    for ep in sorted_episodes:
-        topic = ep.get("topic", "Unknown")
-        if topic in added:
-            continue
-        if best_by_topic.get(topic) == ep:
-            deduped.append(ep)
-            added.add(topic)
-
-    return deduped
+    return [episode_summary(ep) for ep in get_store().latest_per_topic()]
 
 
 def get_episode(episode_id: str) -> dict:
     """Get a specific episode"""
-    episodes = load_episodes()
-    return episodes.get(episode_id)
+    return get_store().get(episode_id)
 
 
 def get_audio_files():
-    """List all audio files in tts_output/"""
-    files = []
-    if os.path.exists(TTS_OUTPUT_DIR):
-        for f in os.listdir(TTS_OUTPUT_DIR):
-            filepath = os.path.join(TTS_OUTPUT_DIR, f)
-            if os.path.isfile(filepath):
-                files.append({
-                    "name": f,
-                    "path": filepath,
-                    "size": os.path.getsize(filepath),
-                    "created": datetime.fromtimestamp(os.path.getctime(filepath)).isoformat()
-                })
-    return sorted(files, key=lambda x: x["created"], reverse=True)
+    """List all audio files in tts_output/, newest first (served from the in-memory catalog)"""
+    return audio_catalog.list()
+
+
+def get_audio_names_for_topic(topic: str) -> set:
+    """Filenames referenced by episodes whose topic contains the given text (case-insensitive)"""
+    needle = topic.lower()
+    names = set()
+    for ep in get_store().all():
+        if needle in (ep.get("topic") or "").lower():
+            names.update(path.rsplit("/", 1)[-1] for path in ep.get("audio_files", []) or [])
+            for variants in ep.get("audio_variants", []) or []:
+                names.update(path.rsplit("/", 1)[-1] for path in variants.values())
+    return names
@@ -0,0 +1,58 @@
+# file_lock.py
+"""
+Advisory locks shared by every process on the host (API workers, bulk
+generator), built on flock(2). The kernel releases a lock when its holder
+exits or crashes, so a lock file left on disk never blocks anyone.
+"""
+
+import fcntl
+import os
+from contextlib import contextmanager
+
+
+def _open_lock_file(path: str) -> int:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+def try_lock(path: str):
+    """Exclusive lock on path without waiting: the open fd (keep it to hold the lock) or None."""
+    fd = _open_lock_file(path)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def unlock(fd: int):
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True):
+    """
+    Hold an exclusive lock on path for the block; yields False instead of
+    waiting if blocking is off and another holder has it. Each call opens its
+    own descriptor, so threads of one process exclude each other too.
+    """
+    if blocking:
+        fd = _open_lock_file(path)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(fd)
+            raise
+    else:
+        fd = try_lock(path)
+        if fd is None:
+            yield False
+            return
+    try:
+        yield True
+    finally:
+        unlock(fd)
@@ -1,13 +1,116 @@
 # groq_client.py
 
 import os
+import json
+import asyncio
+import logging
+import random
+import time
 import httpx
 
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+from app.groq_fixtures import get_fixture_store, recording, replay_delays, replaying, split_content
+from app.metrics import GROQ_REQUEST_SECONDS, GROQ_RETRIES, GROQ_TOKENS
+from app.rate_limiter import backoff_delay, groq_limiter, parse_duration
+
+logger = logging.getLogger(__name__)
+
+# Override to point at an OpenAI-compatible stand-in (e.g. app.mock_llm for benchmarks)
+GROQ_URL = os.getenv("GROQ_URL", "https://api.groq.com/openai/v1/chat/completions")
 MODEL = "llama-3.1-8b-instant"
 
+# Connection pool settings for the shared client (override via environment)
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "10"))
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", "10"))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "30"))
+GROQ_HTTP2 = os.getenv("GROQ_HTTP2", "true").lower() in ("1", "true", "yes")
 
-async def call_groq(messages):
+# Retry policy for throttling / transient server errors
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "5"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Completion budget reserved per call before the real usage is known
+GROQ_EXPECTED_COMPLETION_TOKENS = int(os.getenv("GROQ_EXPECTED_COMPLETION_TOKENS", "300"))
+
+_client = None
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_client():
+    """Build the long-lived, pooled HTTP client used for all Groq calls."""
+    return httpx.AsyncClient(
+        http2=GROQ_HTTP2 and _http2_available(),
+        timeout=httpx.Timeout(GROQ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=GROQ_MAX_KEEPALIVE,
+            keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def init_client():
+    """Create the shared client. Called once on application startup."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+async def close_client():
+    """Close the shared client and its pooled connections. Called on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if recording():
+        # Recordings are written by a background thread
+        await asyncio.to_thread(get_fixture_store().flush)
+
+
+def get_client():
+    """Return the shared client, creating it lazily outside the app lifecycle."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+def estimate_request_tokens(messages):
+    """Rough token cost of a request: ~4 chars per prompt token plus the expected completion."""
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return prompt_chars // 4 + GROQ_EXPECTED_COMPLETION_TOKENS
+
+
+def _retry_delay(res, attempt):
+    """Honor Retry-After when the server sends one, else jittered exponential backoff."""
+    retry_after = parse_duration(res.headers.get("retry-after")) if res is not None else 0
+    if retry_after > 0:
+        return retry_after + random.uniform(0, 0.5)
+    return backoff_delay(attempt)
+
+
+def _payload(messages, stream=False):
+    """JSON payload for a chat completion request."""
+    payload = {
+        "model": MODEL,
+        "messages": messages,
+        "temperature": 0.8,
+    }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def _request(messages, stream=False):
+    """Headers and JSON payload for a chat completion request."""
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise RuntimeError("GROQ_API_KEY not set")
@@ -16,17 +119,204 @@ async def call_groq(messages):
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
+    return headers, _payload(messages, stream)
 
-    payload = {
-        "model": MODEL,
-        "messages": messages,
-        "temperature": 0.8,
+
+def record_usage(usage):
+    """Count the tokens a completed call reported."""
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if (usage or {}).get(kind):
+            GROQ_TOKENS.inc(usage[kind], kind=kind.split("_")[0])
+
+
+async def _backoff(res, attempt, estimated, reason):
+    """Refund the reservation and sleep before the next attempt."""
+    GROQ_RETRIES.inc(reason=res.status_code if res is not None else "transport")
+    groq_limiter.reconcile(estimated, 0)
+    delay = _retry_delay(res, attempt)
+    if res is not None and res.status_code == 429:
+        # Back off every caller, not just this one
+        groq_limiter.block_for(delay)
+    logger.warning(f"Groq {reason}, retrying in {delay:.1f}s")
+    await asyncio.sleep(delay)
+
+
+async def _replay_completion(payload):
+    """A recorded completion shaped like a chat completion response, after its (scaled) latency."""
+    started = time.perf_counter()
+    response = get_fixture_store().replay(payload)
+    await asyncio.sleep(replay_delays(response)[0])
+    GROQ_REQUEST_SECONDS.observe(time.perf_counter() - started, status="replay")
+    record_usage(response.get("usage"))
+    return {
+        "object": "chat.completion",
+        "model": payload["model"],
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": response["content"]},
+                     "finish_reason": "stop"}],
+        "usage": response.get("usage"),
     }
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        res = await client.post(GROQ_URL, json=payload, headers=headers)
+
+def _record_completion(payload, content, usage, latency, ttfb=None):
+    get_fixture_store().record(payload, {
+        "content": content,
+        "usage": usage,
+        "latency": round(latency, 4),
+        "ttfb": round(ttfb, 4) if ttfb is not None else None,
+    })
+
+
+async def chat_completion(messages):
+    """
+    POST a chat completion and return the decoded response body.
+
+    Every attempt first waits on the shared rate limiter. 429s, 5xx and
+    connection errors are retried up to GROQ_MAX_RETRIES times with
+    jittered backoff instead of failing the whole episode. With
+    GROQ_FIXTURES=record successful completions are saved; with replay they
+    are served from the fixture store instead (see app.groq_fixtures).
+    """
+    if replaying():
+        return await _replay_completion(_payload(messages))
+
+    headers, payload = _request(messages)
+    estimated = estimate_request_tokens(messages)
+    for attempt in range(GROQ_MAX_RETRIES + 1):
+        await groq_limiter.acquire(estimated)
+        started = time.perf_counter()
+        try:
+            res = await get_client().post(GROQ_URL, json=payload, headers=headers)
+        except httpx.TransportError as e:
+            GROQ_REQUEST_SECONDS.observe(time.perf_counter() - started, status="error")
+            if attempt == GROQ_MAX_RETRIES:
+                raise
+            await _backoff(None, attempt, estimated, f"request failed ({e!r})")
+            continue
+
+        GROQ_REQUEST_SECONDS.observe(time.perf_counter() - started, status=res.status_code)
+        groq_limiter.update_from_headers(res.headers)
+        if res.status_code in RETRY_STATUSES and attempt < GROQ_MAX_RETRIES:
+            await _backoff(res, attempt, estimated, f"returned {res.status_code}")
+            continue
+
         res.raise_for_status()
         data = res.json()
+        usage = data.get("usage") or {}
+        groq_limiter.reconcile(estimated, usage.get("total_tokens", estimated))
+        record_usage(usage)
+        if recording():
+            _record_completion(payload, data["choices"][0]["message"]["content"], data.get("usage"),
+                               time.perf_counter() - started)
+        return data
 
-    return data["choices"][0]["message"]["content"]
 
+class CompletionStream:
+    """
+    Streamed chat completion: `async for delta in CompletionStream(messages)`
+    yields content fragments as the model writes them.
+
+    Rate limiting and retries match chat_completion, but only until the
+    first fragment arrives; after that errors propagate. The full text and
+    the final `usage` (OpenAI `usage` or Groq `x_groq.usage`) are available
+    on `content` and `usage` once iteration ends.
+    """
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.parts = []
+        self.usage = None
+
+    @property
+    def content(self):
+        return "".join(self.parts)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        if replaying():
+            async for delta in self._replay():
+                yield delta
+            return
+
+        headers, payload = _request(self.messages, stream=True)
+        estimated = estimate_request_tokens(self.messages)
+        for attempt in range(GROQ_MAX_RETRIES + 1):
+            await groq_limiter.acquire(estimated)
+            retry_res = None
+            status = "error"
+            started = time.perf_counter()
+            first_delta = None
+            try:
+                async with get_client().stream("POST", GROQ_URL, json=payload, headers=headers) as res:
+                    status = res.status_code
+                    groq_limiter.update_from_headers(res.headers)
+                    if res.status_code in RETRY_STATUSES and attempt < GROQ_MAX_RETRIES:
+                        retry_res = res
+                    else:
+                        if res.status_code >= 400:
+                            await res.aread()
+                            GROQ_REQUEST_SECONDS.observe(time.perf_counter() - started, status=status)
+                            res.raise_for_status()
+                        async for line in res.aiter_lines():
+                            delta = self._parse_line(line)
+                            if delta:
+                                if first_delta is None:
+                                    first_delta = time.perf_counter()
+                                self.parts.append(delta)
+                                yield delta
+            except httpx.TransportError as e:
+                GROQ_REQUEST_SECONDS.observe(time.perf_counter() - started, status="error")
+                if self.parts or attempt == GROQ_MAX_RETRIES:
+                    raise
+                await _backoff(None, attempt, estimated, f"stream failed ({e!r})")
+                continue
+            GROQ_REQUEST_SECONDS.observe(time.perf_counter() - started, status=status)
+
+            if retry_res is not None:
+                await _backoff(retry_res, attempt, estimated, f"returned {retry_res.status_code}")
+                continue
+
+            groq_limiter.reconcile(estimated, (self.usage or {}).get("total_tokens", estimated))
+            record_usage(self.usage)
+            if recording():
+                _record_completion(payload, self.content, self.usage, time.perf_counter() - started,
+                                   first_delta - started if first_delta is not None else None)
+            return
+
+    async def _replay(self):
+        """Yield a recorded completion in chunks, paced like the original stream."""
+        started = time.perf_counter()
+        response = get_fixture_store().replay(_payload(self.messages, stream=True))
+        chunks = split_content(response["content"])
+        first, gap = replay_delays(response, len(chunks))
+        await asyncio.sleep(first)
+        for i, delta in enumerate(chunks):
+            if i:
+                await asyncio.sleep(gap)
+            self.parts.append(delta)
+            yield delta
+        self.usage = response.get("usage")
+        GROQ_REQUEST_SECONDS.observe(time.perf_counter() - started, status="replay")
+        record_usage(self.usage)
+
+    def _parse_line(self, line):
+        """Handle one SSE line; return its content delta, if any."""
+        if not line.startswith("data:"):
+            return None
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            return None
+        chunk = json.loads(data)
+        usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+        if usage:
+            self.usage = usage
+        return "".join(
+            (choice.get("delta") or {}).get("content") or ""
+            for choice in chunk.get("choices") or []
+        )
+
+
+async def call_groq(messages):
+    data = await chat_completion(messages)
+    return data["choices"][0]["message"]["content"]
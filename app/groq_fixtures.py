@@ -0,0 +1,182 @@
+# groq_fixtures.py
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# "record": call Groq and save every completion; "replay": serve saved completions, never touch the network
+GROQ_FIXTURES = os.getenv("GROQ_FIXTURES", "off").lower()
+GROQ_FIXTURES_DIR = os.getenv("GROQ_FIXTURES_DIR", "fixtures/groq")
+# Replayed latency = recorded latency x this (0 replays instantly)
+GROQ_REPLAY_LATENCY_SCALE = float(os.getenv("GROQ_REPLAY_LATENCY_SCALE", "1.0"))
+# Characters per replayed stream chunk
+REPLAY_CHUNK_CHARS = 16
+
+
+class FixtureMissing(RuntimeError):
+    """Replay mode got a request that was never recorded."""
+
+
+def normalize_request(payload: dict) -> dict:
+    """
+    The parts of a chat request that decide its answer. Whitespace inside
+    messages is collapsed and `stream` is left out, so a completion recorded
+    streamed replays non-streamed and vice versa.
+    """
+    return {
+        "model": payload.get("model"),
+        "temperature": payload.get("temperature"),
+        "messages": [
+            {"role": m.get("role"), "content": " ".join((m.get("content") or "").split())}
+            for m in payload.get("messages") or []
+        ],
+    }
+
+
+def request_key(payload: dict) -> str:
+    canonical = json.dumps(normalize_request(payload), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class FixtureStore:
+    """
+    Recorded completions, one gzipped JSON Lines file per request key: a
+    {"request": <normalized>} line, then one {"content", "usage", "latency",
+    "ttfb"} line per recording.
+
+    Each recording is appended as its own gzip member by a single writer
+    thread, so record() never blocks the event loop and its cost does not
+    grow with the number of recordings. gzip readers see the members as one
+    stream.
+
+    The same prompt can be recorded several times (e.g. every episode's first
+    turn); replay hands the recorded answers out round-robin per key, so a
+    replayed run follows the recorded conversations turn by turn.
+    """
+
+    def __init__(self, folder: str = GROQ_FIXTURES_DIR):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._cursor = {}
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="groq-fixtures")
+        self.stats = {"recorded": 0, "replayed": 0, "missing": 0, "write_errors": 0}
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.jsonl.gz")
+
+    def _load(self, key: str):
+        if key not in self._cache:
+            fixture = {"request": None, "responses": []}
+            try:
+                with gzip.open(self.path(key), "rt", encoding="utf-8") as f:
+                    for line in f:
+                        item = json.loads(line)
+                        if "request" in item:
+                            fixture["request"] = item["request"]
+                        else:
+                            fixture["responses"].append(item)
+            except FileNotFoundError:
+                return None
+            except (EOFError, gzip.BadGzipFile, ValueError) as e:
+                # A recording cut short by a crash: keep the complete ones
+                logger.warning(
+                    f"Truncated Groq fixture {self.path(key)} ({e!r}); using {len(fixture['responses'])} recordings"
+                )
+            self._cache[key] = fixture
+        return self._cache[key]
+
+    def record(self, payload: dict, response: dict):
+        """Queue one completion to be appended to its request's file; returns at once."""
+        key = request_key(payload)
+        with self._lock:
+            self._cache.pop(key, None)
+            self.stats["recorded"] += 1
+        self._writer.submit(self._append, key, normalize_request(payload), response)
+
+    def _append(self, key: str, request: dict, response: dict):
+        path = self.path(key)
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            lines = [response]
+            if not os.path.exists(path):
+                lines.insert(0, {"request": request})
+            text = "".join(json.dumps(line, separators=(",", ":"), ensure_ascii=False) + "\n" for line in lines)
+            member = gzip.compress(text.encode("utf-8"))
+            # One O_APPEND write per recording: concurrent recorders never interleave
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, member)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            self.stats["write_errors"] += 1
+            logger.error(f"Could not record Groq fixture {path}: {e}")
+
+    def flush(self):
+        """Wait until every queued recording is on disk."""
+        self._writer.submit(lambda: None).result()
+
+    def replay(self, payload: dict) -> dict:
+        """Next recorded completion for this request; raises FixtureMissing if there is none."""
+        key = request_key(payload)
+        with self._lock:
+            fixture = self._load(key)
+            if not fixture or not fixture["responses"]:
+                self.stats["missing"] += 1
+                raise FixtureMissing(f"No recorded Groq completion for request {key} in {self.folder}")
+            cursor = self._cursor.get(key, 0)
+            self._cursor[key] = cursor + 1
+            self.stats["replayed"] += 1
+            return fixture["responses"][cursor % len(fixture["responses"])]
+
+    def rewind(self):
+        """Start every key's round-robin from its first recording again."""
+        with self._lock:
+            self._cursor.clear()
+
+
+def replay_delays(response: dict, chunks: int = 0) -> tuple:
+    """
+    (seconds before the first chunk, seconds between chunks) for a replayed
+    completion, scaled by GROQ_REPLAY_LATENCY_SCALE. Without chunks the
+    first delay is the whole recorded latency.
+    """
+    latency = (response.get("latency") or 0.0) * GROQ_REPLAY_LATENCY_SCALE
+    ttfb = response.get("ttfb")
+    if not chunks or ttfb is None:
+        return latency, 0.0
+    first = min(latency, ttfb * GROQ_REPLAY_LATENCY_SCALE)
+    return first, (latency - first) / max(1, chunks - 1)
+
+
+def split_content(content: str, size: int = REPLAY_CHUNK_CHARS) -> list:
+    return [content[i:i + size] for i in range(0, len(content), size)] or [""]
+
+
+_store = None
+
+
+def recording() -> bool:
+    return GROQ_FIXTURES == "record"
+
+
+def replaying() -> bool:
+    return GROQ_FIXTURES == "replay"
+
+
+def get_fixture_store():
+    """Process-wide store, or None when GROQ_FIXTURES is off."""
+    global _store
+    if not (recording() or replaying()):
+        return None
+    if _store is None or _store.folder != GROQ_FIXTURES_DIR:
+        _store = FixtureStore(GROQ_FIXTURES_DIR)
+        logger.info(f"Groq fixtures: {GROQ_FIXTURES} ({GROQ_FIXTURES_DIR})")
+    return _store
@@ -0,0 +1,151 @@
+# jobs.py
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+
+from app.moderator import MAX_TURNS, run_roundtable
+from app.topics import get_topic
+from app.episodes import add_episode
+from app.episode_audio import schedule_episode_audio
+
+logger = logging.getLogger(__name__)
+
+# Episodes generated at the same time per API worker
+GENERATION_WORKERS = max(1, int(os.getenv("GENERATION_WORKERS", "2")))
+# Pending submissions beyond this are rejected instead of queueing forever
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "100"))
+# Finished jobs kept around for status polling
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "500"))
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+def expected_entries(topic: str) -> int:
+    """Entries a roundtable on topic streams: the intro, then one per panelist per turn."""
+    return MAX_TURNS * len(get_topic(topic).characters) + 1
+
+
+class JobManager:
+    """
+    Fixed-size worker pool running run_roundtable from a FIFO queue.
+
+    submit() returns immediately with a job dict; identical submissions
+    (same topic and tts flag) while one is queued or running share that job.
+    """
+
+    def __init__(self, workers: int = GENERATION_WORKERS):
+        self.workers = workers
+        self.jobs = OrderedDict()   # job_id -> job
+        self.inflight = {}          # (topic, tts) -> job_id
+        self.queue = None
+        self._tasks = []
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Generation job queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, topic: str, tts: bool = True) -> dict:
+        key = (topic, tts)
+        job_id = self.inflight.get(key)
+        if job_id is not None:
+            job = self.jobs[job_id]
+            job["coalesced"] += 1
+            return job
+
+        if self.queue is None:
+            raise RuntimeError("Job queue is not running")
+        if self.queue.qsize() >= MAX_QUEUED_JOBS:
+            raise QueueFullError(f"Too many queued jobs ({MAX_QUEUED_JOBS})")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "topic_type": topic,
+            "tts": tts,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "turns_total": expected_entries(topic),
+            "turns_done": 0,
+            "last_speaker": None,
+            "coalesced": 0,
+            "episode_id": None,
+            "result": None,
+            "error": None,
+        }
+        self.jobs[job["id"]] = job
+        self.inflight[key] = job["id"]
+        self.queue.put_nowait(job["id"])
+        self._trim()
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def stats(self) -> dict:
+        counts = {}
+        for job in self.jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"workers": self.workers, "queued": self.queue.qsize() if self.queue else 0, **counts}
+
+    def _trim(self):
+        finished = [jid for jid, j in self.jobs.items() if j["status"] in ("done", "failed")]
+        for jid in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[jid]
+
+    async def _worker(self, n: int):
+        while True:
+            job_id = await self.queue.get()
+            job = self.jobs.get(job_id)
+            try:
+                if job is not None:
+                    await self._run(job)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: dict):
+        job["status"] = "running"
+        job["started_at"] = time.time()
+
+        async def on_entry(entry):
+            job["turns_done"] += 1
+            job["last_speaker"] = entry["speaker"]
+
+        try:
+            episode = await run_roundtable(tts_enabled=job["tts"], topic_type=job["topic_type"], on_entry=on_entry)
+            job["episode_id"] = await asyncio.to_thread(add_episode, episode["topic"], episode["turns"], episode.get("timeline"))
+            schedule_episode_audio(job["episode_id"], episode["turns"])
+            job["result"] = episode
+            job["status"] = "done"
+            logger.info(f"Job {job['id']} created episode {job['episode_id']} - {episode['topic']}")
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            logger.error(f"Job {job['id']} failed: {e}", exc_info=True)
+        finally:
+            job["finished_at"] = time.time()
+            self.inflight.pop((job["topic_type"], job["tts"]), None)
+
+
+def job_view(job: dict, include_result: bool = False) -> dict:
+    """Public status representation of a job."""
+    view = {k: v for k, v in job.items() if k != "result"}
+    if include_result:
+        view["result"] = job["result"]
+    return view
+
+
+job_manager = JobManager()
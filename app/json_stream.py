@@ -0,0 +1,68 @@
+# json_stream.py
+
+import json
+import re
+
+_TRAILING_COMMA = re.compile(r",\s*(\]|\})")
+
+
+class JsonObjectStream:
+    """
+    Incremental parser that pulls complete top-level JSON objects out of a
+    streamed completion.
+
+    Brace depth is tracked outside of string literals, so each `{...}`
+    object is returned as soon as its closing brace arrives, whether the
+    model wraps the objects in a list, a markdown fence, or nothing at all.
+    Objects that still do not parse after trailing-comma repair are skipped.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.buffer = []
+        self.objects = []
+
+    def feed(self, text: str) -> list:
+        """Consume a chunk of text; return the objects completed by it."""
+        done = []
+        for ch in text:
+            if self.depth == 0:
+                if ch == "{":
+                    self.depth = 1
+                    self.buffer = [ch]
+                continue
+
+            self.buffer.append(ch)
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    obj = self._decode("".join(self.buffer))
+                    self.buffer = []
+                    if obj is not None:
+                        done.append(obj)
+
+        self.objects.extend(done)
+        return done
+
+    @staticmethod
+    def _decode(raw: str):
+        for candidate in (raw, _TRAILING_COMMA.sub(r"\1", raw)):
+            try:
+                obj = json.loads(candidate)
+            except ValueError:
+                continue
+            return obj if isinstance(obj, dict) else None
+        return None
@@ -1,28 +1,69 @@
 # main.py
 
 import os
+import asyncio
 import logging
-from fastapi import FastAPI
+import orjson
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, ORJSONResponse
-from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
-from apscheduler.schedulers.background import BackgroundScheduler
 from app.moderator import run_roundtable
-from app.episodes import get_audio_files, add_episode, get_all_episodes
-from app.cleanup import cleanup_old_audio_files
+from app.groq_client import init_client, close_client
+from app.tts_client import get_tts_stats
+from app.speech_engine import shutdown_engine
+from app.scheduler import get_scheduler_stats, start_scheduler, stop_scheduler
+from app.transcoder import get_transcode_stats
+from app.episode_audio import episode_audio_path, schedule_episode_audio
+from app.range_response import MediaSafeGZipMiddleware, range_file_response
+from app.rate_limiter import groq_limiter
+from app.audio_catalog import MEDIA_TYPES, audio_catalog, pick_variant
+from app.episodes import get_audio_files, add_episode, get_episode, get_audio_names_for_topic, episode_summary
+from app.cleanup import CLEANUP_INTERVAL_MINUTES, get_cleanup_stats, run_cleanup
+from app.episode_cache import episode_list_cache, etag_matches
+from app.jobs import QueueFullError, job_manager, job_view
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, METRICS_ENABLED, render_metrics
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, filter_items, paginate, parse_date
 
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled keep-alive client for all Groq calls, shared across requests
+    await init_client()
+    # Single scandir pass; speak_text and cleanup keep the catalog current afterwards
+    await asyncio.to_thread(audio_catalog.rebuild)
+    await job_manager.start()
+    # Cleanup runs in the scheduler's thread, off the event loop, and only in the elected leader worker
+    start_scheduler([(run_cleanup, "interval", {"minutes": CLEANUP_INTERVAL_MINUTES})])
+    logger.info(f"Cleanup scheduled every {CLEANUP_INTERVAL_MINUTES:g} minutes on the leader worker")
+    try:
+        yield
+    finally:
+        stop_scheduler()
+        await job_manager.stop()
+        await close_client()
+        shutdown_engine()
+
+
 # Use ORJSON for faster JSON serialization
 app = FastAPI(
     title="AI Roundtable",
     description="AI-powered panel discussions",
-    default_response_class=ORJSONResponse
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
-# Add Gzip compression for faster response delivery
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Add Gzip compression for faster response delivery; audio is already
+# compressed and ranged bodies must reach the player byte for byte
+app.add_middleware(
+    MediaSafeGZipMiddleware,
+    exclude_paths=r"/api/audio/|/api/episodes/[^/]+/audio$|/tts_output/",
+    minimum_size=1000,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -34,53 +75,338 @@ os.makedirs("episodes_data", exist_ok=True)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 app.mount("/tts_output", StaticFiles(directory="tts_output"), name="tts_output")
 
-# Setup background scheduler for cleanup
-scheduler = BackgroundScheduler()
-scheduler.add_job(cleanup_old_audio_files, "cron", hour=2, minute=0)  # Daily at 2 AM
-scheduler.start()
-
-logger.info("✅ Cleanup scheduler started - runs daily at 2 AM")
-
 
 @app.get("/")
 def health():
     return {"status": "ok"}
 
 
+def sse_event(event: str, data: dict) -> bytes:
+    """Encode one Server-Sent Event frame."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+# Streamed generations whose client went away; referenced here until they are recorded
+_detached = set()
+
+
+async def generate_and_record(tts: bool, topic: str, on_entry=None):
+    """Run a roundtable, store the episode and queue its stitched audio. Returns (episode_id, episode)."""
+    episode = await run_roundtable(tts_enabled=tts, topic_type=topic, on_entry=on_entry)
+    episode_id = await asyncio.to_thread(add_episode, episode["topic"], episode["turns"], episode.get("timeline"))
+    schedule_episode_audio(episode_id, episode["turns"])
+    logger.info(f"Episode created: {episode_id} - {episode['topic']}")
+    return episode_id, episode
+
+
+def _detached_done(task):
+    _detached.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Error generating episode after client disconnect: {task.exception()!r}")
+
+
+async def stream_episode(tts: bool, topic: str):
+    """
+    Run a roundtable and yield SSE frames as turns become available.
+
+    Emits one "turn" event per entry (the intro first), then a final "episode"
+    event once the episode has been recorded, or an "error" event on failure.
+    If the client disconnects, generation carries on in the background and the
+    episode is still recorded.
+    """
+    queue = asyncio.Queue()
+
+    async def on_entry(entry):
+        await queue.put(entry)
+
+    task = asyncio.create_task(generate_and_record(tts, topic, on_entry))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    try:
+        index = 0
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                break
+            yield sse_event("turn", {"index": index, **entry})
+            index += 1
+
+        episode_id, episode = task.result()
+        yield sse_event("episode", {"id": episode_id, "topic": episode["topic"], "turns_count": len(episode["turns"])})
+    except Exception as e:
+        logger.error(f"Error generating episode: {str(e)}", exc_info=True)
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        # Client went away mid-stream: finish and record the episode anyway
+        if not task.done():
+            logger.info(f"Client disconnected; finishing {topic} episode in the background")
+            _detached.add(task)
+            task.add_done_callback(_detached_done)
+
+
 @app.post("/generate")
-async def generate(tts: bool = True, topic: str = "government_jobs"):
+async def generate(tts: bool = True, topic: str = "government_jobs", stream: bool = False):
     """
     Generate a roundtable episode.
     
     Args:
         tts: Enable text-to-speech (default: True)
-        topic: Topic type - "government_jobs" or "travel" (default: "government_jobs")
+        topic: Topic type - "government_jobs", "travel", "tech_startup",
+            "personal_finance" or "mental_health" (default: "government_jobs")
+        stream: Stream turns as Server-Sent Events while they are generated
+            instead of returning the whole episode at the end (default: False)
     """
+    if stream:
+        logger.info(f"Streaming episode: topic={topic}, tts={tts}")
+        return StreamingResponse(
+            stream_episode(tts, topic),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     try:
         logger.info(f"Generating episode: topic={topic}, tts={tts}")
-        episode = await run_roundtable(tts_enabled=tts, topic_type=topic)
-        
-        # Store episode metadata
-        episode_id = add_episode(episode["topic"], episode["turns"])
-        logger.info(f"Episode created: {episode_id} - {episode['topic']}")
-        
+        _, episode = await generate_and_record(tts, topic)
         return episode
     except Exception as e:
         logger.error(f"Error generating episode: {str(e)}", exc_info=True)
         raise
 
 
+def episode_sort_key(ep):
+    return (ep.get("created_at", ""), ep.get("id", ""))
+
+
+def audio_sort_key(f):
+    return (f.get("created", ""), f.get("name", ""))
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(tts: bool = True, topic: str = "government_jobs"):
+    """
+    Queue a roundtable episode for generation and return its job immediately.
+
+    Poll GET /api/jobs/{id} for per-turn progress and the result. Submitting
+    the same topic/tts while a job for it is queued or running returns that job.
+    """
+    try:
+        job = job_manager.submit(topic, tts)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return job_view(job)
+
+
+# async: job state belongs to the event loop; a threadpool thread must not iterate it while jobs change
+@app.get("/api/jobs")
+async def list_jobs():
+    """Job queue depth and job counts by status"""
+    return job_manager.stats()
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status and per-turn progress; includes the episode once done"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job, include_result=job["status"] == "done")
+
+
 @app.get("/api/episodes")
-def get_episodes():
-    """Get all episodes - client-side caches for 5 minutes"""
-    episodes = get_all_episodes()
-    return {"episodes": episodes}
+def get_episodes(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    topic: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Get episodes, newest first.
+
+    Without query parameters the full list is served from a pre-serialized
+    cache with ETag revalidation. With limit/after (cursor) and topic/since/until
+    filters, one page is returned along with next_cursor for the following page.
+    """
+    cached = episode_list_cache.get()
+
+    if any(v is not None for v in (limit, after, topic, since, until)):
+        try:
+            episodes = filter_items(
+                cached["episodes"], "created_at", topic,
+                parse_date(since, "since"), parse_date(until, "until"),
+            )
+            page, next_cursor = paginate(episodes, episode_sort_key, limit or DEFAULT_PAGE_SIZE, after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"episodes": page, "next_cursor": next_cursor}
+
+    headers = {"ETag": cached["etag"], "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if etag_matches(request.headers.get("if-none-match"), cached["etag"]):
+        return Response(status_code=304, headers=headers)
+
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(cached["gzip"], media_type="application/json", headers=headers)
+    return Response(cached["body"], media_type="application/json", headers=headers)
+
+
+@app.get("/api/episodes/{episode_id}")
+def get_episode_detail(episode_id: str):
+    """Get a single episode by ID"""
+    episode = get_episode(episode_id)
+    if episode is None:
+        raise HTTPException(status_code=404, detail="Episode not found")
+    return episode_summary(episode)
+
+
+@app.get("/api/episodes/{episode_id}/timings")
+def get_episode_timings(episode_id: str):
+    """
+    Stage timeline recorded while the episode was generated: one span per LLM
+    call, parse, normalize and TTS clip (ms offsets from the start, with bytes
+    and token counts), plus per-stage totals.
+    """
+    episode = get_episode(episode_id)
+    if episode is None:
+        raise HTTPException(status_code=404, detail="Episode not found")
+    if not episode.get("timeline"):
+        raise HTTPException(status_code=404, detail="No timings recorded for this episode")
+    return {"id": episode_id, "topic": episode.get("topic"), **episode["timeline"]}
 
 
 @app.get("/api/audio-files")
-def get_audio_files_list():
-    """Get list of all audio files"""
-    return get_audio_files()
+def get_audio_files_list(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    topic: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Get audio files, newest first.
+
+    Without query parameters returns the full list. With limit/after (cursor)
+    and topic/since/until filters, returns {"files": [...], "next_cursor": ...}.
+    A topic filter matches files referenced by episodes on that topic.
+    """
+    files = get_audio_files()
+    if all(v is None for v in (limit, after, topic, since, until)):
+        return files
+
+    try:
+        files = filter_items(files, "created", None, parse_date(since, "since"), parse_date(until, "until"))
+        if topic:
+            names = get_audio_names_for_topic(topic)
+            files = [f for f in files if f["name"] in names]
+        page, next_cursor = paginate(files, audio_sort_key, limit or DEFAULT_PAGE_SIZE, after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"files": page, "next_cursor": next_cursor}
+
+
+@app.api_route("/api/episodes/{episode_id}/audio", methods=["GET", "HEAD"])
+def get_episode_audio(episode_id: str, request: Request):
+    """
+    The whole episode as one compressed file (see "audio" on the episode for
+    per-turn chapter offsets). Supports Range requests so players can seek.
+    """
+    episode = get_episode(episode_id)
+    if episode is None:
+        raise HTTPException(status_code=404, detail="Episode not found")
+    path = episode_audio_path(episode)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Episode audio not available")
+
+    audio = episode["audio"]
+    # Stitched files are content-addressed, so they can be cached indefinitely
+    return range_file_response(
+        request,
+        path,
+        audio["media_type"],
+        etag=f'"{audio["file"]}"',
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
+@app.api_route("/api/audio/{filename}", methods=["GET", "HEAD"])
+def get_audio(filename: str, request: Request, format: Optional[str] = None):
+    """
+    Serve a clip in the smallest format the client accepts.
+
+    filename is any of the clip's names (e.g. the .wav recorded in an episode);
+    the Opus/MP3/WAV variant is chosen from the Accept header, or forced with
+    ?format=opus|mp3|wav.
+    """
+    if os.path.basename(filename) != filename or filename.startswith("."):
+        raise HTTPException(status_code=404, detail="Audio file not found")
+
+    variants = {f: v for f, v in audio_catalog.variants(filename).items() if f in MEDIA_TYPES}
+    if not variants:
+        raise HTTPException(status_code=404, detail="Audio file not found")
+
+    if format:
+        fmt = format.lower()
+        if fmt not in variants:
+            raise HTTPException(status_code=404, detail=f"Audio not available as {fmt}")
+    else:
+        fmt = pick_variant({f: v["size"] for f, v in variants.items()}, request.headers.get("accept"))
+        if fmt is None:
+            raise HTTPException(status_code=406, detail="No acceptable audio format")
+
+    # Names are content hashes, so any given variant never changes
+    return range_file_response(
+        request,
+        variants[fmt]["path"],
+        MEDIA_TYPES[fmt][0],
+        etag=f'"{variants[fmt]["name"]}"',
+        headers={"Vary": "Accept", "Cache-Control": "public, max-age=86400"},
+    )
+
+
+@app.post("/api/cleanup")
+async def cleanup(dry_run: bool = True):
+    """
+    Run the reference-aware audio cleanup now (in a worker thread).
+
+    Defaults to a dry run that only reports what would be deleted; pass
+    dry_run=false to delete orphaned/expired files and mark or prune
+    episodes whose audio is gone.
+    """
+    return await asyncio.to_thread(run_cleanup, dry_run=dry_run)
+
+
+@app.get("/api/cleanup/stats")
+def cleanup_stats():
+    """Result of the last cleanup run in this worker (null before the first)"""
+    return get_cleanup_stats()
+
+
+@app.get("/api/scheduler")
+def scheduler_stats():
+    """Whether this worker is the scheduler leader, the leader's pid and the jobs it runs"""
+    return get_scheduler_stats()
+
+
+@app.get("/api/tts/stats")
+def tts_stats():
+    """TTS worker pool queue depth (active / waiting synthesis jobs) and transcoding state for this worker"""
+    return {**get_tts_stats(), "transcode": get_transcode_stats()}
+
+
+@app.get("/api/groq/stats")
+async def groq_stats():
+    """Client-side Groq rate limiter state (available request/token budget, waiters) for this worker"""
+    return groq_limiter.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text-format metrics for this worker (LLM, TTS, episodes, store, cleanup)"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
 
 
 @app.get("/ui")
@@ -0,0 +1,172 @@
+# metrics.py
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Set to "false" to turn every metric into a no-op and disable /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request-scale latencies (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Whole-episode durations (seconds)
+EPISODE_BUCKETS = (5, 10, 20, 30, 45, 60, 90, 120, 180, 300, 600)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines += self._samples(items)
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally labelled: REQUESTS.inc(status=200)."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    """Bucketed distribution: LATENCY.observe(0.42, status=200) or `with LATENCY.time(...)`."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts + the +Inf slot, sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self, items):
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# --- Generation hot paths ----------------------------------------------------
+
+GROQ_REQUEST_SECONDS = Histogram(
+    "groq_request_duration_seconds",
+    "Groq chat completion HTTP attempts (streamed: until the last chunk), by status code",
+    ["status"],
+)
+GROQ_RETRIES = Counter("groq_retries_total", "Groq attempts that were retried, by reason", ["reason"])
+GROQ_TOKENS = Counter("groq_tokens_total", "Tokens reported in Groq usage, by kind", ["kind"])
+
+PARSE_RESULTS = Counter(
+    "roundtable_parse_total",
+    "Turn responses by how they were parsed (json, stream, fallback extraction or failure)",
+    ["result"],
+)
+PLACEHOLDER_FILLS = Counter(
+    "roundtable_placeholder_fills_total",
+    "Speakers missing from a model response and filled with a placeholder line",
+)
+EPISODE_SECONDS = Histogram(
+    "roundtable_episode_duration_seconds",
+    "End-to-end run_roundtable time, by topic and outcome",
+    ["topic", "result"],
+    buckets=EPISODE_BUCKETS,
+)
+
+TTS_SYNTHESIS_SECONDS = Histogram("tts_synthesis_duration_seconds", "Time a synthesis command ran")
+TTS_QUEUE_WAIT_SECONDS = Histogram("tts_queue_wait_seconds", "Time speak_text waited for a synthesis slot")
+TTS_REQUESTS = Counter(
+    "tts_requests_total",
+    "speak_text calls by outcome (synthesized, cache_hit, joined an in-flight job, failed)",
+    ["result"],
+)
+
+STORE_SECONDS = Histogram(
+    "episode_store_duration_seconds",
+    "Episode store reads and writes, by backend and operation",
+    ["store", "op"],
+)
+
+CLEANUP_DELETED = Counter("cleanup_deleted_files_total", "Files deleted by cleanup, by reason", ["reason"])
+CLEANUP_FREED_BYTES = Counter("cleanup_freed_bytes_total", "Bytes freed by cleanup")
+CLEANUP_EPISODES = Counter("cleanup_episodes_total", "Episodes marked or pruned by cleanup", ["action"])
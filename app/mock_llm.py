@@ -0,0 +1,220 @@
+# mock_llm.py
+"""
+Local OpenAI-compatible stand-in for the Groq chat completions API.
+
+    python -m app.mock_llm --port 8001 --latency 0.4 --jitter 0.2 --error-rate 0.05
+    GROQ_URL=http://127.0.0.1:8001/openai/v1/chat/completions uvicorn app.main:app
+
+Answers every turn prompt with one object per speaker named in the prompt's
+JSON template, streamed (SSE, Groq-style x_groq.usage) or not. Latency is
+time to first byte plus completion tokens at --tokens-per-sec; a fraction of
+requests fail with 429/503, and response shapes can be mixed to exercise
+the fallback parsing paths. Used by app.benchmark.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+
+import orjson
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+MOCK_PATH = "/openai/v1/chat/completions"
+
+# "clean" is what the prompt asks for; the others are the messy outputs parse_responses tolerates
+SHAPES = ("clean", "fenced", "trailing_comma", "alt_keys", "missing_speaker", "truncated", "invalid")
+DEFAULT_SHAPES = {"clean": 1.0}
+
+_SPEAKER_RE = re.compile(r'"speaker":\s*"([^"]+)"')
+_WORDS = (
+    "exam", "budget", "policy", "startup", "travel", "career", "savings", "interview", "market",
+    "practice", "strategy", "risk", "balance", "growth", "routine", "plan", "team", "future",
+    "honestly", "realistic", "pressure", "option", "experience", "advice", "cost", "time",
+)
+
+
+def parse_shapes(value: str) -> dict:
+    """"clean=0.8,fenced=0.2" -> {"clean": 0.8, "fenced": 0.2} (weights, need not sum to 1)."""
+    shapes = {}
+    for part in (value or "").split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SHAPES:
+            raise ValueError(f"unknown response shape {name!r}; choose from {', '.join(SHAPES)}")
+        shapes[name] = float(weight) if weight else 1.0
+    return shapes or dict(DEFAULT_SHAPES)
+
+
+class MockLLM:
+    """Response generator and counters behind the mock endpoint."""
+
+    def __init__(self, latency=0.3, jitter=0.1, tokens_per_sec=600.0, error_rate=0.0,
+                 shapes=None, chunk_chars=16, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.shapes = shapes or dict(DEFAULT_SHAPES)
+        self.chunk_chars = chunk_chars
+        self.random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self.stats = {"requests": 0, "streamed": 0, "errors": 0, "shapes": {}}
+
+    def first_byte_delay(self) -> float:
+        return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def sentence(self, n: int) -> str:
+        # A request counter keeps every line unique, so TTS never serves it from cache
+        words = self.random.choices(_WORDS, k=self.random.randint(8, 20))
+        return f"{' '.join(words).capitalize()} number {n}."
+
+    def completion_text(self, prompt: str):
+        """(shape, text) answering one turn prompt."""
+        names = list(dict.fromkeys(_SPEAKER_RE.findall(prompt))) or ["Speaker"]
+        shape = self.random.choices(list(self.shapes), weights=list(self.shapes.values()))[0]
+        self.stats["shapes"][shape] = self.stats["shapes"].get(shape, 0) + 1
+        n = next(self._ids)
+
+        if shape == "missing_speaker" and len(names) > 1:
+            names = names[:-1]
+        key_speaker, key_message = ("name", "text") if shape == "alt_keys" else ("speaker", "message")
+        entries = [
+            {key_speaker: name, key_message: " ".join(self.sentence(n) for _ in range(self.random.randint(1, 3)))}
+            for name in names
+        ]
+        text = json.dumps(entries, indent=2)
+        if shape == "fenced":
+            text = f"Here is the next turn:\n```json\n{text}\n```"
+        elif shape == "trailing_comma":
+            text = text[:-2] + ",\n]"
+        elif shape == "truncated":
+            text = text[:text.rfind("}") + 1]
+        elif shape == "invalid":
+            text = "I'm sorry, I can't produce that right now."
+        return shape, text
+
+    def usage(self, messages, text: str) -> dict:
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4 + 1
+        completion_tokens = len(text) // 4 + 1
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def error_response(self):
+        """A throttling or transient failure for error_rate of requests, else None."""
+        if not self.error_rate or self.random.random() >= self.error_rate:
+            return None
+        self.stats["errors"] += 1
+        if self.random.random() < 0.5:
+            return Response(b'{"error":{"message":"Rate limit reached"}}', status_code=429,
+                            media_type="application/json", headers={"retry-after": "0.2"})
+        return Response(b'{"error":{"message":"Service unavailable"}}', status_code=503,
+                        media_type="application/json")
+
+    async def handle(self, payload: dict):
+        self.stats["requests"] += 1
+        await asyncio.sleep(self.first_byte_delay())
+        error = self.error_response()
+        if error is not None:
+            return error
+
+        messages = payload.get("messages") or []
+        _, text = self.completion_text((messages[-1].get("content") or "") if messages else "")
+        usage = self.usage(messages, text)
+        created = int(time.time())
+        completion_id = f"chatcmpl-mock-{self.stats['requests']}"
+
+        if not payload.get("stream"):
+            await asyncio.sleep(usage["completion_tokens"] / self.tokens_per_sec)
+            return Response(orjson.dumps({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }), media_type="application/json")
+
+        self.stats["streamed"] += 1
+        chunk_delay = self.chunk_chars / 4 / self.tokens_per_sec
+
+        async def events():
+            for i in range(0, len(text), self.chunk_chars):
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "choices": [{"index": 0, "delta": {"content": text[i:i + self.chunk_chars]}}],
+                }
+                yield b"data: " + orjson.dumps(chunk) + b"\n\n"
+                await asyncio.sleep(chunk_delay)
+            final = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                     "x_groq": {"usage": usage}}
+            yield b"data: " + orjson.dumps(final) + b"\n\n"
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def create_app(mock: MockLLM) -> FastAPI:
+    app = FastAPI(title="Mock LLM")
+
+    @app.post(MOCK_PATH)
+    async def chat_completions(request: Request):
+        return await mock.handle(await request.json())
+
+    @app.get("/stats")
+    def stats():
+        return mock.stats
+
+    return app
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """Mock server options, shared with app.benchmark."""
+    parser.add_argument("--latency", type=float, default=0.3, help="time to first byte in seconds (default: 0.3)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="uniform +/- jitter on the latency (default: 0.1)")
+    parser.add_argument("--tokens-per-sec", type=float, default=600.0, help="completion speed (default: 600)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 429/503")
+    parser.add_argument("--shapes", default="clean",
+                        help=f"weighted response shapes, e.g. clean=0.8,fenced=0.1,alt_keys=0.1 ({', '.join(SHAPES)})")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible responses")
+
+
+def mock_from_args(args) -> MockLLM:
+    return MockLLM(
+        latency=args.latency,
+        jitter=args.jitter,
+        tokens_per_sec=args.tokens_per_sec,
+        error_rate=args.error_rate,
+        shapes=parse_shapes(args.shapes),
+        seed=args.seed,
+    )
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="python -m app.mock_llm", description="Run the mock LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    add_mock_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        mock = mock_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Mock LLM at http://{args.host}:{args.port}{MOCK_PATH}")
+    uvicorn.run(create_app(mock), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
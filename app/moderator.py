@@ -2,30 +2,32 @@
 
 import asyncio
 import json
+import os
 import re
-from app.groq_client import call_groq
-from app.characters import CHARACTERS
-from app.travel_characters import TRAVEL_CHARACTERS, CITIES
-from app.tech_startup_characters import TECH_STARTUP_CHARACTERS
-from app.personal_finance_characters import PERSONAL_FINANCE_CHARACTERS
-from app.mental_health_characters import MENTAL_HEALTH_CHARACTERS
-from app.tts_client import speak_text
+import time
+from app.groq_client import CompletionStream, chat_completion
+from app.context import ConversationContext
+from app.json_stream import JsonObjectStream
+from app.metrics import EPISODE_SECONDS, PARSE_RESULTS, PLACEHOLDER_FILLS
+from app.timeline import Timeline, current_timeline
+from app.topics import get_topic
+from app.tts_client import batching_enabled, speak_text, speak_turn
 
 MAX_TURNS = 5  # Reduced for 2.5x faster generation while maintaining quality
 
+# Overlap TTS of turn N with the LLM call for turn N+1 (set to "false" to run strictly in series)
+PIPELINE_TTS = os.getenv("PIPELINE_TTS", "true").lower() in ("1", "true", "yes")
+
+# Stream completions and start each speaker's TTS as soon as its JSON object closes
+STREAM_LLM = os.getenv("STREAM_LLM", "true").lower() in ("1", "true", "yes")
+
 
 async def generate_tts_batch(entries, tts_enabled):
-    """Parallelize TTS generation for multiple speakers at once."""
+    """Parallelize TTS generation for multiple speakers at once (batched per voice with TTS_BATCH)."""
     if not tts_enabled:
         return entries
     
-    # Generate all TTS files in parallel
-    tts_tasks = []
-    for entry in entries:
-        task = speak_text(entry["message"], entry["accent"])
-        tts_tasks.append(task)
-    
-    tts_results = await asyncio.gather(*tts_tasks, return_exceptions=True)
+    tts_results = await speak_turn([(entry["message"], entry["accent"]) for entry in entries])
     
     # Attach results to entries
     for entry, tts_result in zip(entries, tts_results):
@@ -34,248 +36,210 @@ async def generate_tts_batch(entries, tts_enabled):
     return entries
 
 
-async def run_roundtable(tts_enabled=True, topic_type="government_jobs"):
-    """
-    Run a roundtable discussion.
-    
-    Args:
-        tts_enabled: Enable text-to-speech
-        topic_type: "government_jobs", "travel", "tech_startup", "personal_finance", or "mental_health"
+class TurnSynthesizer:
     """
-    if topic_type == "travel":
-        return await run_travel_roundtable(tts_enabled)
-    elif topic_type == "tech_startup":
-        return await run_tech_startup_roundtable(tts_enabled)
-    elif topic_type == "personal_finance":
-        return await run_personal_finance_roundtable(tts_enabled)
-    elif topic_type == "mental_health":
-        return await run_mental_health_roundtable(tts_enabled)
-    else:
-        return await run_government_jobs_roundtable(tts_enabled)
-
-
-async def run_government_jobs_roundtable(tts_enabled=True):
-    topic = "Government Jobs and Exams in India"
-    characters = CHARACTERS
-    turns = []
-
-    intro = (
-        "Welcome to the AI Roundtable. Today we discuss Government Jobs and Exams in India. "
-        "Our panel includes an Exam Strategist, a Serving Officer, a Fresh Qualifier, and a Citizen."
-    )
+    Attach audio to each turn's entries, optionally in the background.
 
-    turns.append({
-        "speaker": "Moderator",
-        "message": intro,
-        "tts": None,
-    })
-
-    for turn in range(MAX_TURNS):
-        prompt = build_government_jobs_prompt(turns, topic, characters)
-
-        response = await call_groq([
-            {"role": "system", "content": build_government_jobs_system_prompt(characters)},
-            {"role": "user", "content": prompt},
-        ])
-
-        parsed = normalize_responses(parse_responses(response), characters)
-        parsed = attach_accents(parsed, characters)
-
-        # Parallelize TTS for all speakers in this turn
-        parsed = await generate_tts_batch(parsed, tts_enabled)
+    The next prompt only needs the text of a turn, so in pipelined mode the
+    TTS batch for turn N runs as a task while the LLM call for turn N+1 is in
+    flight. Each turn's task waits for the previous one before emitting, so
+    on_entry still sees entries in conversation order. join() waits for all
+    outstanding audio.
+    """
 
+    def __init__(self, tts_enabled, on_entry=None, pipeline=None):
+        self.tts_enabled = tts_enabled
+        self.on_entry = on_entry
+        self.pipeline = PIPELINE_TTS if pipeline is None else pipeline
+        self.tasks = []
+        self.prefetched = []
+
+    def prefetch(self, message, accent):
+        """
+        Start synthesizing one entry before its turn is complete.
+
+        The result lands in the content-addressed TTS cache (or is still in
+        flight there), so the turn's generate_tts_batch call picks it up
+        instead of synthesizing it again. Skipped when TTS batching is on:
+        the whole turn then goes to the engine as one batch.
+        """
+        if not self.tts_enabled or batching_enabled():
+            return
+        task = asyncio.ensure_future(speak_text(message, accent))
+        # Failures surface again (and are handled) in generate_tts_batch
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self.prefetched.append(task)
+
+    async def submit(self, turns, parsed):
+        """Append a parsed turn to the transcript and schedule its audio."""
+        records = []
         for entry in parsed:
             turns.append({
                 "speaker": entry["speaker"],
                 "message": entry["message"],
-                "tts": entry.get("tts"),
+                "tts": None,
             })
+            records.append(turns[-1])
 
-    return {
-        "topic": topic,
-        "turns": turns,
-    }
+        previous = self.tasks[-1] if self.tasks else None
+        job = self._synthesize(parsed, records, previous)
+        if self.pipeline:
+            self.tasks.append(asyncio.create_task(job))
+        else:
+            await job
 
+    async def _synthesize(self, parsed, records, previous):
+        parsed = await generate_tts_batch(parsed, self.tts_enabled)
+        for entry, record in zip(parsed, records):
+            record["tts"] = entry.get("tts")
 
-async def run_travel_roundtable(tts_enabled=True):
-    topic = "Our Favorite Travel Destinations"
-    characters = TRAVEL_CHARACTERS
-    turns = []
+        if previous is not None:
+            await previous
+        for record in records:
+            await emit_entry(self.on_entry, record)
 
-    intro = (
-        f"Welcome to the AI Roundtable Travel Edition! Today we're discussing amazing destinations: "
-        f"Salt Lake City USA, Abu Dhabi UAE, Chennai and Bangalore in India, and Manchester UK. "
-        f"Our panel includes Elena from Spain who's visited all these places, Fatima from UAE who's researched them extensively, "
-        f"Priya from India whose sister lives abroad, and Carlos from Mexico who's planning to relocate."
-    )
-
-    turns.append({
-        "speaker": "Moderator",
-        "message": intro,
-        "tts": None,
-    })
-
-    for turn in range(MAX_TURNS):
-        prompt = build_travel_prompt(turns, topic, characters)
+    async def join(self):
+        """Wait until every scheduled turn has its audio and has been emitted."""
+        if self.tasks:
+            await asyncio.gather(*self.tasks)
 
-        response = await call_groq([
-            {"role": "system", "content": build_travel_system_prompt(characters)},
-            {"role": "user", "content": prompt},
-        ])
+    def cancel(self):
+        """Drop any audio still in flight (e.g. when a later LLM call failed)."""
+        for task in self.tasks + self.prefetched:
+            if not task.done():
+                task.cancel()
 
-        parsed = normalize_responses(parse_responses(response), characters)
-        parsed = attach_accents(parsed, characters)
-
-        # Parallelize TTS for all speakers in this turn
-        parsed = await generate_tts_batch(parsed, tts_enabled)
-
-        for entry in parsed:
-            turns.append({
-                "speaker": entry["speaker"],
-                "message": entry["message"],
-                "tts": entry.get("tts"),
-            })
 
-    return {
-        "topic": topic,
-        "turns": turns,
-    }
+async def emit_entry(on_entry, entry):
+    """Hand a finished turn entry to the streaming callback, if one is set."""
+    if on_entry is not None:
+        await on_entry(dict(entry))
 
 
-def build_government_jobs_system_prompt(characters):
-    return """
-You are generating a lively, engaging roundtable discussion with EXACTLY 4 characters.
-
-CHARACTERS:
-- Exam Strategist: Experienced mentor, practical and strategic
-- Serving Officer: Current government officer, realistic and grounded
-- Fresh Qualifier: Recent exam qualifier, energetic and relatable
-- Citizen: Informed citizen, asks tough questions, sometimes skeptical
-
-CONVERSATION STYLE:
-- Keep responses SHORT (1-3 sentences max)
-- Use natural, conversational language
-- Show personality and emotion
-- Disagree respectfully when appropriate
-- Build on what others say
-- Ask follow-up questions
-- Use examples and stories
-
-OUTPUT RULES:
-1. Output ONLY valid JSON
-2. Output ONLY a JSON list
-3. EXACTLY 4 objects with "speaker" and "message"
-4. NO markdown, NO code blocks, NO trailing commas
-5. Each message: 1-3 sentences maximum
-"""
-
-
-def build_travel_system_prompt(characters):
-    char_descriptions = "\n".join([
-        f"- {c['name']}: {c['role']} - {c['perspective']}"
-        for c in characters
-    ])
+async def run_roundtable(tts_enabled=True, topic_type="government_jobs", on_entry=None):
+    """
+    Run a roundtable discussion.
     
-    return f"""
-You are generating a lively, engaging roundtable discussion about travel destinations with EXACTLY 4 characters.
-
-CHARACTERS:
-{char_descriptions}
-
-DESTINATIONS TO DISCUSS:
-- Salt Lake City, USA: Mountain activities, skiing, Temple Square, craft breweries
-- Abu Dhabi, UAE: Sheikh Zayed Grand Mosque, Louvre, desert safaris, luxury
-- Chennai, India: Marina Beach, temples, filter coffee, seafood
-- Bangalore, India: Tech hub, gardens, pub culture, pleasant weather
-- Manchester, UK: Football, music scene, industrial heritage, Northern Quarter
-
-CONVERSATION STYLE:
-- Keep responses SHORT (1-3 sentences max)
-- Share specific recommendations: places to visit, food to try, best seasons, activities
-- Use natural, conversational language with personality
-- Each character brings their unique perspective (visited, researched, sister's stories, planning to move)
-- Build on what others say
-- Ask follow-up questions
-- Share practical tips and personal insights
-
-OUTPUT RULES:
-1. Output ONLY valid JSON
-2. Output ONLY a JSON list
-3. EXACTLY 4 objects with "speaker" and "message"
-4. NO markdown, NO code blocks, NO trailing commas
-5. Each message: 1-3 sentences maximum
-"""
-
-
-def build_government_jobs_prompt(turns, topic, characters):
-    history = ""
-    for t in turns[-6:]:
-        history += f"{t['speaker']}: {t['message']}\n"
-
-    return f"""
-Topic: {topic}
-
-Recent conversation:
-{history}
-
-Now generate the NEXT TURN with natural, engaging responses.
-
-GUIDELINES:
-- Keep each response 1-3 sentences
-- Show personality and emotion
-- React to what others said
-- Ask questions or challenge ideas when natural
-- Use examples from Indian context
-- Make it sound like a real conversation
-
-Respond with JSON list of 4 objects:
+    Args:
+        tts_enabled: Enable text-to-speech
+        topic_type: Key in app.topics.TOPICS ("government_jobs", "travel", "tech_startup",
+            "personal_finance", "mental_health"); unknown keys fall back to government_jobs
+        on_entry: Optional async callback awaited with each turn entry (intro first)
+            as soon as its text and audio are ready
 
-[
-  {{"speaker": "Exam Strategist", "message": "Short, natural response" }},
-  {{"speaker": "Serving Officer", "message": "Short, natural response" }},
-  {{"speaker": "Fresh Qualifier", "message": "Short, natural response" }},
-  {{"speaker": "Citizen", "message": "Short, natural response" }}
-]
+    The returned episode carries a "timeline" of LLM, parse, normalize and
+    TTS spans (see app.timeline).
+    """
+    spec = get_topic(topic_type)
+    characters = spec.characters
+    context = ConversationContext(spec)
+    started = time.perf_counter()
+    result = "error"
+    # TTS tasks started below copy the context, so their spans land here too
+    timeline = Timeline()
+    timeline_token = current_timeline.set(timeline)
+
+    turns = [{
+        "speaker": "Moderator",
+        "message": spec.intro,
+        "tts": None,
+    }]
+    await emit_entry(on_entry, turns[-1])
 
-NO extra text. NO markdown.
-"""
+    synthesizer = TurnSynthesizer(tts_enabled, on_entry)
+    try:
+        for turn in range(MAX_TURNS):
+            data = await complete_turn(context, turns, characters, synthesizer, timeline)
 
+            with timeline.span("normalize", turn=turn) as span:
+                parsed = normalize_responses(data, characters)
+                parsed = attach_accents(parsed, characters)
+                span["entries"] = len(parsed)
 
-def build_travel_prompt(turns, topic, characters):
-    history = ""
-    for t in turns[-6:]:
-        history += f"{t['speaker']}: {t['message']}\n"
+            # Parallel TTS for all speakers in this turn, overlapped with the next LLM call
+            await synthesizer.submit(turns, parsed)
 
-    speaker_names = [c['name'] for c in characters]
-    json_template = ",\n  ".join([
-        f'{{"speaker": "{name}", "message": "Short, natural travel tip/recommendation"}}'
-        for name in speaker_names
-    ])
+        await synthesizer.join()
+        result = "ok"
+    finally:
+        synthesizer.cancel()
+        current_timeline.reset(timeline_token)
+        EPISODE_SECONDS.observe(time.perf_counter() - started, topic=spec.key, result=result)
 
-    return f"""
-Topic: {topic}
+    return {
+        "topic": spec.topic,
+        "turns": turns,
+        "llm_calls": context.calls,
+        "timeline": timeline.to_dict(),
+    }
 
-Recent conversation:
-{history}
 
-Now generate the NEXT TURN. Each person shares travel tips about one or more cities.
+async def complete_turn(context, turns, characters, synthesizer, timeline=None):
+    """
+    Ask the model for the next turn and return the raw list of speaker objects.
 
-GUIDELINES:
-- Keep each response 1-3 sentences
-- Share specific recommendations (places, food, seasons, activities)
-- Each character brings their unique perspective
-- React to what others shared
-- Ask follow-up questions
-- Be enthusiastic and helpful
+    With STREAM_LLM, each {"speaker", "message"} object is handed to TTS as
+    soon as it closes in the stream, while the model is still writing the
+    remaining speakers. Falls back to parse_responses on the full text if no
+    object could be parsed incrementally. LLM and parse spans are added to
+    timeline when one is given.
+    """
+    timeline = timeline or Timeline()
+    turn = len(context.calls)
+    messages = context.build_messages(turns)
+
+    if not STREAM_LLM:
+        started = time.perf_counter()
+        data = await chat_completion(messages)
+        content = data["choices"][0]["message"]["content"]
+        context.record(messages, data.get("usage"))
+        timeline.add("llm", started, turn=turn, bytes=len(content.encode("utf-8")), **usage_attrs(data.get("usage")))
+        with timeline.span("parse", turn=turn):
+            return parse_responses(content)
+
+    stream = CompletionStream(messages)
+    parser = JsonObjectStream()
+    started = time.perf_counter()
+    first_delta = None
+    parse_seconds = 0.0
+    async for delta in stream:
+        if first_delta is None:
+            first_delta = time.perf_counter()
+        feed_started = time.perf_counter()
+        done = parser.feed(delta)
+        parse_seconds += time.perf_counter() - feed_started
+        first = len(parser.objects) - len(done)
+        for i, obj in enumerate(done):
+            speaker, message = entry_fields(obj, first + i, characters)
+            # Unknown speakers are dropped by normalize_responses; don't voice them
+            accent = speaker_accent(speaker, characters)
+            if message and accent is not None:
+                synthesizer.prefetch(message, accent)
+    finished = time.perf_counter()
+    context.record(messages, stream.usage)
+    timeline.add(
+        "llm", started, finished, turn=turn, bytes=len(stream.content.encode("utf-8")),
+        ttfb_ms=round((first_delta - started) * 1000, 1) if first_delta is not None else None,
+        **usage_attrs(stream.usage),
+    )
 
-Respond with JSON list of 4 objects:
+    if parser.objects:
+        PARSE_RESULTS.inc(result="stream")
+        # Incremental parsing is interleaved with the stream: busy_ms is the time actually spent in it
+        timeline.add("parse", first_delta, finished, turn=turn, mode="stream",
+                     busy_ms=round(parse_seconds * 1000, 1), objects=len(parser.objects))
+        return parser.objects
+    with timeline.span("parse", turn=turn, mode="full"):
+        return parse_responses(stream.content)
 
-[
-  {json_template}
-]
 
-NO extra text. NO markdown.
-"""
+def usage_attrs(usage):
+    """Token counts of a completion's usage, as timeline span attributes."""
+    usage = usage or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+    }
 
 
 def parse_responses(text):
@@ -283,7 +247,9 @@ def parse_responses(text):
 
     # Case 1: Already valid JSON
     try:
-        return json.loads(text)
+        data = json.loads(text)
+        PARSE_RESULTS.inc(result="json")
+        return data
     except:
         pass
 
@@ -295,13 +261,27 @@ def parse_responses(text):
         # Remove trailing commas before ] or }
         candidate = re.sub(r",\s*(\]|\})", r"\1", candidate)
         try:
-            return json.loads(candidate)
+            data = json.loads(candidate)
+            PARSE_RESULTS.inc(result="fallback")
+            return data
         except:
             pass
 
+    PARSE_RESULTS.inc(result="failure")
     raise RuntimeError(f"Groq returned invalid JSON:\n{text}")
 
 
+def entry_fields(entry, idx, characters):
+    """Pull (speaker, message) out of one model object, tolerating alternate key names."""
+    speaker = entry.get("speaker") or entry.get("name") or entry.get("character")
+    message = entry.get("message") or entry.get("text") or entry.get("content")
+
+    if not speaker and idx < len(characters):
+        speaker = characters[idx]["name"]
+
+    return speaker, message
+
+
 def normalize_responses(data, characters):
     """Ensure each entry has 'speaker' and 'message' keys and map to known characters."""
     if not isinstance(data, list):
@@ -314,12 +294,7 @@ def normalize_responses(data, characters):
         if not isinstance(entry, dict):
             continue
 
-        speaker = entry.get("speaker") or entry.get("name") or entry.get("character")
-        message = entry.get("message") or entry.get("text") or entry.get("content")
-
-        if not speaker and idx < len(characters):
-            speaker = characters[idx]["name"]
-
+        speaker, message = entry_fields(entry, idx, characters)
         if not speaker or not message:
             continue
 
@@ -330,6 +305,7 @@ def normalize_responses(data, characters):
     for c in characters:
         if c["name"] not in used_speakers:
             normalized.append({"speaker": c["name"], "message": "Let's continue."})
+            PLACEHOLDER_FILLS.inc()
 
     # Keep exactly one entry per character in the same order
     final = []
@@ -342,6 +318,14 @@ def normalize_responses(data, characters):
     return final
 
 
+def speaker_accent(speaker, characters):
+    """Accent of a known character, None for anyone else."""
+    for c in characters:
+        if c["name"] == speaker:
+            return c["accent"]
+    return None
+
+
 def attach_accents(data, characters):
     for entry in data:
         entry.setdefault("accent", "default")
@@ -349,209 +333,3 @@ def attach_accents(data, characters):
             if c["name"] == entry["speaker"]:
                 entry["accent"] = c["accent"]
     return data
-
-
-# ===== NEW TOPIC FUNCTIONS =====
-
-async def run_tech_startup_roundtable(tts_enabled=True):
-    topic = "Tech Startup Insights & Entrepreneurship"
-    characters = TECH_STARTUP_CHARACTERS
-    turns = []
-
-    intro = (
-        "Welcome to Tech Startup Roundtable! Today we're discussing key aspects of building a successful tech startup. "
-        "Our panel includes Vikram (CEO), Sofia (Product Manager), Alex (CTO), and Jasmine (Growth). "
-        "They'll share real-world insights on fundraising, scaling, hiring, and achieving product-market fit."
-    )
-
-    turns.append({
-        "speaker": "Moderator",
-        "message": intro,
-        "tts": None,
-    })
-
-    for turn in range(MAX_TURNS):
-        prompt = f"""
-Topic: {topic}
-
-Recent conversation:
-{''.join([f"{t['speaker']}: {t['message']}\n" for t in turns[-6:]])}
-
-Generate the NEXT TURN with natural responses from 4 startup experts.
-
-GUIDELINES:
-- Keep each response 1-3 sentences
-- Share practical startup wisdom
-- Mention real metrics and numbers where relevant
-- React to what others said
-- Ask follow-up questions when natural
-
-Respond with JSON list of 4 objects:
-
-[
-  {{"speaker": "Vikram", "message": "Short, natural startup insight"}},
-  {{"speaker": "Sofia", "message": "Short, natural startup insight"}},
-  {{"speaker": "Alex", "message": "Short, natural startup insight"}},
-  {{"speaker": "Jasmine", "message": "Short, natural startup insight"}}
-]
-
-NO extra text. NO markdown.
-"""
-
-        response = await call_groq([
-            {"role": "system", "content": "You are 4 experienced startup founders and operators having a lively discussion about tech startups."},
-            {"role": "user", "content": prompt},
-        ])
-
-        parsed = normalize_responses(parse_responses(response), characters)
-        parsed = attach_accents(parsed, characters)
-        parsed = await generate_tts_batch(parsed, tts_enabled)
-
-        for entry in parsed:
-            turns.append({
-                "speaker": entry["speaker"],
-                "message": entry["message"],
-                "tts": entry.get("tts"),
-            })
-
-    return {
-        "topic": topic,
-        "turns": turns,
-    }
-
-
-async def run_personal_finance_roundtable(tts_enabled=True):
-    topic = "Personal Finance & Wealth Building"
-    characters = PERSONAL_FINANCE_CHARACTERS
-    turns = []
-
-    intro = (
-        "Welcome to Personal Finance Roundtable! Today we're discussing money management, investing, and building wealth. "
-        "Our expert panel includes Raj (Financial Advisor), Isabella (Money Coach), Marcus (Entrepreneur), and Priya (Student). "
-        "They'll cover budgeting, investing, debt management, and creating financial freedom."
-    )
-
-    turns.append({
-        "speaker": "Moderator",
-        "message": intro,
-        "tts": None,
-    })
-
-    for turn in range(MAX_TURNS):
-        prompt = f"""
-Topic: {topic}
-
-Recent conversation:
-{''.join([f"{t['speaker']}: {t['message']}\n" for t in turns[-6:]])}
-
-Generate the NEXT TURN with natural responses from 4 finance experts and learners.
-
-GUIDELINES:
-- Keep each response 1-3 sentences
-- Provide practical financial advice
-- Mention specific numbers and strategies
-- Address different perspectives (traditional vs modern approaches)
-- Ask clarifying questions
-- Be encouraging to those learning
-
-Respond with JSON list of 4 objects:
-
-[
-  {{"speaker": "Raj", "message": "Short, natural finance insight"}},
-  {{"speaker": "Isabella", "message": "Short, natural finance insight"}},
-  {{"speaker": "Marcus", "message": "Short, natural finance insight"}},
-  {{"speaker": "Priya", "message": "Short, natural finance question/response"}}
-]
-
-NO extra text. NO markdown.
-"""
-
-        response = await call_groq([
-            {"role": "system", "content": "You are 4 people discussing personal finance, investing, and wealth building with different perspectives."},
-            {"role": "user", "content": prompt},
-        ])
-
-        parsed = normalize_responses(parse_responses(response), characters)
-        parsed = attach_accents(parsed, characters)
-        parsed = await generate_tts_batch(parsed, tts_enabled)
-
-        for entry in parsed:
-            turns.append({
-                "speaker": entry["speaker"],
-                "message": entry["message"],
-                "tts": entry.get("tts"),
-            })
-
-    return {
-        "topic": topic,
-        "turns": turns,
-    }
-
-
-async def run_mental_health_roundtable(tts_enabled=True):
-    topic = "Mental Health, Wellness & Personal Growth"
-    characters = MENTAL_HEALTH_CHARACTERS
-    turns = []
-
-    intro = (
-        "Welcome to Mental Health & Wellness Roundtable! Today we're discussing mental well-being, stress, relationships, and personal growth. "
-        "Our panel includes Dr. Arjun (Psychologist), Luna (Life Coach), James (Advocate), and Divya (Wellness Officer). "
-        "They'll share practical strategies for managing anxiety, improving sleep, healthy boundaries, and building resilience."
-    )
-
-    turns.append({
-        "speaker": "Moderator",
-        "message": intro,
-        "tts": None,
-    })
-
-    for turn in range(MAX_TURNS):
-        prompt = f"""
-Topic: {topic}
-
-Recent conversation:
-{''.join([f"{t['speaker']}: {t['message']}\n" for t in turns[-6:]])}
-
-Generate the NEXT TURN with natural responses from 4 mental health and wellness experts.
-
-GUIDELINES:
-- Keep each response 1-3 sentences
-- Share evidence-based mental health insights
-- Be empathetic and non-judgmental
-- Mention specific techniques and practices
-- Address stigma around mental health openly
-- Encourage seeking help when needed
-- Be authentic about struggles
-
-Respond with JSON list of 4 objects:
-
-[
-  {{"speaker": "Dr. Arjun", "message": "Short, natural mental health insight"}},
-  {{"speaker": "Luna", "message": "Short, natural wellness perspective"}},
-  {{"speaker": "James", "message": "Short, authentic personal experience"}},
-  {{"speaker": "Divya", "message": "Short, practical organizational insight"}}
-]
-
-NO extra text. NO markdown.
-"""
-
-        response = await call_groq([
-            {"role": "system", "content": "You are 4 mental health professionals and advocates having an open, empathetic discussion about mental wellness and personal growth."},
-            {"role": "user", "content": prompt},
-        ])
-
-        parsed = normalize_responses(parse_responses(response), characters)
-        parsed = attach_accents(parsed, characters)
-        parsed = await generate_tts_batch(parsed, tts_enabled)
-
-        for entry in parsed:
-            turns.append({
-                "speaker": entry["speaker"],
-                "message": entry["message"],
-                "tts": entry.get("tts"),
-            })
-
-    return {
-        "topic": topic,
-        "turns": turns,
-    }
\ No newline at end of file
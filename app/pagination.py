@@ -0,0 +1,91 @@
+# pagination.py
+
+import base64
+import orjson
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(key: tuple) -> str:
+    """Opaque, URL-safe token for the sort key of the last item on a page."""
+    return base64.urlsafe_b64encode(orjson.dumps(list(key))).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int = 2) -> tuple:
+    """
+    Inverse of encode_cursor. Sort keys are tuples of size strings (date, id);
+    raises ValueError for malformed tokens or any other shape.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = orjson.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    # A well-formed token of another shape would make paginate compare str with int (TypeError, not 400)
+    if not isinstance(key, list) or len(key) != size or not all(isinstance(part, str) for part in key):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return tuple(key)
+
+
+def parse_date(value: Optional[str], name: str) -> Optional[str]:
+    """Validate an ISO-8601 date/datetime filter and return it in isoformat."""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError as e:
+        raise ValueError(f"Invalid {name} date: {value}") from e
+
+
+def filter_items(
+    items: List[dict],
+    date_field: str,
+    topic: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> List[dict]:
+    """Filter by case-insensitive topic substring and [since, until) on date_field."""
+    if topic:
+        needle = topic.lower()
+        items = [it for it in items if needle in (it.get("topic") or "").lower()]
+    if since:
+        items = [it for it in items if it.get(date_field, "") >= since]
+    if until:
+        items = [it for it in items if it.get(date_field, "") < until]
+    return items
+
+
+def paginate(
+    items: List[dict],
+    sort_key: Callable[[dict], tuple],
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Keyset pagination over items already sorted newest first by sort_key.
+
+    Returns (page, next_cursor); next_cursor is None on the last page. Cursors
+    hold the sort key rather than an offset, so pages stay stable when new
+    items are added at the front.
+    """
+    start = 0
+    if after:
+        last = decode_cursor(after)
+        # Binary search for the first item strictly older than the cursor
+        lo, hi = 0, len(items)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if sort_key(items[mid]) >= last:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = lo
+
+    page = items[start:start + limit]
+    next_cursor = None
+    if start + limit < len(items) and page:
+        next_cursor = encode_cursor(sort_key(page[-1]))
+    return page, next_cursor
@@ -0,0 +1,120 @@
+# range_response.py
+
+import os
+import re
+
+from fastapi import Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+
+from app.episode_cache import etag_matches
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class MediaSafeGZipMiddleware:
+    """
+    GZipMiddleware that passes requests for exclude_paths (a regex matched
+    against the path) straight through.
+
+    Compressing a ranged body breaks its Content-Length and Content-Range, and
+    only recent Starlette releases skip audio/* and 206 responses on their
+    own, so the audio routes are exempted by path.
+    """
+
+    def __init__(self, app, exclude_paths: str, **options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **options)
+        self.exclude_paths = re.compile(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.exclude_paths.match(scope["path"]):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+def parse_range(header: str, size: int):
+    """
+    (start, end) inclusive for a single `bytes=` range, or None to send the
+    whole file (no header, malformed, or multiple ranges).
+    Raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[6:].strip()
+    if "," in spec:
+        return None
+    first, dash, last = spec.partition("-")
+    if not dash:
+        return None
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+def _read_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def range_file_response(request: Request, path: str, media_type: str, etag: str = None, headers: dict = None):
+    """
+    Serve a file with single-range (206) support, ETag/If-None-Match and If-Range.
+
+    Starlette's FileResponse only handles Range in recent releases; this works
+    the same on every supported version. Routes using it must be listed in
+    MediaSafeGZipMiddleware's exclude_paths.
+    """
+    size = os.stat(path).st_size
+    base = {
+        "Accept-Ranges": "bytes",
+        **(headers or {}),
+    }
+    if etag:
+        base["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=base)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**base, "Content-Range": f"bytes */{size}"})
+
+    status = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        status = 206
+        start, end = byte_range
+        base["Content-Range"] = f"bytes {start}-{end}/{size}"
+    length = end - start + 1
+    base["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status, headers=base, media_type=media_type)
+    return StreamingResponse(_read_file(path, start, length), status_code=status, headers=base, media_type=media_type)
@@ -0,0 +1,163 @@
+# rate_limiter.py
+
+import os
+import re
+import time
+import asyncio
+import random
+
+# Client-side request/token budgets per minute; 0 (default) leaves that bucket off.
+# Groq's free tier for llama-3.1-8b-instant is GROQ_RPM=30 GROQ_TPM=6000.
+# Retry-After, x-ratelimit-* headers and 429 backoff apply either way.
+GROQ_RPM = float(os.getenv("GROQ_RPM", "0"))
+GROQ_TPM = float(os.getenv("GROQ_TPM", "0"))
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value) -> float:
+    """Parse Groq/OpenAI reset durations ("2m59.56s", "250ms", "7.66s", "12") into seconds."""
+    if value is None:
+        return 0.0
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(n) * scale[unit] for n, unit in _DURATION_PART.findall(value))
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RateLimiter:
+    """
+    Process-wide token buckets for requests/minute and tokens/minute.
+
+    acquire() reserves one request plus an estimated token cost and waits,
+    in FIFO order, until both buckets can cover it. After each response the
+    estimate is reconciled with the real `usage`, rate-limit headers can
+    only tighten the buckets, and a 429 pauses every caller until its
+    Retry-After has passed instead of letting them all hammer the API.
+    A limit of 0 turns its bucket off. clock and sleep are injectable for tests.
+    """
+
+    def __init__(self, rpm: float = GROQ_RPM, tpm: float = GROQ_TPM, clock=time.monotonic, sleep=asyncio.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = rpm
+        self.tokens = tpm
+        self.blocked_until = 0.0
+        self.updated = clock()
+        self.waiting = 0
+        self._lock = None
+        self._lock_loop = None
+
+    def configure(self, rpm: float = None, tpm: float = None):
+        """Change the limits at runtime (buckets start full); None keeps a limit, 0 turns it off."""
+        self.rpm = self.requests = float(self.rpm if rpm is None else rpm)
+        self.tpm = self.tokens = float(self.tpm if tpm is None else tpm)
+        self.blocked_until = 0.0
+        self.updated = self.clock()
+
+    def _get_lock(self):
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _refilled(self, now: float) -> tuple:
+        """(requests, tokens) available at now, without updating the bucket."""
+        elapsed = now - self.updated
+        return (
+            min(self.rpm, self.requests + elapsed * self.rpm / 60.0),
+            min(self.tpm, self.tokens + elapsed * self.tpm / 60.0),
+        )
+
+    def _refill(self):
+        now = self.clock()
+        self.requests, self.tokens = self._refilled(now)
+        self.updated = now
+
+    async def acquire(self, estimated_tokens: int):
+        """Wait for capacity for one request costing roughly estimated_tokens."""
+        need = min(float(estimated_tokens), self.tpm)
+        self.waiting += 1
+        try:
+            # asyncio.Lock wakes waiters in FIFO order, so callers are served fairly
+            async with self._get_lock():
+                while True:
+                    self._refill()
+                    wait = self.blocked_until - self.clock()
+                    if wait <= 0:
+                        # Until both buckets cover the request (<= 0: they do now)
+                        wait = max(
+                            (1 - self.requests) * 60.0 / self.rpm if self.rpm else 0.0,
+                            (need - self.tokens) * 60.0 / self.tpm if self.tpm else 0.0,
+                        )
+                        if wait <= 0:
+                            break
+                    await self.sleep(max(wait, 0.01))
+                if self.rpm:
+                    self.requests -= 1
+                self.tokens -= need
+        finally:
+            self.waiting -= 1
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Return (or charge) the difference between the estimate and real usage."""
+        if not self.tpm:
+            return
+        self._refill()
+        need = min(float(estimated_tokens), self.tpm)
+        self.tokens = min(self.tpm, self.tokens + need - actual_tokens)
+
+    def block_for(self, seconds: float):
+        """Pause all callers for at least `seconds` (e.g. after a 429)."""
+        self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+    def update_from_headers(self, headers):
+        """Tighten the buckets from x-ratelimit-* / retry-after response headers."""
+        self._refill()
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_tokens is not None:
+            try:
+                remaining = float(remaining_tokens)
+            except ValueError:
+                remaining = self.tokens if self.tpm else 1.0
+            if self.tpm:
+                self.tokens = min(self.tokens, remaining)
+                remaining = self.tokens
+            if remaining <= 0:
+                self.block_for(parse_duration(headers.get("x-ratelimit-reset-tokens")))
+
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        if remaining_requests is not None and remaining_requests.strip() == "0":
+            self.requests = 0
+            self.block_for(parse_duration(headers.get("x-ratelimit-reset-requests")))
+
+        retry_after = headers.get("retry-after")
+        if retry_after is not None:
+            self.block_for(parse_duration(retry_after))
+
+    def stats(self) -> dict:
+        # Read-only: acquire/reconcile on the event loop own the bucket
+        now = self.clock()
+        requests, tokens = self._refilled(now)
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "requests_available": round(requests, 2) if self.rpm else None,
+            "tokens_available": round(tokens) if self.tpm else None,
+            "waiting": self.waiting,
+            "blocked_for": round(max(0.0, self.blocked_until - now), 2),
+        }
+
+
+groq_limiter = RateLimiter()
@@ -0,0 +1,106 @@
+# scheduler.py
+"""
+Periodic jobs (audio cleanup) run by one elected worker per host.
+
+Every API worker starts a BackgroundScheduler whose only standing job is an
+election: try, without waiting, to take an exclusive flock on
+SCHEDULER_LOCK_FILE. The worker that gets it becomes leader, writes its pid
+into the file and adds the real jobs; the rest keep retrying every
+LEADER_RETRY_SECONDS. The kernel releases the lock when the leader exits or
+crashes, so the next retry elsewhere takes over.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app.file_lock import try_lock, unlock
+
+logger = logging.getLogger(__name__)
+
+# Lock file shared by all workers on the host; its holder runs the scheduled jobs
+SCHEDULER_LOCK_FILE = os.getenv("SCHEDULER_LOCK_FILE", os.path.join("episodes_data", "scheduler.lock"))
+# How often non-leaders check whether the leader is gone
+LEADER_RETRY_SECONDS = float(os.getenv("LEADER_RETRY_SECONDS", "15"))
+
+_scheduler = None
+# Serializes elections (scheduler thread) with stop_scheduler (shutdown)
+_state_lock = threading.Lock()
+_jobs = []
+_lock_fd = None
+_leader_since = None
+
+
+def is_leader() -> bool:
+    return _lock_fd is not None
+
+
+def _elect():
+    """Election job: take the lock if it is free and start the real jobs."""
+    global _lock_fd, _leader_since
+    with _state_lock:
+        if is_leader() or _scheduler is None:
+            return
+        fd = try_lock(SCHEDULER_LOCK_FILE)
+        if fd is None:
+            return
+        _lock_fd = fd
+        _leader_since = time.time()
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, f"{os.getpid()}\n".encode(), 0)
+        for func, trigger, kwargs in _jobs:
+            _scheduler.add_job(func, trigger, **kwargs)
+    logger.info(f"✅ Scheduler leader elected (pid {os.getpid()}): {len(_jobs)} jobs started")
+
+
+def start_scheduler(jobs: list):
+    """
+    Start electing; jobs are (func, trigger, trigger kwargs) tuples for
+    BackgroundScheduler.add_job, run only while this worker is leader.
+    """
+    global _scheduler, _jobs
+    if _scheduler is not None:
+        return
+    _jobs = list(jobs)
+    _scheduler = BackgroundScheduler()
+    # Elect right away, then keep retrying in case the leader goes away
+    _scheduler.add_job(_elect, "interval", seconds=LEADER_RETRY_SECONDS, next_run_time=datetime.now())
+    _scheduler.start()
+
+
+def stop_scheduler():
+    """Stop the jobs and hand leadership to the next worker that retries."""
+    global _scheduler, _lock_fd, _leader_since
+    with _state_lock:
+        if _scheduler is not None:
+            _scheduler.shutdown(wait=False)
+            _scheduler = None
+        if _lock_fd is not None:
+            os.ftruncate(_lock_fd, 0)
+            unlock(_lock_fd)
+            _lock_fd = None
+            _leader_since = None
+
+
+def leader_pid():
+    """pid of the current leader (or of one that died before anyone took over), if any."""
+    try:
+        with open(SCHEDULER_LOCK_FILE) as f:
+            return int(f.read().strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+
+def get_scheduler_stats() -> dict:
+    return {
+        "pid": os.getpid(),
+        "leader": is_leader(),
+        "leader_pid": leader_pid(),
+        "leader_since": _leader_since,
+        "running": _scheduler is not None,
+        "jobs": [job.name for job in _scheduler.get_jobs()] if _scheduler is not None else [],
+    }
@@ -0,0 +1,328 @@
+# speech_engine.py
+"""
+Resident espeak-ng synthesis: libespeak-ng loaded once per worker process
+through ctypes, instead of one espeak-ng fork/exec per clip.
+
+Workers live in a spawn-based ProcessPoolExecutor whose initializer loads
+and initializes the library; each job sets the voice (only when it differs
+from the worker's previous job) and the same rate/pitch/amplitude/word gap
+as the command line, synthesizes into memory and returns WAV bytes. The CLI
+remains the fallback when the library is missing or its workers die.
+
+Batches: synthesize_batch_wav() speaks several texts in one voice through a
+single espeak_Synth call, as SSML with a <mark> before each text, and splits
+the audio at the mark events the library reports.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import functools
+import io
+import logging
+import multiprocessing
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# "auto": use libespeak-ng when it can be found, "cli": always fork espeak-ng
+SPEECH_ENGINE = os.getenv("SPEECH_ENGINE", "auto").lower()
+# Explicit path to libespeak-ng.so (default: ctypes.util.find_library)
+ESPEAK_LIBRARY = os.getenv("ESPEAK_LIBRARY", "")
+# espeak-ng data directory, if not the library's built-in default
+ESPEAK_DATA_PATH = os.getenv("ESPEAK_DATA_PATH", "") or None
+
+# speak_lib.h constants
+AUDIO_OUTPUT_SYNCHRONOUS = 2
+INITIALIZE_DONT_EXIT = 0x8000
+POS_CHARACTER = 1
+CHARS_UTF8 = 1
+SSML = 0x10
+ENDPAUSE = 0x1000
+EE_OK = 0
+EVENT_LIST_TERMINATED = 0
+EVENT_MARK = 3
+# Command line flags -> espeak_PARAMETER
+CLI_PARAMETERS = {"-s": 1, "-a": 2, "-p": 3, "-g": 7}  # rate, volume (amplitude), pitch, word gap
+
+
+class _EventId(ctypes.Union):
+    _fields_ = [("number", ctypes.c_int), ("name", ctypes.c_char_p), ("string", ctypes.c_char * 8)]
+
+
+class _Event(ctypes.Structure):
+    """espeak_EVENT"""
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("unique_identifier", ctypes.c_uint),
+        ("text_position", ctypes.c_int),
+        ("length", ctypes.c_int),
+        ("audio_position", ctypes.c_int),
+        ("sample", ctypes.c_int),
+        ("user_data", ctypes.c_void_p),
+        ("id", _EventId),
+    ]
+
+
+SYNTH_CALLBACK = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(ctypes.c_short), ctypes.c_int, ctypes.POINTER(_Event))
+
+
+class EngineUnavailable(RuntimeError):
+    """The resident engine cannot be used; synthesize with the command line instead."""
+
+
+@functools.lru_cache(maxsize=1)
+def library_path():
+    """libespeak-ng to load, or None (looked up once: find_library may run ldconfig)."""
+    if ESPEAK_LIBRARY:
+        return ESPEAK_LIBRARY
+    return ctypes.util.find_library("espeak-ng")
+
+
+def engine_parameters(params: list) -> list:
+    """[(espeak_PARAMETER, value)] for the CLI flags in params ("-s", "100", ...)."""
+    pairs = []
+    for flag, value in zip(params[::2], params[1::2]):
+        if flag in CLI_PARAMETERS:
+            pairs.append((CLI_PARAMETERS[flag], int(value)))
+    return pairs
+
+
+# --- Worker side -------------------------------------------------------------
+
+class _Worker:
+    """Per-process library handle; created by the pool initializer."""
+
+    def __init__(self, path: str):
+        self.lib = ctypes.CDLL(path)
+        self.lib.espeak_Initialize.restype = ctypes.c_int
+        self.lib.espeak_Initialize.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+        self.lib.espeak_SetVoiceByName.argtypes = [ctypes.c_char_p]
+        self.lib.espeak_SetParameter.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        self.lib.espeak_Synth.argtypes = [
+            ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint, ctypes.c_int, ctypes.c_uint,
+            ctypes.c_uint, ctypes.POINTER(ctypes.c_uint), ctypes.c_void_p,
+        ]
+
+        data_path = ESPEAK_DATA_PATH.encode() if ESPEAK_DATA_PATH else None
+        self.sample_rate = self.lib.espeak_Initialize(AUDIO_OUTPUT_SYNCHRONOUS, 0, data_path, INITIALIZE_DONT_EXIT)
+        if self.sample_rate <= 0:
+            raise EngineUnavailable(f"espeak_Initialize failed ({self.sample_rate})")
+
+        self.chunks = []
+        self.marks = {}
+        # Keep a reference: the library calls back into it for every audio block
+        self.callback = SYNTH_CALLBACK(self._on_audio)
+        self.lib.espeak_SetSynthCallback(self.callback)
+        self.voice = None
+        self.parameters = {}
+
+    def _on_audio(self, wav, numsamples, events):
+        if numsamples > 0 and wav:
+            self.chunks.append(ctypes.string_at(wav, numsamples * 2))
+        i = 0
+        while events and events[i].type != EVENT_LIST_TERMINATED:
+            if events[i].type == EVENT_MARK and events[i].id.name:
+                # audio_position is in ms from the start of this espeak_Synth call
+                self.marks[events[i].id.name.decode()] = events[i].audio_position * self.sample_rate // 1000
+            i += 1
+        return 0
+
+    def configure(self, voice: str, params: list):
+        if voice != self.voice:
+            if self.lib.espeak_SetVoiceByName(voice.encode()) != EE_OK:
+                raise RuntimeError(f"espeak-ng has no voice {voice!r}")
+            self.voice = voice
+            # Changing voice resets the parameters to the voice's defaults
+            self.parameters = {}
+        for parameter, value in engine_parameters(params):
+            if self.parameters.get(parameter) != value:
+                self.lib.espeak_SetParameter(parameter, value, 0)
+                self.parameters[parameter] = value
+
+    def _synth(self, text: str, flags: int) -> bytes:
+        data = text.encode("utf-8") + b"\0"
+        self.chunks = []
+        self.marks = {}
+        if self.lib.espeak_Synth(data, len(data), 0, POS_CHARACTER, 0, flags, None, None) != EE_OK:
+            raise RuntimeError("espeak_Synth failed")
+        return b"".join(self.chunks)
+
+    def synthesize(self, voice: str, params: list, text: str) -> bytes:
+        self.configure(voice, params)
+        return wav_bytes(self._synth(text, CHARS_UTF8 | ENDPAUSE), self.sample_rate)
+
+    def synthesize_batch(self, voice: str, params: list, texts: list) -> list:
+        self.configure(voice, params)
+        pcm = self._synth(batch_ssml(texts), CHARS_UTF8 | SSML | ENDPAUSE)
+        bounds = split_bounds([self.marks.get(f"t{i}") for i in range(len(texts))], len(pcm) // 2)
+        return [wav_bytes(pcm[2 * start:2 * end], self.sample_rate) for start, end in bounds]
+
+
+def split_bounds(marks: list, total: int) -> list:
+    """
+    [(start, end)] sample ranges of each text from its mark position, up to
+    the next mark (the last one up to total). Raises RuntimeError unless every
+    range is non-empty and the marks strictly increase: a wrong split would be
+    cached under the clips' permanent names.
+    """
+    if None in marks:
+        raise RuntimeError(f"espeak-ng reported {len(marks) - marks.count(None)} of {len(marks)} marks")
+    bounds = list(zip(marks, marks[1:] + [total]))
+    if any(not 0 <= start < end <= total for start, end in bounds):
+        raise RuntimeError(f"espeak-ng marks {marks} do not split {total} samples into non-empty clips")
+    return bounds
+
+
+def batch_ssml(texts: list) -> str:
+    """One SSML document speaking texts in order, with mark t<i> where text i starts."""
+    parts = [f'<mark name="t{i}"/>{xml_escape(text)}' for i, text in enumerate(texts)]
+    return "<speak>" + " ".join(parts) + "</speak>"
+
+
+def xml_escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+_worker = None
+_worker_error = None
+
+
+def _init_worker(path: str):
+    global _worker, _worker_error
+    try:
+        _worker = _Worker(path)
+    except Exception as e:
+        # Don't break the pool: every job reports the error instead
+        _worker_error = f"{type(e).__name__}: {e}"
+
+
+def _require_worker() -> "_Worker":
+    if _worker is None:
+        raise EngineUnavailable(_worker_error or "speech engine not initialized")
+    return _worker
+
+
+def synthesize_wav(voice: str, params: list, text: str) -> bytes:
+    """WAV bytes of text in voice (runs in a pool worker)."""
+    return _require_worker().synthesize(voice, params, text)
+
+
+def synthesize_to_file(path: str, voice: str, params: list, text: str) -> float:
+    """Synthesize into path (runs in a pool worker); returns the CPU seconds it took."""
+    started = time.process_time()
+    audio = synthesize_wav(voice, params, text)
+    with open(path, "wb") as f:
+        f.write(audio)
+    return time.process_time() - started
+
+
+def synthesize_batch_wav(voice: str, params: list, texts: list) -> list:
+    """WAV bytes for each of texts, from one synthesis call (runs in a pool worker)."""
+    return _require_worker().synthesize_batch(voice, params, texts)
+
+
+def synthesize_batch_to_files(paths: list, voice: str, params: list, texts: list) -> float:
+    """Synthesize texts into paths with one call (runs in a pool worker); returns CPU seconds."""
+    started = time.process_time()
+    for path, audio in zip(paths, synthesize_batch_wav(voice, params, texts)):
+        with open(path, "wb") as f:
+            f.write(audio)
+    return time.process_time() - started
+
+
+def wav_bytes(pcm: bytes, sample_rate: int) -> bytes:
+    """16-bit mono PCM wrapped in a WAV header."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm)
+    return buf.getvalue()
+
+
+# --- Parent side -------------------------------------------------------------
+
+_pool = None
+_pool_size = None
+_disabled = None
+
+
+def engine_enabled() -> bool:
+    """True if clips should go through the resident engine rather than the CLI."""
+    if _disabled is not None or SPEECH_ENGINE == "cli":
+        return False
+    return library_path() is not None
+
+
+def disable_engine(reason: str):
+    """Fall back to the CLI for the rest of this process."""
+    global _disabled
+    if _disabled is None:
+        _disabled = reason
+        logger.warning(f"Speech engine disabled, using the espeak-ng command line: {reason}")
+    shutdown_engine()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_size
+    if _pool is None or _pool_size != workers:
+        shutdown_engine()
+        # spawn: workers only synthesize, they must not inherit the event loop or open sockets
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(library_path(),),
+        )
+        _pool_size = workers
+        logger.info(f"Speech engine: {workers} resident libespeak-ng workers ({library_path()})")
+    return _pool
+
+
+async def engine_synthesize_to(path: str, voice: str, params: list, text: str, workers: int) -> float:
+    """
+    Synthesize text into path on a resident worker; returns its CPU seconds.
+    Raises EngineUnavailable (after disabling the engine) if the library
+    cannot be used, so the caller can retry with the command line.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(workers), synthesize_to_file, path, voice, params, text)
+    except (EngineUnavailable, BrokenProcessPool) as e:
+        disable_engine(str(e) or type(e).__name__)
+        raise EngineUnavailable(str(e)) from e
+
+
+async def engine_synthesize_batch_to(paths: list, voice: str, params: list, texts: list, workers: int) -> float:
+    """Like engine_synthesize_to, for several texts in one voice through one engine call."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _get_pool(workers), synthesize_batch_to_files, paths, voice, params, texts,
+        )
+    except (EngineUnavailable, BrokenProcessPool) as e:
+        disable_engine(str(e) or type(e).__name__)
+        raise EngineUnavailable(str(e)) from e
+
+
+def shutdown_engine():
+    global _pool, _pool_size
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_size = None
+
+
+def get_engine_stats() -> dict:
+    return {
+        "engine": "libespeak-ng" if engine_enabled() else "cli",
+        "library": library_path(),
+        "workers": _pool_size,
+        "disabled": _disabled,
+    }
@@ -0,0 +1,74 @@
+# timeline.py
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+# Timeline of the episode being generated in the current task (tasks inherit it)
+current_timeline = ContextVar("current_timeline", default=None)
+
+
+class Timeline:
+    """
+    Stage spans for one episode: LLM calls, parsing, normalizing, TTS clips.
+
+    Offsets are milliseconds since the episode started. Each span is a small
+    dict {"stage", "start", "end", ...attrs} (attrs such as turn, tokens,
+    bytes), so the whole timeline can be stored with the episode.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now().isoformat()
+        self.origin = time.perf_counter()
+        self.spans = []
+
+    def offset(self, t: float = None) -> float:
+        """perf_counter value -> ms since the episode started."""
+        return round(((time.perf_counter() if t is None else t) - self.origin) * 1000, 1)
+
+    def add(self, stage: str, start: float, end: float = None, **attrs) -> dict:
+        """Record a span from perf_counter timestamps; attrs that are None are dropped."""
+        span = {"stage": stage, "start": self.offset(start), "end": self.offset(end)}
+        span.update((k, v) for k, v in attrs.items() if v is not None)
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        """Time a block; the yielded dict can be filled with attrs known only at the end."""
+        extra = dict(attrs)
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.add(stage, start, **extra)
+
+    def summary(self) -> dict:
+        """
+        Per stage: span count and summed duration (ms). Overlapping spans add
+        up; spans carrying busy_ms (work interleaved with another stage) count
+        only that.
+        """
+        stages = {}
+        for span in self.spans:
+            entry = stages.setdefault(span["stage"], {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            duration = span.get("busy_ms", span["end"] - span["start"])
+            entry["total_ms"] = round(entry["total_ms"] + duration, 1)
+        return stages
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at,
+            "total_ms": self.offset(),
+            "summary": self.summary(),
+            "spans": sorted(self.spans, key=lambda s: s["start"]),
+        }
+
+
+def record_span(stage: str, start: float, end: float = None, **attrs):
+    """Add a span to the current episode's timeline, if one is being recorded."""
+    timeline = current_timeline.get()
+    if timeline is not None:
+        timeline.add(stage, start, end, **attrs)
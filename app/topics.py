@@ -0,0 +1,238 @@
+# topics.py
+
+from app.characters import CHARACTERS
+from app.travel_characters import TRAVEL_CHARACTERS
+from app.tech_startup_characters import TECH_STARTUP_CHARACTERS
+from app.personal_finance_characters import PERSONAL_FINANCE_CHARACTERS
+from app.mental_health_characters import MENTAL_HEALTH_CHARACTERS
+
+DEFAULT_TOPIC = "government_jobs"
+
+
+class TopicSpec:
+    """
+    Everything the roundtable engine needs for one topic.
+
+    The static parts of the turn prompt (topic header, guidance, JSON
+    template) are rendered once here; per turn only the history is spliced in.
+    """
+
+    def __init__(self, key, topic, characters, intro, system_prompt, instructions, message_hints):
+        self.key = key
+        self.topic = topic
+        self.characters = characters
+        self.intro = intro
+        self.system_prompt = system_prompt
+
+        json_template = ",\n  ".join(
+            f'{{"speaker": "{c["name"]}", "message": "{message_hints.get(c["name"], message_hints.get("*"))}"}}'
+            for c in characters
+        )
+        self.prompt_head = f"\nTopic: {topic}\n\nRecent conversation:\n"
+        self.prompt_tail = (
+            f"\n\n{instructions.strip()}\n\n"
+            f"Respond with JSON list of {len(characters)} objects:\n\n"
+            f"[\n  {json_template}\n]\n\n"
+            "NO extra text. NO markdown.\n"
+        )
+        # Used when the full guidance does not fit the prompt token budget
+        self.prompt_tail_compact = (
+            "\nGenerate the NEXT TURN, 1-3 sentences each, reacting to the conversation.\n"
+            f"Respond with ONLY a JSON list:\n[\n  {json_template}\n]\n"
+        )
+
+    def build_prompt(self, history: str) -> str:
+        return self.prompt_head + history + self.prompt_tail
+
+
+OUTPUT_RULES = """
+OUTPUT RULES:
+1. Output ONLY valid JSON
+2. Output ONLY a JSON list
+3. EXACTLY 4 objects with "speaker" and "message"
+4. NO markdown, NO code blocks, NO trailing commas
+5. Each message: 1-3 sentences maximum
+"""
+
+
+GOVERNMENT_JOBS = TopicSpec(
+    key="government_jobs",
+    topic="Government Jobs and Exams in India",
+    characters=CHARACTERS,
+    intro=(
+        "Welcome to the AI Roundtable. Today we discuss Government Jobs and Exams in India. "
+        "Our panel includes an Exam Strategist, a Serving Officer, a Fresh Qualifier, and a Citizen."
+    ),
+    system_prompt="""
+You are generating a lively, engaging roundtable discussion with EXACTLY 4 characters.
+
+CHARACTERS:
+- Exam Strategist: Experienced mentor, practical and strategic
+- Serving Officer: Current government officer, realistic and grounded
+- Fresh Qualifier: Recent exam qualifier, energetic and relatable
+- Citizen: Informed citizen, asks tough questions, sometimes skeptical
+
+CONVERSATION STYLE:
+- Keep responses SHORT (1-3 sentences max)
+- Use natural, conversational language
+- Show personality and emotion
+- Disagree respectfully when appropriate
+- Build on what others say
+- Ask follow-up questions
+- Use examples and stories
+""" + OUTPUT_RULES,
+    instructions="""
+Now generate the NEXT TURN with natural, engaging responses.
+
+GUIDELINES:
+- Keep each response 1-3 sentences
+- Show personality and emotion
+- React to what others said
+- Ask questions or challenge ideas when natural
+- Use examples from Indian context
+- Make it sound like a real conversation
+""",
+    message_hints={"*": "Short, natural response"},
+)
+
+
+_travel_char_descriptions = "\n".join(
+    f"- {c['name']}: {c['role']} - {c['perspective']}" for c in TRAVEL_CHARACTERS
+)
+
+TRAVEL = TopicSpec(
+    key="travel",
+    topic="Our Favorite Travel Destinations",
+    characters=TRAVEL_CHARACTERS,
+    intro=(
+        "Welcome to the AI Roundtable Travel Edition! Today we're discussing amazing destinations: "
+        "Salt Lake City USA, Abu Dhabi UAE, Chennai and Bangalore in India, and Manchester UK. "
+        "Our panel includes Elena from Spain who's visited all these places, Fatima from UAE who's researched them extensively, "
+        "Priya from India whose sister lives abroad, and Carlos from Mexico who's planning to relocate."
+    ),
+    system_prompt=f"""
+You are generating a lively, engaging roundtable discussion about travel destinations with EXACTLY 4 characters.
+
+CHARACTERS:
+{_travel_char_descriptions}
+
+DESTINATIONS TO DISCUSS:
+- Salt Lake City, USA: Mountain activities, skiing, Temple Square, craft breweries
+- Abu Dhabi, UAE: Sheikh Zayed Grand Mosque, Louvre, desert safaris, luxury
+- Chennai, India: Marina Beach, temples, filter coffee, seafood
+- Bangalore, India: Tech hub, gardens, pub culture, pleasant weather
+- Manchester, UK: Football, music scene, industrial heritage, Northern Quarter
+
+CONVERSATION STYLE:
+- Keep responses SHORT (1-3 sentences max)
+- Share specific recommendations: places to visit, food to try, best seasons, activities
+- Use natural, conversational language with personality
+- Each character brings their unique perspective (visited, researched, sister's stories, planning to move)
+- Build on what others say
+- Ask follow-up questions
+- Share practical tips and personal insights
+""" + OUTPUT_RULES,
+    instructions="""
+Now generate the NEXT TURN. Each person shares travel tips about one or more cities.
+
+GUIDELINES:
+- Keep each response 1-3 sentences
+- Share specific recommendations (places, food, seasons, activities)
+- Each character brings their unique perspective
+- React to what others shared
+- Ask follow-up questions
+- Be enthusiastic and helpful
+""",
+    message_hints={"*": "Short, natural travel tip/recommendation"},
+)
+
+
+TECH_STARTUP = TopicSpec(
+    key="tech_startup",
+    topic="Tech Startup Insights & Entrepreneurship",
+    characters=TECH_STARTUP_CHARACTERS,
+    intro=(
+        "Welcome to Tech Startup Roundtable! Today we're discussing key aspects of building a successful tech startup. "
+        "Our panel includes Vikram (CEO), Sofia (Product Manager), Alex (CTO), and Jasmine (Growth). "
+        "They'll share real-world insights on fundraising, scaling, hiring, and achieving product-market fit."
+    ),
+    system_prompt="You are 4 experienced startup founders and operators having a lively discussion about tech startups.",
+    instructions="""
+Generate the NEXT TURN with natural responses from 4 startup experts.
+
+GUIDELINES:
+- Keep each response 1-3 sentences
+- Share practical startup wisdom
+- Mention real metrics and numbers where relevant
+- React to what others said
+- Ask follow-up questions when natural
+""",
+    message_hints={"*": "Short, natural startup insight"},
+)
+
+
+PERSONAL_FINANCE = TopicSpec(
+    key="personal_finance",
+    topic="Personal Finance & Wealth Building",
+    characters=PERSONAL_FINANCE_CHARACTERS,
+    intro=(
+        "Welcome to Personal Finance Roundtable! Today we're discussing money management, investing, and building wealth. "
+        "Our expert panel includes Raj (Financial Advisor), Isabella (Money Coach), Marcus (Entrepreneur), and Priya (Student). "
+        "They'll cover budgeting, investing, debt management, and creating financial freedom."
+    ),
+    system_prompt="You are 4 people discussing personal finance, investing, and wealth building with different perspectives.",
+    instructions="""
+Generate the NEXT TURN with natural responses from 4 finance experts and learners.
+
+GUIDELINES:
+- Keep each response 1-3 sentences
+- Provide practical financial advice
+- Mention specific numbers and strategies
+- Address different perspectives (traditional vs modern approaches)
+- Ask clarifying questions
+- Be encouraging to those learning
+""",
+    message_hints={"*": "Short, natural finance insight", "Priya": "Short, natural finance question/response"},
+)
+
+
+MENTAL_HEALTH = TopicSpec(
+    key="mental_health",
+    topic="Mental Health, Wellness & Personal Growth",
+    characters=MENTAL_HEALTH_CHARACTERS,
+    intro=(
+        "Welcome to Mental Health & Wellness Roundtable! Today we're discussing mental well-being, stress, relationships, and personal growth. "
+        "Our panel includes Dr. Arjun (Psychologist), Luna (Life Coach), James (Advocate), and Divya (Wellness Officer). "
+        "They'll share practical strategies for managing anxiety, improving sleep, healthy boundaries, and building resilience."
+    ),
+    system_prompt="You are 4 mental health professionals and advocates having an open, empathetic discussion about mental wellness and personal growth.",
+    instructions="""
+Generate the NEXT TURN with natural responses from 4 mental health and wellness experts.
+
+GUIDELINES:
+- Keep each response 1-3 sentences
+- Share evidence-based mental health insights
+- Be empathetic and non-judgmental
+- Mention specific techniques and practices
+- Address stigma around mental health openly
+- Encourage seeking help when needed
+- Be authentic about struggles
+""",
+    message_hints={
+        "Dr. Arjun": "Short, natural mental health insight",
+        "Luna": "Short, natural wellness perspective",
+        "James": "Short, authentic personal experience",
+        "Divya": "Short, practical organizational insight",
+    },
+)
+
+
+TOPICS = {
+    spec.key: spec
+    for spec in (GOVERNMENT_JOBS, TRAVEL, TECH_STARTUP, PERSONAL_FINANCE, MENTAL_HEALTH)
+}
+
+
+def get_topic(topic_type: str) -> TopicSpec:
+    """Look up a topic spec; unknown types fall back to government jobs."""
+    return TOPICS.get(topic_type, TOPICS[DEFAULT_TOPIC])
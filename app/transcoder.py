@@ -0,0 +1,225 @@
+# transcoder.py
+
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+import uuid
+
+from app.audio_catalog import SOURCE_FORMATS, audio_catalog, primary_format, split_audio_name
+
+logger = logging.getLogger(__name__)
+
+# Compressed variants written next to every synthesized clip (empty disables transcoding)
+TRANSCODE_FORMATS = [
+    f.strip().lower() for f in os.getenv("TRANSCODE_FORMATS", "opus,mp3").split(",") if f.strip()
+]
+# Max simultaneous ffmpeg processes per worker
+TRANSCODE_CONCURRENCY = max(1, int(os.getenv("TRANSCODE_CONCURRENCY", "2")))
+# How long a recorded episode's background audio step waits for its clips' variants
+TRANSCODE_WAIT = float(os.getenv("TRANSCODE_WAIT", "30"))
+# Delete the WAV/AIFF once every variant exists (saves most of the disk; /tts_output/<x>.wav links then 404)
+KEEP_SOURCE_AUDIO = os.getenv("KEEP_SOURCE_AUDIO", "false").lower() in ("1", "true", "yes")
+FFMPEG = os.getenv("FFMPEG", "ffmpeg")
+
+# Speech-tuned encoder settings (input is downmixed to mono)
+ENCODERS = {
+    # Ogg/Opus in VoIP mode: intelligible speech at a fraction of the WAV size
+    "opus": ["-c:a", "libopus", "-b:a", "24k", "-application", "voip"],
+    # MP3 fallback for clients without Opus support (older Safari)
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "48k"],
+}
+
+_slots = None
+_slots_loop = None
+_stats = {"active": 0, "waiting": 0, "completed": 0, "failed": 0, "bytes_in": 0, "bytes_out": 0}
+_inflight = {}  # variant path -> task
+_ffmpeg_path = None
+
+
+def get_transcode_stats():
+    """Transcoding queue depth, totals and compression achieved in this process."""
+    ratio = _stats["bytes_in"] / _stats["bytes_out"] if _stats["bytes_out"] else None
+    return {
+        "enabled": transcoding_enabled(),
+        "formats": TRANSCODE_FORMATS,
+        "concurrency": TRANSCODE_CONCURRENCY,
+        "compression_ratio": ratio,
+        **_stats,
+    }
+
+
+def transcoding_enabled() -> bool:
+    return bool(TRANSCODE_FORMATS) and ffmpeg_available()
+
+
+def ffmpeg_available() -> bool:
+    global _ffmpeg_path
+    if _ffmpeg_path is None:
+        _ffmpeg_path = shutil.which(FFMPEG) or ""
+        if not _ffmpeg_path:
+            logger.warning(f"{FFMPEG} not found; serving uncompressed audio only")
+    return bool(_ffmpeg_path)
+
+
+def _get_slots():
+    """Semaphore bounding concurrent ffmpeg runs, one per event loop."""
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots_loop is not loop:
+        _slots = asyncio.Semaphore(TRANSCODE_CONCURRENCY)
+        _slots_loop = loop
+    return _slots
+
+
+def variant_name(filename: str, fmt: str) -> str:
+    return f"{split_audio_name(filename)[0]}.{fmt}"
+
+
+def container_args(fmt: str) -> list:
+    """Encoder and muxer arguments for a variant format."""
+    return [*ENCODERS[fmt], "-f", "ogg" if fmt == "opus" else fmt]
+
+
+def build_transcode_command(src: str, dst: str, fmt: str) -> list:
+    return [FFMPEG, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+            "-i", src, "-ac", "1", *container_args(fmt), dst]
+
+
+async def run_ffmpeg(cmd: list) -> bytes:
+    """Run an ffmpeg/ffprobe command off the event loop, bounded by TRANSCODE_CONCURRENCY; returns stdout."""
+    slots = _get_slots()
+    _stats["waiting"] += 1
+    try:
+        await slots.acquire()
+    finally:
+        _stats["waiting"] -= 1
+
+    _stats["active"] += 1
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await proc.communicate()
+        except asyncio.CancelledError:
+            proc.kill()
+            await proc.wait()
+            raise
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+        return stdout
+    finally:
+        _stats["active"] -= 1
+        slots.release()
+
+
+async def _transcode(src: str, dst: str, fmt: str):
+    """Encode src into dst via a temp file + atomic rename."""
+    folder, name = os.path.split(dst)
+    before = audio_catalog.dir_version()
+    tmp_path = os.path.join(folder, f".{name}.{uuid.uuid4().hex}.tmp")
+    try:
+        await run_ffmpeg(build_transcode_command(src, tmp_path, fmt))
+        os.replace(tmp_path, dst)
+        _stats["completed"] += 1
+        _stats["bytes_in"] += os.path.getsize(src)
+        _stats["bytes_out"] += os.path.getsize(dst)
+    except Exception:
+        _stats["failed"] += 1
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if audio_catalog.owns(folder):
+        audio_catalog.add(name, before)
+
+
+async def _transcode_all(filename: str, folder: str, formats: list):
+    src = os.path.join(folder, filename)
+    results = await asyncio.gather(
+        *(_transcode(src, os.path.join(folder, variant_name(filename, fmt)), fmt) for fmt in formats),
+        return_exceptions=True,
+    )
+    for fmt, result in zip(formats, results):
+        if isinstance(result, BaseException):
+            stderr = getattr(result, "stderr", b"") or b""
+            logger.error(f"Transcoding {filename} to {fmt} failed: {result!r} {stderr.decode(errors='replace').strip()}")
+
+    if not KEEP_SOURCE_AUDIO and all(
+        os.path.exists(os.path.join(folder, variant_name(filename, fmt))) for fmt in TRANSCODE_FORMATS
+    ):
+        before = audio_catalog.dir_version()
+        os.remove(src)
+        if audio_catalog.owns(folder):
+            audio_catalog.discard(filename, before)
+
+
+def schedule_transcode(filename: str, folder: str):
+    """
+    Queue compressed variants of a freshly synthesized (or re-used) clip.
+
+    Runs in the background; speak_text does not wait for it. Variants that
+    already exist get their mtime refreshed so retention treats the clip as
+    one unit.
+    """
+    if split_audio_name(filename)[1] not in SOURCE_FORMATS or not transcoding_enabled():
+        return
+    src = os.path.join(folder, filename)
+    if not os.path.exists(src) or src in _inflight:
+        return
+
+    missing = []
+    for fmt in TRANSCODE_FORMATS:
+        dst = os.path.join(folder, variant_name(filename, fmt))
+        if os.path.exists(dst):
+            os.utime(dst)
+        elif fmt in ENCODERS:
+            missing.append(fmt)
+    if not missing:
+        return
+
+    task = asyncio.ensure_future(_transcode_all(filename, folder, missing))
+    _inflight[src] = task
+    task.add_done_callback(lambda _: _inflight.pop(src, None))
+
+
+async def wait_for_variants(filenames, folder: str = "tts_output", timeout: float = None):
+    """Wait (bounded by TRANSCODE_WAIT) for pending transcodes of the given clips, so they can be recorded."""
+    pending = [
+        _inflight[path]
+        for path in {os.path.join(folder, name) for name in filenames if name}
+        if path in _inflight
+    ]
+    if pending:
+        await asyncio.wait(pending, timeout=TRANSCODE_WAIT if timeout is None else timeout)
+
+
+def find_clip(filename: str, folder: str = "tts_output"):
+    """The name a clip is stored under now: the source, or a variant if the source was dropped."""
+    if os.path.exists(os.path.join(folder, filename)):
+        return filename
+    for fmt in TRANSCODE_FORMATS:
+        name = variant_name(filename, fmt)
+        if os.path.exists(os.path.join(folder, name)):
+            return name
+    return None
+
+
+def audio_variants(filename: str, folder: str = "tts_output") -> dict:
+    """{format: filename} for every format of the clip that exists on disk."""
+    found = {}
+    for fmt in (split_audio_name(filename)[1], *TRANSCODE_FORMATS):
+        name = variant_name(filename, fmt)
+        if fmt not in found and os.path.exists(os.path.join(folder, name)):
+            found[fmt] = name
+    return found
+
+
+def primary_variant(variants: dict):
+    """Filename a clip is listed under, given audio_variants()."""
+    return variants[primary_format(variants)] if variants else None
@@ -1,9 +1,39 @@
 # tts_client.py
 
+import asyncio
+import hashlib
+import json
 import subprocess
 import os
-import time
 import platform
+import resource
+import time
+import uuid
+
+from app.audio_catalog import audio_catalog
+from app.metrics import TTS_QUEUE_WAIT_SECONDS, TTS_REQUESTS, TTS_SYNTHESIS_SECONDS
+from app.speech_engine import (
+    EngineUnavailable,
+    engine_enabled,
+    engine_synthesize_batch_to,
+    engine_synthesize_to,
+    get_engine_stats,
+)
+from app.timeline import record_span
+from app.transcoder import find_clip, schedule_transcode
+
+# Max simultaneous synthesis processes per worker (espeak-ng is single-threaded)
+TTS_CONCURRENCY = max(1, int(os.getenv("TTS_CONCURRENCY", str(os.cpu_count() or 2))))
+
+# Synthesize each turn's same-voice entries in one engine call (needs the resident engine)
+TTS_BATCH = os.getenv("TTS_BATCH", "false").lower() in ("1", "true", "yes")
+
+_slots = None
+_slots_loop = None
+_stats = {"active": 0, "waiting": 0, "completed": 0, "failed": 0, "cache_hits": 0, "cpu_seconds": 0.0}
+_inflight = {}
+# Optional process pool the synthesis commands run in (see use_process_pool)
+_executor = None
 
 # Voice mapping for espeak-ng (Linux) and say (macOS)
 VOICE_MAP_MACOS = {
@@ -38,34 +68,319 @@ def resolve_voice(accent):
     else:
         return VOICE_MAP_LINUX.get(accent, VOICE_MAP_LINUX["default"])
 
-async def speak_text(text, accent, folder="tts_output"):
-    """Generate speech audio file using platform-appropriate TTS"""
-    os.makedirs(folder, exist_ok=True)
-    
-    timestamp = int(time.time() * 1000)
-    
+def get_tts_stats():
+    """Current synthesis queue depth and totals for this process."""
+    return {"concurrency": TTS_CONCURRENCY, "batch": batching_enabled(), **_stats, **get_engine_stats()}
+
+
+def batching_enabled():
+    """True if speak_turn synthesizes same-voice entries together."""
+    return TTS_BATCH and not is_macos() and engine_enabled()
+
+
+def _get_slots():
+    """Global semaphore bounding concurrent synthesis, one per event loop."""
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots_loop is not loop:
+        _slots = asyncio.Semaphore(TTS_CONCURRENCY)
+        _slots_loop = loop
+    return _slots
+
+
+def use_process_pool(executor, concurrency=None):
+    """
+    Run synthesis commands in a concurrent.futures executor instead of as
+    asyncio subprocesses (None switches back). Used by the bulk generator, where
+    pool workers also measure the CPU time each command consumed. concurrency
+    replaces TTS_CONCURRENCY (normally the pool size).
+    """
+    global _executor, TTS_CONCURRENCY, _slots
+    _executor = executor
+    if concurrency:
+        TTS_CONCURRENCY = max(1, int(concurrency))
+        _slots = None
+
+
+def run_tts_blocking(cmd):
+    """Run one synthesis command synchronously (in a pool worker); returns its CPU seconds."""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+
+async def run_tts_job(job, *args):
+    """
+    Await job(*args) bounded by TTS_CONCURRENCY, with queue/run stats and
+    metrics. job may return CPU seconds to add to the stats. Returns
+    {"queue_ms", "run_ms"}.
+    """
+    slots = _get_slots()
+    _stats["waiting"] += 1
+    queued = time.perf_counter()
+    try:
+        await slots.acquire()
+    finally:
+        _stats["waiting"] -= 1
+    started = time.perf_counter()
+    TTS_QUEUE_WAIT_SECONDS.observe(started - queued)
+
+    _stats["active"] += 1
+    try:
+        cpu = await job(*args)
+        if cpu:
+            _stats["cpu_seconds"] += cpu
+        _stats["completed"] += 1
+        return _command_timing(queued, started)
+    except EngineUnavailable:
+        # Not a synthesis failure: the caller retries with the command line
+        raise
+    except Exception:
+        _stats["failed"] += 1
+        raise
+    finally:
+        _stats["active"] -= 1
+        slots.release()
+        TTS_SYNTHESIS_SECONDS.observe(time.perf_counter() - started)
+
+
+async def run_tts_command(cmd):
+    """Run a synthesis command without blocking the event loop, bounded by TTS_CONCURRENCY."""
+    return await run_tts_job(_exec_tts_command, cmd)
+
+
+async def _exec_tts_command(cmd):
+    if _executor is not None:
+        return await asyncio.get_running_loop().run_in_executor(_executor, run_tts_blocking, cmd)
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+
+
+def _command_timing(queued, started):
+    return {
+        "queue_ms": round((started - queued) * 1000, 1),
+        "run_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def audio_filename(text, accent, voice, engine, params, ext):
+    """Content-addressed filename: identical inputs always map to the same file."""
+    key = json.dumps([engine, voice, accent, params, text], ensure_ascii=False)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+    return f"{digest}.{ext}"
+
+
+def build_tts_command(text, accent, out_path=None):
+    """Return (engine, voice, params, extension, command) for the current platform."""
+    voice = resolve_voice(accent)
     if is_macos():
         # macOS: use native 'say' command with AIFF format (for local testing only)
-        filename = f"{timestamp}.aiff"
-        filepath = os.path.join(folder, filename)
-        voice = resolve_voice(accent)
-        subprocess.run(["say", "-v", voice, text, "-o", filepath], check=True)
-    else:
-        # Linux: use espeak-ng with improved quality settings
-        filename = f"{timestamp}.wav"
-        filepath = os.path.join(folder, filename)
-        voice = resolve_voice(accent)
-        
-        # espeak-ng with quality improvements for clarity:
-        # -s: speed 100 (very slow for crystal clear speech, default is 175)
-        # -p: pitch 50 (natural tone)
-        # -a: amplitude 200 (very loud and clear, boost from 100 default)
-        # -g: word gap 15ms (increase pause between words for clarity)
-        subprocess.run(
-            ["espeak-ng", "-v", voice, "-s", "100", "-p", "50", "-a", "200", "-g", "15", "-w", filepath, text],
-            check=True,
-            capture_output=True
+        return "say", voice, [], "aiff", ["say", "-v", voice, text, "-o", out_path]
+
+    # Linux: use espeak-ng with improved quality settings
+    # espeak-ng with quality improvements for clarity:
+    # -s: speed 100 (very slow for crystal clear speech, default is 175)
+    # -p: pitch 50 (natural tone)
+    # -a: amplitude 200 (very loud and clear, boost from 100 default)
+    # -g: word gap 15ms (increase pause between words for clarity)
+    params = ["-s", "100", "-p", "50", "-a", "200", "-g", "15"]
+    return "espeak-ng", voice, params, "wav", ["espeak-ng", "-v", voice, *params, "-w", out_path, text]
+
+
+async def _synthesize_to(filepath, text, accent, ext):
+    """
+    Synthesize into a temp file next to filepath, then atomically rename it
+    into place and catalog it. Returns the command timing plus write_ms (the
+    rename).
+    """
+    folder, filename = os.path.split(filepath)
+    before = audio_catalog.dir_version()
+    stem = filename.rsplit(".", 1)[0]
+    # Keep the real extension last: 'say' picks its output format from it
+    tmp_path = os.path.join(folder, f".{stem}.{uuid.uuid4().hex}.tmp.{ext}")
+    try:
+        engine, voice, params, _, cmd = build_tts_command(text, accent, tmp_path)
+        timing = None
+        if engine == "espeak-ng" and engine_enabled():
+            try:
+                # Resident libespeak-ng worker: no fork/exec or voice reload per clip
+                timing = await run_tts_job(engine_synthesize_to, tmp_path, voice, params, text, TTS_CONCURRENCY)
+            except EngineUnavailable:
+                timing = None
+        if timing is None:
+            timing = await run_tts_command(cmd)
+        renamed = time.perf_counter()
+        os.replace(tmp_path, filepath)
+        timing["write_ms"] = round((time.perf_counter() - renamed) * 1000, 1)
+        if audio_catalog.owns(folder):
+            audio_catalog.add(filename, before)
+        return timing
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def _synthesize_batch_to(items, voice, params, ext):
+    """
+    Synthesize [(filepath, text)] in one voice through a single engine call,
+    renaming each clip into place and cataloging it. Returns the shared
+    timing plus "batch" (the number of clips).
+    """
+    before = audio_catalog.dir_version()
+    tmp_paths = [
+        os.path.join(os.path.dirname(filepath), f".{uuid.uuid4().hex}.tmp.{ext}") for filepath, _ in items
+    ]
+    try:
+        timing = await run_tts_job(
+            engine_synthesize_batch_to, tmp_paths, voice, params, [text for _, text in items], TTS_CONCURRENCY,
         )
-    
+        renamed = time.perf_counter()
+        for tmp_path, (filepath, _) in zip(tmp_paths, items):
+            os.replace(tmp_path, filepath)
+        timing["write_ms"] = round((time.perf_counter() - renamed) * 1000, 1)
+        for filepath, _ in items:
+            folder, filename = os.path.split(filepath)
+            if audio_catalog.owns(folder):
+                audio_catalog.add(filename, before)
+        timing["batch"] = len(items)
+        return timing
+    finally:
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+async def _batched_clip(batch, filepath, text, accent, ext):
+    """One clip of a batch; synthesized on its own if the batch fails."""
+    try:
+        return dict(await asyncio.shield(batch))
+    except Exception:
+        # Engine gone (the retry uses the command line) or marks missing from its output
+        return await _synthesize_to(filepath, text, accent, ext)
+
+
+async def speak_turn(entries, folder="tts_output"):
+    """
+    speak_text for each (text, accent) of one turn, as gather(...,
+    return_exceptions=True) would return it. With batching enabled, clips
+    that are neither cached nor in flight are grouped by voice and each
+    group of two or more is synthesized by one engine call.
+    """
+    batched = {}
+    if batching_enabled():
+        os.makedirs(folder, exist_ok=True)
+        groups = {}
+        for i, (text, accent) in enumerate(entries):
+            engine, voice, params, ext, _ = build_tts_command(text, accent)
+            filename = audio_filename(text, accent, voice, engine, params, ext)
+            filepath = os.path.join(folder, filename)
+            if filepath in _inflight or find_clip(filename, folder) is not None:
+                continue
+            group = groups.setdefault((voice, tuple(params), ext), {})
+            # Repeated text joins the first entry's clip through _inflight
+            group.setdefault(filepath, (i, filename, text, accent))
+
+        for (voice, params, ext), clips in groups.items():
+            if len(clips) < 2:
+                continue
+            batch = asyncio.ensure_future(
+                _synthesize_batch_to([(path, clip[2]) for path, clip in clips.items()], voice, list(params), ext)
+            )
+            for filepath, (i, filename, text, accent) in clips.items():
+                pending = asyncio.ensure_future(_batched_clip(batch, filepath, text, accent, ext))
+                _track_inflight(filepath, pending)
+                batched[i] = (filename, pending)
+
+    started = time.perf_counter()
+    tasks = []
+    for i, (text, accent) in enumerate(entries):
+        if i in batched:
+            filename, pending = batched[i]
+            tasks.append(_finish_clip(pending, "synthesized", text, filename, folder, started))
+        else:
+            tasks.append(speak_text(text, accent, folder))
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _track_inflight(filepath, pending):
+    _inflight[filepath] = pending
+    pending.add_done_callback(lambda _: _inflight.pop(filepath, None))
+
+
+async def speak_text(text, accent, folder="tts_output"):
+    """
+    Generate speech audio file using platform-appropriate TTS, reusing cached audio.
+
+    Adds a "tts" span to the current episode timeline, if one is recorded.
+    """
+    started = time.perf_counter()
+    os.makedirs(folder, exist_ok=True)
+
+    engine, voice, params, ext, _ = build_tts_command(text, accent)
+    filename = audio_filename(text, accent, voice, engine, params, ext)
+    filepath = os.path.join(folder, filename)
+
+    cached = find_clip(filename, folder)
+    if cached is not None:
+        try:
+            # Cache hit: refresh mtime so retention cleanup keeps audio that is still in use
+            os.utime(os.path.join(folder, cached))
+        except FileNotFoundError:
+            # Cleanup deleted it since the lookup: synthesize it again
+            cached = None
+    if cached is not None:
+        _stats["cache_hits"] += 1
+        TTS_REQUESTS.inc(result="cache_hit")
+        if audio_catalog.owns(folder):
+            audio_catalog.add(cached)
+        schedule_transcode(filename, folder)
+        record_span("tts", started, result="cache_hit", chars=len(text), bytes=_file_size(folder, cached))
+        return filename
+
+    # Identical text already being synthesized: wait for that job instead of repeating it
+    pending = _inflight.get(filepath)
+    if pending is None:
+        pending = asyncio.ensure_future(_synthesize_to(filepath, text, accent, ext))
+        _track_inflight(filepath, pending)
+        outcome = "synthesized"
+    else:
+        _stats["cache_hits"] += 1
+        outcome = "inflight"
+    return await _finish_clip(pending, outcome, text, filename, folder, started)
+
+
+async def _finish_clip(pending, outcome, text, filename, folder, started):
+    """Await a clip's synthesis job (which catalogs it), then transcode and record it."""
+    try:
+        timing = await asyncio.shield(pending)
+    except Exception:
+        TTS_REQUESTS.inc(result="failed")
+        record_span("tts", started, result="failed", chars=len(text))
+        raise
+    TTS_REQUESTS.inc(result=outcome)
+    # Compressed variants are produced in the background
+    schedule_transcode(filename, folder)
+    # Joiners report the shared job's timing too: it is what they waited on
+    record_span("tts", started, result=outcome, chars=len(text), bytes=_file_size(folder, filename), **timing)
+
     # Return just filename for storage - path construction happens at higher level
     return filename
+
+
+def _file_size(folder, filename):
+    try:
+        return os.path.getsize(os.path.join(folder, filename))
+    except OSError:
+        return None
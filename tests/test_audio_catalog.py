@@ -0,0 +1,75 @@
+# test_audio_catalog.py
+
+import os
+
+import pytest
+
+from app.audio_catalog import AudioCatalog
+
+
+@pytest.fixture
+def folder(tmp_path):
+    path = tmp_path / "tts_output"
+    path.mkdir()
+    return path
+
+
+def touch_dir(folder, tick):
+    # Give every directory change its own mtime; the kernel clock is coarser than ns
+    os.utime(folder, ns=(tick * 10**9, tick * 10**9))
+
+
+def write(catalog, folder, name, tick):
+    """A local write: read the version, write, catalog it."""
+    before = catalog.dir_version()
+    (folder / name).write_bytes(b"RIFF")
+    touch_dir(folder, tick)
+    catalog.add(name, before)
+
+
+def names(catalog):
+    return sorted(e["name"] for e in catalog.list())
+
+
+def test_local_adds_do_not_rescan(folder, monkeypatch):
+    catalog = AudioCatalog(str(folder))
+    catalog.rebuild()
+    write(catalog, folder, "a.wav", 1)
+    write(catalog, folder, "b.wav", 2)
+    monkeypatch.setattr(catalog, "rebuild", lambda: pytest.fail("rescanned after local writes only"))
+    assert names(catalog) == ["a.wav", "b.wav"]
+
+
+def test_other_writer_between_local_adds_is_picked_up(folder):
+    catalog = AudioCatalog(str(folder))
+    catalog.rebuild()
+    write(catalog, folder, "a.wav", 1)
+    # Another worker writes a clip without telling this catalog
+    (folder / "other.wav").write_bytes(b"RIFF")
+    touch_dir(folder, 2)
+    write(catalog, folder, "b.wav", 3)
+    assert names(catalog) == ["a.wav", "b.wav", "other.wav"]
+
+
+def test_other_deleter_between_local_adds_is_picked_up(folder):
+    (folder / "old.wav").write_bytes(b"RIFF")
+    catalog = AudioCatalog(str(folder))
+    catalog.rebuild()
+    # The leader's cleanup deletes a clip in another process
+    os.remove(folder / "old.wav")
+    touch_dir(folder, 1)
+    write(catalog, folder, "a.wav", 2)
+    assert names(catalog) == ["a.wav"]
+
+
+def test_discard_after_other_writer_is_picked_up(folder):
+    (folder / "a.wav").write_bytes(b"RIFF")
+    catalog = AudioCatalog(str(folder))
+    catalog.rebuild()
+    (folder / "other.wav").write_bytes(b"RIFF")
+    touch_dir(folder, 1)
+    before = catalog.dir_version()
+    os.remove(folder / "a.wav")
+    touch_dir(folder, 2)
+    catalog.discard("a.wav", before)
+    assert names(catalog) == ["other.wav"]
@@ -0,0 +1,122 @@
+# test_episode_store.py
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app.episode_store import DELETE, JsonEpisodeStore, SqliteEpisodeStore, save_json_episodes
+from app.file_lock import file_lock, try_lock, unlock
+
+# Subprocesses import app from the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "json":
+        return JsonEpisodeStore(str(tmp_path / "episodes.json"))
+    return SqliteEpisodeStore(str(tmp_path / "episodes.db"))
+
+
+def episode(episode_id, topic="Travel", **fields):
+    return {"id": episode_id, "topic": topic, "created_at": f"2024-05-0{episode_id}", "audio_files": [], **fields}
+
+
+def test_try_lock_fails_while_another_descriptor_holds_it(tmp_path):
+    path = str(tmp_path / "x.lock")
+    fd = try_lock(path)
+    assert fd is not None
+    assert try_lock(path) is None
+    with file_lock(path, blocking=False) as acquired:
+        assert not acquired
+    unlock(fd)
+    with file_lock(path, blocking=False) as acquired:
+        assert acquired
+
+
+def test_lock_is_released_when_its_holder_dies(tmp_path):
+    path = str(tmp_path / "x.lock")
+    holder = subprocess.Popen(
+        [sys.executable, "-c", "import sys, time; from app.file_lock import try_lock; "
+                               "assert try_lock(sys.argv[1]) is not None; print('held', flush=True); time.sleep(60)", path],
+        stdout=subprocess.PIPE, text=True, cwd=ROOT,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "held"
+        assert try_lock(path) is None
+    finally:
+        holder.kill()
+        holder.wait()
+    fd = try_lock(path)
+    assert fd is not None
+    unlock(fd)
+
+
+def test_insert_refuses_a_taken_id(store):
+    assert store.insert(episode("1"))
+    assert not store.insert(episode("1", topic="Jobs"))
+    assert store.get("1")["topic"] == "Travel"
+    assert store.insert(episode("2"))
+    assert sorted(ep["id"] for ep in store.all()) == ["1", "2"]
+
+
+def test_json_save_replaces_the_file_atomically(tmp_path):
+    path = str(tmp_path / "episodes.json")
+    save_json_episodes(path, {"1": episode("1")})
+    save_json_episodes(path, {"2": episode("2")})
+    with open(path) as f:
+        assert list(json.load(f)) == ["2"]
+    # Only the catalog is left behind: no temp files
+    assert os.listdir(tmp_path) == ["episodes.json"]
+
+
+def test_json_writes_wait_for_the_lock(tmp_path):
+    store = JsonEpisodeStore(str(tmp_path / "episodes.json"))
+    fd = try_lock(store.path + ".lock")
+    writer = subprocess.Popen(
+        [sys.executable, "-c", "import sys; from app.episode_store import JsonEpisodeStore; "
+                               "JsonEpisodeStore(sys.argv[1]).insert({'id': '9', 'topic': 't'})", store.path],
+        cwd=ROOT,
+    )
+    time.sleep(0.5)
+    assert writer.poll() is None and store.get("9") is None
+    unlock(fd)
+    assert writer.wait(timeout=10) == 0
+    assert store.get("9")["topic"] == "t"
+
+
+def test_update_many_applies_changes_to_the_stored_copy(store):
+    store.put_many([episode("1"), episode("2"), episode("3", topic="Jobs")])
+    # Written after the caller's snapshot: must survive the update
+    store.put(episode("1", audio={"file": "new.opus"}))
+
+    def update(ep):
+        if ep["id"] == "1":
+            return dict(ep, missing_audio=1)
+        if ep["id"] == "3":
+            return DELETE
+        return None
+
+    assert store.update_many(["1", "2", "3", "404"], update) == (1, 1)
+    assert store.get("1")["audio"] == {"file": "new.opus"}
+    assert store.get("1")["missing_audio"] == 1
+    assert store.get("2") == episode("2")
+    assert store.get("3") is None
+    assert [ep["topic"] for ep in store.latest_per_topic()] == ["Travel"]
+
+
+def test_update_many_writes_nothing_if_the_callback_fails(store):
+    store.put_many([episode("1"), episode("2")])
+
+    def update(ep):
+        if ep["id"] == "2":
+            raise RuntimeError("boom")
+        return dict(ep, topic="Changed")
+
+    with pytest.raises(RuntimeError):
+        store.update_many(["1", "2"], update)
+    assert store.get("1")["topic"] == "Travel"
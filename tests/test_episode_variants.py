@@ -0,0 +1,45 @@
+# test_episode_variants.py
+
+import pytest
+
+from app import episode_store, episodes
+from app.episode_store import JsonEpisodeStore
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    path = tmp_path / "tts_output"
+    path.mkdir()
+    monkeypatch.setattr(episodes, "TTS_OUTPUT_DIR", str(path))
+    monkeypatch.setattr(episode_store, "_store", JsonEpisodeStore(str(tmp_path / "episodes.json")))
+    return path
+
+
+def test_variants_written_after_the_episode_are_recorded(folder):
+    (folder / "a.wav").write_bytes(b"RIFF")
+    (folder / "b.wav").write_bytes(b"RIFF")
+    episode_id = episodes.add_episode("Travel", [{"speaker": "Asha", "tts": "a.wav"}, {"speaker": "Ben", "tts": "b.wav"}])
+    assert episodes.get_episode(episode_id)["audio_variants"] == [{"wav": "/tts_output/a.wav"}, {"wav": "/tts_output/b.wav"}]
+
+    # Background transcoding lands, and the source of a is dropped
+    for name in ("a.opus", "a.mp3", "b.opus"):
+        (folder / name).write_bytes(b"OggS")
+    (folder / "a.wav").unlink()
+
+    assert episodes.refresh_audio_variants(episode_id)
+    ep = episodes.get_episode(episode_id)
+    assert ep["audio_files"] == ["/tts_output/a.mp3", "/tts_output/b.wav"]
+    assert ep["audio_variants"] == [
+        {"opus": "/tts_output/a.opus", "mp3": "/tts_output/a.mp3"},
+        {"wav": "/tts_output/b.wav", "opus": "/tts_output/b.opus"},
+    ]
+    assert not episodes.refresh_audio_variants(episode_id)
+
+
+def test_refresh_keeps_clips_that_are_gone(folder):
+    (folder / "a.wav").write_bytes(b"RIFF")
+    episode_id = episodes.add_episode("Travel", [{"speaker": "Asha", "tts": "a.wav"}])
+    (folder / "a.wav").unlink()
+    # Cleanup decides what happens to missing audio, not the variant refresh
+    assert not episodes.refresh_audio_variants(episode_id)
+    assert episodes.get_episode(episode_id)["audio_files"] == ["/tts_output/a.wav"]
@@ -0,0 +1,60 @@
+# test_groq_fixtures.py
+
+import gzip
+import os
+
+import pytest
+
+from app.groq_fixtures import FixtureMissing, FixtureStore, request_key
+
+PAYLOAD = {"model": "m", "temperature": 0.7, "messages": [{"role": "user", "content": "Hello   there"}]}
+
+
+def response(n):
+    return {"content": f"answer {n}", "usage": {"total_tokens": n}, "latency": 0.5, "ttfb": 0.1}
+
+
+def test_recordings_replay_round_robin(tmp_path):
+    store = FixtureStore(str(tmp_path))
+    for n in range(3):
+        store.record(PAYLOAD, response(n))
+    store.flush()
+
+    replayer = FixtureStore(str(tmp_path))
+    # Whitespace and stream do not change the key
+    same = dict(PAYLOAD, stream=True, messages=[{"role": "user", "content": "Hello there"}])
+    assert [replayer.replay(same)["content"] for _ in range(4)] == ["answer 0", "answer 1", "answer 2", "answer 0"]
+
+
+def test_record_appends_instead_of_rewriting(tmp_path):
+    store = FixtureStore(str(tmp_path))
+    path = store.path(request_key(PAYLOAD))
+    store.record(PAYLOAD, response(0))
+    store.flush()
+    first = open(path, "rb").read()
+    store.record(PAYLOAD, response(1))
+    store.flush()
+    # The earlier bytes are untouched; the new recording is one more gzip member
+    assert open(path, "rb").read().startswith(first)
+    with gzip.open(path, "rt") as f:
+        assert len(f.readlines()) == 3
+
+
+def test_truncated_last_recording_keeps_the_others(tmp_path):
+    store = FixtureStore(str(tmp_path))
+    path = store.path(request_key(PAYLOAD))
+    store.record(PAYLOAD, response(0))
+    store.flush()
+    complete = os.path.getsize(path)
+    store.record(PAYLOAD, response(1))
+    store.flush()
+    # The process died while appending the second recording
+    os.truncate(path, complete + 10)
+    replayer = FixtureStore(str(tmp_path))
+    assert replayer.replay(PAYLOAD)["content"] == "answer 0"
+    assert replayer.replay(PAYLOAD)["content"] == "answer 0"
+
+
+def test_missing_fixture_raises(tmp_path):
+    with pytest.raises(FixtureMissing):
+        FixtureStore(str(tmp_path)).replay(PAYLOAD)
@@ -0,0 +1,87 @@
+# test_jobs.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app import jobs
+from app.jobs import JobManager, QueueFullError
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def idle_manager():
+    # No workers: submissions stay queued
+    manager = JobManager(workers=0)
+    await manager.start()
+    return manager
+
+
+def test_identical_submissions_share_a_job():
+    async def scenario():
+        manager = await idle_manager()
+        first = manager.submit("travel", True)
+        again = manager.submit("travel", True)
+        other_tts = manager.submit("travel", False)
+        other_topic = manager.submit("tech_startup", True)
+        return manager, first, again, other_tts, other_topic
+
+    manager, first, again, other_tts, other_topic = run(scenario())
+    assert again is first and first["coalesced"] == 1
+    assert len({first["id"], other_tts["id"], other_topic["id"]}) == 3
+    assert manager.stats()["queued"] == 3
+
+
+def test_full_queue_rejects_new_jobs_but_still_coalesces(monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_QUEUED_JOBS", 2)
+
+    async def scenario():
+        manager = await idle_manager()
+        first = manager.submit("travel")
+        manager.submit("tech_startup")
+        with pytest.raises(QueueFullError):
+            manager.submit("mental_health")
+        # Joining a queued job takes no queue slot
+        assert manager.submit("travel") is first
+        return manager
+
+    assert run(scenario()).stats()["queued"] == 2
+
+
+def test_turns_total_follows_the_panel_size(monkeypatch):
+    panel = [{"name": n} for n in ("A", "B", "C")]
+    monkeypatch.setattr(jobs, "get_topic", lambda topic: SimpleNamespace(characters=panel))
+
+    async def scenario():
+        return (await idle_manager()).submit("small_panel")
+
+    assert run(scenario())["turns_total"] == jobs.MAX_TURNS * 3 + 1
+
+
+def test_finished_job_frees_its_key(monkeypatch):
+    async def run_roundtable(tts_enabled, topic_type, on_entry=None):
+        await on_entry({"speaker": "Moderator"})
+        await on_entry({"speaker": "Asha"})
+        return {"topic": "Travel", "turns": []}
+
+    monkeypatch.setattr(jobs, "run_roundtable", run_roundtable)
+    monkeypatch.setattr(jobs, "add_episode", lambda topic, turns, timeline=None: "ep1")
+    monkeypatch.setattr(jobs, "schedule_episode_audio", lambda episode_id, turns: None)
+
+    async def scenario():
+        manager = JobManager(workers=1)
+        await manager.start()
+        job = manager.submit("travel")
+        await manager.queue.join()
+        again = manager.submit("travel")
+        await manager.queue.join()
+        await manager.stop()
+        return job, again
+
+    job, again = run(scenario())
+    assert job["status"] == "done" and job["episode_id"] == "ep1"
+    assert job["turns_done"] == 2 and job["last_speaker"] == "Asha"
+    assert again["id"] != job["id"]
@@ -0,0 +1,76 @@
+# test_json_stream.py
+
+from app.json_stream import JsonObjectStream
+
+
+def feed_chunks(text, size):
+    parser = JsonObjectStream()
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted.extend(parser.feed(text[i:i + size]))
+    return parser, emitted
+
+
+TURN = '[\n  {"speaker": "Asha", "message": "Start early."},\n  {"speaker": "Ravi", "message": "Mock tests help."}\n]'
+
+
+def test_objects_are_emitted_as_their_closing_brace_arrives():
+    parser = JsonObjectStream()
+    assert parser.feed('[{"speaker": "Asha", "message": "Hi"') == []
+    assert parser.feed('}, {"speaker": "Ravi",') == [{"speaker": "Asha", "message": "Hi"}]
+    assert parser.feed(' "message": "Hello"}]') == [{"speaker": "Ravi", "message": "Hello"}]
+    assert len(parser.objects) == 2
+
+
+def test_any_chunk_split_gives_the_same_objects():
+    expected = [
+        {"speaker": "Asha", "message": "Start early."},
+        {"speaker": "Ravi", "message": "Mock tests help."},
+    ]
+    for size in (1, 2, 3, 7, 16, len(TURN)):
+        parser, emitted = feed_chunks(TURN, size)
+        assert emitted == expected, size
+        assert parser.objects == expected
+
+
+def test_braces_and_quotes_inside_strings_do_not_change_depth():
+    text = r'{"speaker": "A", "message": "use {braces} and \"quotes\" and a \\ backslash}"}'
+    for size in (1, 5, len(text)):
+        _, emitted = feed_chunks(text, size)
+        assert emitted == [{"speaker": "A", "message": 'use {braces} and "quotes" and a \\ backslash}'}]
+
+
+def test_escape_split_across_chunks():
+    parser = JsonObjectStream()
+    assert parser.feed('{"message": "say \\') == []
+    # The escaped quote arrives in the next chunk and must not end the string
+    assert parser.feed('"hi\\"", "speaker": "B"}') == [{"message": 'say "hi"', "speaker": "B"}]
+
+
+def test_nested_objects_are_returned_whole():
+    _, emitted = feed_chunks('[{"speaker": "A", "meta": {"mood": "calm"}, "message": "x"}]', 4)
+    assert emitted == [{"speaker": "A", "meta": {"mood": "calm"}, "message": "x"}]
+
+
+def test_markdown_fence_and_prose_are_ignored():
+    text = 'Here is the next turn:\n```json\n' + TURN + '\n```\nHope that helps!'
+    _, emitted = feed_chunks(text, 9)
+    assert [obj["speaker"] for obj in emitted] == ["Asha", "Ravi"]
+
+
+def test_trailing_commas_are_repaired():
+    _, emitted = feed_chunks('[{"speaker": "A", "message": "x",}, {"speaker": "B", "message": "y",},]', 6)
+    assert emitted == [{"speaker": "A", "message": "x"}, {"speaker": "B", "message": "y"}]
+
+
+def test_truncated_input_keeps_completed_objects_only():
+    text = TURN[:TURN.rfind('"Mock')]
+    parser, emitted = feed_chunks(text, 5)
+    assert emitted == [{"speaker": "Asha", "message": "Start early."}]
+    assert parser.objects == emitted
+    assert parser.depth == 1
+
+
+def test_unparseable_objects_are_skipped_and_parsing_continues():
+    _, emitted = feed_chunks('[{"speaker": A, "message": "x"}, {"speaker": "B", "message": "y"}]', 3)
+    assert emitted == [{"speaker": "B", "message": "y"}]
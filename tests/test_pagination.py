@@ -0,0 +1,70 @@
+# test_pagination.py
+
+import pytest
+
+from app.pagination import decode_cursor, encode_cursor, filter_items, paginate, parse_date
+
+
+def sort_key(item):
+    return (item["created_at"], item["id"])
+
+
+# Newest first, with two items sharing a timestamp
+ITEMS = [
+    {"id": "5", "created_at": "2024-05-05", "topic": "Travel"},
+    {"id": "4b", "created_at": "2024-05-04", "topic": "Finance"},
+    {"id": "4a", "created_at": "2024-05-04", "topic": "travel tips"},
+    {"id": "2", "created_at": "2024-05-02", "topic": "Jobs"},
+    {"id": "1", "created_at": "2024-05-01", "topic": "Travel"},
+]
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(("2024-05-04", "4a"))) == ("2024-05-04", "4a")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    "WzEsIDJd",                     # [1, 2]: well-formed but not strings
+    encode_cursor(("only-one",)),
+    encode_cursor(("a", "b", "c")),
+    "eyJhIjogMX0",                  # {"a": 1}
+])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_walk_every_item_once():
+    seen = []
+    after = None
+    while True:
+        page, after = paginate(ITEMS, sort_key, limit=2, after=after)
+        seen.extend(item["id"] for item in page)
+        if after is None:
+            break
+    assert seen == ["5", "4b", "4a", "2", "1"]
+
+
+def test_last_page_has_no_cursor():
+    page, cursor = paginate(ITEMS, sort_key, limit=5)
+    assert len(page) == 5 and cursor is None
+
+
+def test_cursor_stays_stable_when_newer_items_arrive():
+    page, cursor = paginate(ITEMS, sort_key, limit=2)
+    newer = [{"id": "6", "created_at": "2024-05-06", "topic": "Jobs"}] + ITEMS
+    page, _ = paginate(newer, sort_key, limit=2, after=cursor)
+    assert [item["id"] for item in page] == ["4a", "2"]
+
+
+def test_filter_by_topic_and_half_open_date_range():
+    items = filter_items(ITEMS, "created_at", topic="TRAVEL", since="2024-05-01", until="2024-05-05")
+    assert [item["id"] for item in items] == ["4a", "1"]
+
+
+def test_parse_date_rejects_garbage():
+    assert parse_date("2024-05-04", "since") == "2024-05-04T00:00:00"
+    assert parse_date(None, "since") is None
+    with pytest.raises(ValueError):
+        parse_date("yesterday", "since")
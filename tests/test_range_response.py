@@ -0,0 +1,130 @@
+# test_range_response.py
+
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from app.range_response import MediaSafeGZipMiddleware, RangeNotSatisfiable, parse_range, range_file_response
+
+ETAG = '"clip-v1"'
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=900-", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=990-5000", (990, 999)),     # end is clamped to the file
+    ("bytes=0-1,5-6", None),            # multiple ranges: whole file
+    ("items=0-1", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5-2", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 1000)
+
+
+@pytest.fixture
+def client(tmp_path):
+    data = bytes(range(256)) * 8
+    path = tmp_path / "clip.opus"
+    path.write_bytes(data)
+    app = FastAPI()
+
+    @app.api_route("/clip", methods=["GET", "HEAD"])
+    def clip(request: Request):
+        return range_file_response(request, str(path), "audio/ogg", etag=ETAG)
+
+    return TestClient(app), data
+
+
+def test_full_response(client):
+    c, data = client
+    r = c.get("/clip")
+    assert r.status_code == 200
+    assert r.content == data
+    assert r.headers["accept-ranges"] == "bytes"
+    assert r.headers["etag"] == ETAG
+
+
+def test_partial_response(client):
+    c, data = client
+    r = c.get("/clip", headers={"Range": "bytes=100-299"})
+    assert r.status_code == 206
+    assert r.content == data[100:300]
+    assert r.headers["content-range"] == f"bytes 100-299/{len(data)}"
+    assert r.headers["content-length"] == "200"
+
+
+def test_unsatisfiable_range_is_416(client):
+    c, data = client
+    r = c.get("/clip", headers={"Range": f"bytes={len(data)}-"})
+    assert r.status_code == 416
+    assert r.headers["content-range"] == f"bytes */{len(data)}"
+
+
+def test_if_none_match_is_304(client):
+    c, _ = client
+    assert c.get("/clip", headers={"If-None-Match": ETAG}).status_code == 304
+
+
+def test_stale_if_range_sends_whole_file(client):
+    c, data = client
+    r = c.get("/clip", headers={"Range": "bytes=0-9", "If-Range": '"clip-v0"'})
+    assert r.status_code == 200 and r.content == data
+
+
+def test_head_has_headers_only(client):
+    c, data = client
+    r = c.head("/clip", headers={"Range": "bytes=0-9"})
+    assert r.status_code == 206
+    assert r.headers["content-length"] == "10"
+    assert r.content == b""
+
+
+def test_gzip_skips_excluded_paths_only():
+    app = FastAPI()
+    body = "x" * 5000
+
+    @app.get("/media/{name}")
+    @app.get("/other")
+    def text(name: str = ""):
+        return Response(body, media_type="text/plain")
+
+    app.add_middleware(MediaSafeGZipMiddleware, exclude_paths=r"/media/", minimum_size=1000)
+    c = TestClient(app)
+    assert c.get("/other", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+    r = c.get("/media/a", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert r.content == body.encode()
+
+
+@pytest.fixture
+def app_client(tmp_path, monkeypatch):
+    from app import main
+    from app.audio_catalog import AudioCatalog
+
+    data = bytes(range(256)) * 40
+    (tmp_path / "clip.opus").write_bytes(data)
+    catalog = AudioCatalog(str(tmp_path))
+    catalog.rebuild()
+    monkeypatch.setattr(main, "audio_catalog", catalog)
+    monkeypatch.setattr(main, "get_episode", lambda _id: {"audio": {"file": "clip.opus", "media_type": "audio/ogg"}})
+    monkeypatch.setattr(main, "episode_audio_path", lambda _ep: str(tmp_path / "clip.opus"))
+    return TestClient(main.app), data
+
+
+@pytest.mark.parametrize("url", ["/api/audio/clip.opus", "/api/episodes/ep1/audio"])
+def test_ranged_audio_through_app_is_not_gzipped(app_client, url):
+    c, data = app_client
+    r = c.get(url, headers={"Range": "bytes=1000-8999", "Accept-Encoding": "gzip"})
+    assert r.status_code == 206
+    assert "content-encoding" not in r.headers
+    assert r.headers["content-length"] == "8000"
+    assert r.headers["content-range"] == f"bytes 1000-8999/{len(data)}"
+    assert r.content == data[1000:9000]
@@ -0,0 +1,119 @@
+# test_rate_limiter.py
+
+import asyncio
+
+import pytest
+
+from app.rate_limiter import RateLimiter, parse_duration
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the limiter sleeps."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+def limiter(rpm=0, tpm=0):
+    clock = FakeClock()
+    return RateLimiter(rpm, tpm, clock=clock, sleep=clock.sleep), clock
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("2m59.56s", 179.56), ("250ms", 0.25), ("7.66s", 7.66), ("12", 12.0), ("1h", 3600.0), (None, 0.0),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+
+def test_off_by_default_never_waits():
+    rl, clock = limiter()
+    for _ in range(100):
+        asyncio.run(rl.acquire(5000))
+    assert clock.slept == []
+    assert rl.stats()["requests_available"] is None
+
+
+def test_request_bucket_refills_at_rpm():
+    rl, clock = limiter(rpm=60)
+    for _ in range(60):
+        asyncio.run(rl.acquire(10))
+    assert clock.slept == []
+    asyncio.run(rl.acquire(10))
+    # 60/minute: the 61st request waits one second for a token
+    assert sum(clock.slept) == pytest.approx(1.0)
+
+
+def test_token_bucket_waits_for_the_estimate():
+    rl, clock = limiter(tpm=600)
+    asyncio.run(rl.acquire(500))
+    asyncio.run(rl.acquire(300))
+    # 100 left, 200 short at 10 tokens/second
+    assert sum(clock.slept) == pytest.approx(20.0)
+
+
+def test_reconcile_refunds_and_charges():
+    rl, clock = limiter(tpm=600)
+    asyncio.run(rl.acquire(500))
+    rl.reconcile(500, 200)
+    assert rl.stats()["tokens_available"] == 400
+    rl.reconcile(100, 300)
+    assert rl.stats()["tokens_available"] == 200
+
+
+def test_block_for_pauses_every_caller():
+    rl, clock = limiter(rpm=600)
+    rl.block_for(5)
+    assert rl.stats()["blocked_for"] == 5
+
+    async def callers():
+        await asyncio.gather(rl.acquire(1), rl.acquire(1))
+
+    asyncio.run(callers())
+    assert clock.now == pytest.approx(1005.0)
+
+
+def test_headers_only_tighten_and_retry_after_blocks():
+    rl, clock = limiter(rpm=30, tpm=6000)
+    rl.update_from_headers({"x-ratelimit-remaining-tokens": "9999"})
+    assert rl.stats()["tokens_available"] == 6000
+    rl.update_from_headers({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "2.5s"})
+    assert rl.stats()["tokens_available"] == 0
+    assert rl.stats()["blocked_for"] == 2.5
+    rl.update_from_headers({"retry-after": "7"})
+    assert rl.stats()["blocked_for"] == 7
+
+
+def test_exhausted_headers_block_even_with_buckets_off():
+    rl, clock = limiter()
+    rl.update_from_headers({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "3s"})
+    assert rl.stats()["blocked_for"] == 3
+    rl.update_from_headers({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "4s"})
+    assert rl.stats()["blocked_for"] == 4
+
+
+def test_waiters_are_served_in_arrival_order():
+    rl, clock = limiter(rpm=60)
+    rl.requests = 0
+    order = []
+
+    async def caller(n):
+        await rl.acquire(1)
+        order.append(n)
+
+    async def callers():
+        await asyncio.gather(*(caller(n) for n in range(5)))
+
+    asyncio.run(callers())
+    assert order == [0, 1, 2, 3, 4]
+    # One request per second, one after another
+    assert clock.now == pytest.approx(1005.0)
@@ -0,0 +1,34 @@
+# test_speech_engine.py
+
+import pytest
+
+from app.speech_engine import batch_ssml, engine_parameters, split_bounds
+
+
+def test_split_bounds_cut_at_each_mark():
+    assert split_bounds([0, 100, 250], 400) == [(0, 100), (100, 250), (250, 400)]
+
+
+@pytest.mark.parametrize("marks, total", [
+    ([0, None], 100),       # a mark was not reported
+    ([0, 0, 50], 100),      # empty clip
+    ([0, 80, 40], 100),     # out of order
+    ([0, 100], 100),        # last clip empty
+    ([0, 150], 100),        # beyond the audio
+    ([-1, 50], 100),
+])
+def test_split_bounds_reject_splits_with_empty_or_bad_clips(marks, total):
+    with pytest.raises(RuntimeError):
+        split_bounds(marks, total)
+
+
+def test_batch_ssml_marks_each_text_and_escapes_markup():
+    assert batch_ssml(["Hi <there>", "Tom & Jerry"]) == (
+        '<speak><mark name="t0"/>Hi &lt;there&gt; <mark name="t1"/>Tom &amp; Jerry</speak>'
+    )
+
+
+def test_engine_parameters_follow_cli_flags():
+    assert engine_parameters(["-s", "100", "-p", "50", "-a", "200", "-g", "15", "-x", "1"]) == [
+        (1, 100), (3, 50), (2, 200), (7, 15),
+    ]
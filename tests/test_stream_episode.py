@@ -0,0 +1,61 @@
+# test_stream_episode.py
+
+import asyncio
+
+import orjson
+
+from app import main
+
+TURNS = [{"speaker": "Moderator", "text": "Welcome"}, {"speaker": "Asha", "text": "Hi"}]
+
+
+def fake_pipeline(monkeypatch, recorded, release):
+    async def run_roundtable(tts_enabled, topic_type, on_entry=None):
+        for turn in TURNS:
+            await on_entry(turn)
+            await release.wait()
+        return {"topic": topic_type, "turns": TURNS}
+
+    monkeypatch.setattr(main, "run_roundtable", run_roundtable)
+    monkeypatch.setattr(main, "add_episode", lambda topic, turns, timeline=None: recorded.append(topic) or "ep1")
+    monkeypatch.setattr(main, "schedule_episode_audio", lambda episode_id, turns: recorded.append(episode_id))
+
+
+def parse(frame):
+    event, data = frame.decode().strip().split("\n")
+    return event.removeprefix("event: "), orjson.loads(data.removeprefix("data: "))
+
+
+def test_stream_records_episode(monkeypatch):
+    recorded = []
+
+    async def run():
+        release = asyncio.Event()
+        release.set()
+        fake_pipeline(monkeypatch, recorded, release)
+        return [parse(f) async for f in main.stream_episode(False, "travel")]
+
+    frames = asyncio.run(run())
+    assert [e for e, _ in frames] == ["turn", "turn", "episode"]
+    assert frames[-1][1] == {"id": "ep1", "topic": "travel", "turns_count": 2}
+    assert recorded == ["travel", "ep1"]
+
+
+def test_disconnect_still_records_episode(monkeypatch):
+    recorded = []
+
+    async def run():
+        release = asyncio.Event()
+        fake_pipeline(monkeypatch, recorded, release)
+        stream = main.stream_episode(False, "travel")
+        assert parse(await anext(stream))[0] == "turn"
+        # The client goes away before the roundtable has finished
+        await stream.aclose()
+        assert recorded == [] and len(main._detached) == 1
+        release.set()
+        await asyncio.gather(*main._detached)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert recorded == ["travel", "ep1"]
+    assert not main._detached
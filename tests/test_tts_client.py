@@ -0,0 +1,22 @@
+# test_tts_client.py
+
+import asyncio
+
+from app import tts_client
+
+
+def test_clip_deleted_after_cache_lookup_is_synthesized_again(tmp_path, monkeypatch):
+    synthesized = []
+
+    async def synthesize_to(filepath, text, accent, ext):
+        open(filepath, "wb").close()
+        synthesized.append(filepath)
+        return {}
+
+    # The lookup finds the clip, then cleanup removes it before utime
+    monkeypatch.setattr(tts_client, "find_clip", lambda filename, folder: filename)
+    monkeypatch.setattr(tts_client, "_synthesize_to", synthesize_to)
+    monkeypatch.setattr(tts_client, "schedule_transcode", lambda filename, folder: None)
+
+    filename = asyncio.run(tts_client.speak_text("Hello", "en-in", str(tmp_path)))
+    assert synthesized == [str(tmp_path / filename)]